@@ -2,9 +2,14 @@ import React, { useState, useEffect, useMemo } from 'react';
 import Sidebar from './components/Sidebar';
 import MapComponent from './components/MapComponent';
 import AnalyticsView from './components/AnalyticsView';
+import { loadProperties } from './loadProperties';
+import { loadRollups } from './rollups';
+import { loadTiles } from './tiles';
 
 function App() {
   const [allData, setAllData] = useState([]);
+  const [rollups, setRollups] = useState(null);
+  const [tiles, setTiles] = useState(null);
   const [currentView, setCurrentView] = useState('map'); // 'map' or 'analytics'
   const [filters, setFilters] = useState({
     county: 'All Counties',
@@ -16,12 +21,19 @@ function App() {
 
   // Fetch Data once
   useEffect(() => {
-    fetch(import.meta.env.BASE_URL + 'properties.json?t=' + Date.now())
-      .then(res => res.json())
+    loadProperties(import.meta.env.BASE_URL)
       .then(data => {
         setAllData(data);
       })
       .catch(err => console.error(err));
+    // Optional: without rollups the analytics view scans the loaded data
+    loadRollups(import.meta.env.BASE_URL)
+      .then(setRollups)
+      .catch(err => console.warn('Rollups unavailable', err));
+    // Optional: without the tile pyramid the map clusters the loaded data
+    loadTiles(import.meta.env.BASE_URL)
+      .then(setTiles)
+      .catch(err => console.warn('Vector tiles unavailable', err));
   }, []);
 
   // Derived: Unique Counties
@@ -77,9 +89,9 @@ function App() {
       />
       <main className="flex-1 shadow-inner relative z-0">
         {currentView === 'map' ? (
-          <MapComponent data={mapData} />
+          <MapComponent data={mapData} tiles={filteredData.length === allData.length ? tiles : null} />
         ) : (
-          <AnalyticsView data={filteredData} />
+          <AnalyticsView data={filteredData} rollups={rollups} filters={filters} />
         )}
       </main>
     </div>
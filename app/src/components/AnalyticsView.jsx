@@ -1,41 +1,61 @@
 import React, { useMemo } from 'react';
 import { BarChart, Bar, XAxis, YAxis, Tooltip, ResponsiveContainer, Cell } from 'recharts';
 import { Search } from 'lucide-react';
+import { cubeRows, ownerRanking } from '../rollups';
+
+const AnalyticsView = ({ data, rollups, filters }) => {
+    // Precomputed rollups when the filters allow it, else null (scan `data`)
+    const cube = useMemo(() => cubeRows(rollups, filters), [rollups, filters]);
 
-const AnalyticsView = ({ data }) => {
     // Aggregation: Top 10 Counties by Unit Count
     const countyData = useMemo(() => {
         const counts = {};
-        data.forEach(d => {
-            const county = d.county || 'Unknown';
-            counts[county] = (counts[county] || 0) + (d.units || 0);
-        });
+        if (cube) {
+            cube.forEach(([county, , , , units]) => {
+                counts[county] = (counts[county] || 0) + units;
+            });
+        } else {
+            data.forEach(d => {
+                const county = d.county || 'Unknown';
+                counts[county] = (counts[county] || 0) + (d.units || 0);
+            });
+        }
         return Object.entries(counts)
             .map(([name, value]) => ({ name, value }))
             .sort((a, b) => b.value - a.value)
             .slice(0, 10);
-    }, [data]);
+    }, [data, cube]);
 
     // Aggregation: Year Built Distribution (Decades)
     const yearData = useMemo(() => {
         const counts = {};
-        data.forEach(d => {
-            if (!d.year) return;
-            const decade = Math.floor(d.year / 10) * 10;
-            counts[decade] = (counts[decade] || 0) + 1;
-        });
+        if (cube) {
+            cube.forEach(([, , decade, properties]) => {
+                if (decade === null) return;
+                counts[decade] = (counts[decade] || 0) + properties;
+            });
+        } else {
+            data.forEach(d => {
+                if (!d.year) return;
+                const decade = Math.floor(d.year / 10) * 10;
+                counts[decade] = (counts[decade] || 0) + 1;
+            });
+        }
         return Object.entries(counts)
             .map(([name, value]) => ({ name: `${name}s`, value }))
             .sort((a, b) => a.name.localeCompare(b.name));
-    }, [data]);
+    }, [data, cube]);
 
     // Aggregation: Top 5 Owners
     // Aggregation: Top Owners (Filtered by Search)
     const [searchTerm, setSearchTerm] = React.useState('');
     const topOwners = useMemo(() => {
+        const ranked = searchTerm ? null : ownerRanking(rollups, filters);
+        if (ranked) return ranked.slice(0, 100);
         const counts = {};
         data.forEach(d => {
-            const owner = d.owner || 'Unknown';
+            // Resolved owner entity when the export has one, raw name otherwise
+            const owner = d.owner_entity || d.owner || 'Unknown';
             counts[owner] = (counts[owner] || 0) + (d.units || 0);
         });
 
@@ -44,9 +64,11 @@ const AnalyticsView = ({ data }) => {
             .sort((a, b) => b.value - a.value)
             .filter(item => item.name.toLowerCase().includes(searchTerm.toLowerCase()))
             .slice(0, 100); // Increased limit to 100
-    }, [data, searchTerm]);
+    }, [data, searchTerm, rollups, filters]);
 
-    const totalUnits = data.reduce((acc, d) => acc + (d.units || 0), 0);
+    const totalUnits = useMemo(() => (cube
+        ? cube.reduce((acc, row) => acc + row[4], 0)
+        : data.reduce((acc, d) => acc + (d.units || 0), 0)), [data, cube]);
 
     return (
         <div className="p-8 bg-slate-50 h-full overflow-y-auto">
@@ -2,7 +2,9 @@ import React, { useState, useMemo, useRef, useEffect, useCallback } from 'react'
 import Map, { NavigationControl, Source, Layer, ScaleControl, FullscreenControl, Popup } from 'react-map-gl/maplibre';
 import 'maplibre-gl/dist/maplibre-gl.css';
 
-const MapComponent = ({ data }) => {
+// tiles: TileJSON from loadTiles. When set, the map draws the prebuilt vector
+// tiles (already clustered per zoom) instead of clustering `data` in the browser.
+const MapComponent = ({ data, tiles }) => {
     const mapRef = useRef(null);
     const [hoverInfo, setHoverInfo] = useState(null);
     const [selectedProperty, setSelectedProperty] = useState(null);
@@ -62,6 +64,13 @@ const MapComponent = ({ data }) => {
         ]
     };
 
+    // Layers are shared by both sources; vector tile layers get the tile
+    // source-layer and a 'tile-' id prefix
+    const layerPrefix = tiles ? 'tile-' : '';
+    const forSource = (layer) => tiles
+        ? { ...layer, id: layerPrefix + layer.id, source: 'property-tiles', 'source-layer': 'properties' }
+        : layer;
+
     const clusterLayer = {
         id: 'clusters',
         type: 'circle',
@@ -81,7 +90,8 @@ const MapComponent = ({ data }) => {
         source: 'properties',
         filter: ['has', 'point_count'],
         layout: {
-            'text-field': '{point_count_abbreviated}',
+            // Tile clusters carry only point_count
+            'text-field': ['coalesce', ['get', 'point_count_abbreviated'], ['to-string', ['get', 'point_count']]],
             'text-font': ['DIN Offc Pro Medium', 'Arial Unicode MS Bold'],
             'text-size': 12
         },
@@ -111,11 +121,11 @@ const MapComponent = ({ data }) => {
                 style={{ width: '100%', height: '100%' }}
                 mapStyle={mapStyle} // Using OSM raster tiles for free, no-token map
                 attributionControl={true}
-                interactiveLayerIds={['clusters', 'unclustered-point']}
+                interactiveLayerIds={[layerPrefix + 'clusters', layerPrefix + 'unclustered-point']}
                 onMouseEnter={(e) => {
                     e.target.getCanvas().style.cursor = 'pointer';
                     const feature = e.features?.[0];
-                    if (feature && feature.layer.id === 'unclustered-point') {
+                    if (feature && feature.layer.id === layerPrefix + 'unclustered-point') {
                         setHoverInfo({
                             feature: feature,
                             x: e.point.x,
@@ -131,10 +141,12 @@ const MapComponent = ({ data }) => {
                     // If we clicked a cluster, we could zoom (optional)
                     // If we clicked a point (unclustered), show popup
                     const feature = e.features?.[0];
-                    if (feature && feature.layer.id === 'unclustered-point') {
+                    if (feature && feature.layer.id === layerPrefix + 'unclustered-point') {
                         setHoverInfo(null); // Hide hover tooltip
-                        setSelectedProperty(feature.properties); // Show popup
-                    } else if (feature && feature.layer.id === 'clusters') {
+                        // Tile points carry no coordinate properties; take them from the geometry
+                        const [longitude, latitude] = feature.geometry.coordinates;
+                        setSelectedProperty({ ...feature.properties, longitude, latitude }); // Show popup
+                    } else if (feature && feature.layer.id === layerPrefix + 'clusters') {
                         // Optional: Zoom into cluster
                         // const clusterId = feature.properties.cluster_id;
                         // const mapboxSource = e.target.getSource('properties');
@@ -153,7 +165,20 @@ const MapComponent = ({ data }) => {
                 <FullscreenControl position="top-right" />
                 <ScaleControl />
 
-                {data && (
+                {tiles ? (
+                    <Source
+                        id="property-tiles"
+                        type="vector"
+                        tiles={tiles.tiles}
+                        minzoom={tiles.minzoom}
+                        maxzoom={tiles.maxzoom}
+                        bounds={tiles.bounds}
+                    >
+                        <Layer {...forSource(clusterLayer)} />
+                        <Layer {...forSource(clusterCountLayer)} />
+                        <Layer {...forSource(unclusteredPointLayer)} />
+                    </Source>
+                ) : data && (
                     <Source
                         id="properties"
                         type="geojson"
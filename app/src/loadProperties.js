@@ -0,0 +1,48 @@
+// Loader for the columnar export written by scripts/04_export_for_app.py
+// (format described in scripts/utils/columnar.py).
+
+const ARRAY_TYPES = {
+  float32: Float32Array,
+  float64: Float64Array,
+  uint8: Uint8Array,
+  uint16: Uint16Array,
+  uint32: Uint32Array,
+};
+
+function readColumn(buffer, col, decoder) {
+  const json = (seg) => JSON.parse(decoder.decode(new Uint8Array(buffer, seg.offset, seg.byteLength)));
+  const typed = (seg, type) => {
+    const Type = ARRAY_TYPES[type];
+    return new Type(buffer, seg.offset, seg.byteLength / Type.BYTES_PER_ELEMENT);
+  };
+
+  if (col.type === 'dict') {
+    const values = json(col.values);
+    const codes = typed(col.data, col.codes);
+    return (i) => values[codes[i]];
+  }
+  if (col.type === 'string') {
+    const values = json(col.values);
+    return (i) => values[i];
+  }
+  const values = typed(col.data, col.type);
+  return (i) => (Number.isNaN(values[i]) ? null : values[i]);
+}
+
+// Returns the same row objects the old properties.json held. The manifest is
+// revalidated on every load; the payload name changes with its content, so
+// the browser cache can keep it as long as it likes.
+export async function loadProperties(baseUrl) {
+  const manifest = await fetch(baseUrl + 'properties.manifest.json', { cache: 'no-cache' }).then((res) => res.json());
+  const buffer = await fetch(baseUrl + manifest.file).then((res) => res.arrayBuffer());
+
+  const decoder = new TextDecoder();
+  const columns = manifest.columns.map((col) => [col.name, readColumn(buffer, col, decoder)]);
+  const rows = new Array(manifest.rows);
+  for (let i = 0; i < manifest.rows; i++) {
+    const row = {};
+    for (const [name, get] of columns) row[name] = get(i);
+    rows[i] = row;
+  }
+  return rows;
+}
@@ -0,0 +1,29 @@
+// Pre-aggregated analytics written by scripts/04_export_for_app.py
+// (public/rollups/cube.json and owners.json). They answer the analytics view
+// without scanning every property whenever the active filters line up with
+// the rollup dimensions; otherwise callers fall back to a scan.
+
+export async function loadRollups(baseUrl) {
+  const get = (name) => fetch(baseUrl + 'rollups/' + name, { cache: 'no-cache' }).then((res) => res.json());
+  const [cube, owners] = await Promise.all([get('cube.json'), get('owners.json')]);
+  return { cube, owners };
+}
+
+const onlyCountyAndUnits = (filters) => !filters.citySearch && !filters.yearMin && !filters.yearMax;
+
+// Cube rows [county, bucket, decade, properties, units] matching the filters,
+// or null when the filters cannot be answered from the cube.
+export function cubeRows(rollups, filters) {
+  if (!rollups || !onlyCountyAndUnits(filters)) return null;
+  const bucket = rollups.cube.unit_bucket_edges.indexOf(filters.minUnits);
+  if (bucket < 0) return null;
+  return rollups.cube.rows.filter(([county, b]) =>
+    b >= bucket && (filters.county === 'All Counties' || county === filters.county));
+}
+
+// Top owners as [{ name, value }] for the filters, or null if not precomputed.
+export function ownerRanking(rollups, filters) {
+  if (!rollups || !onlyCountyAndUnits(filters) || filters.minUnits !== rollups.owners.min_units) return null;
+  const list = rollups.owners.counties[filters.county] || [];
+  return list.map(([name, value]) => ({ name, value }));
+}
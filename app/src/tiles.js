@@ -0,0 +1,14 @@
+// Clustered point tiles written by scripts/05_build_tiles.py (public/tiles/,
+// described by its TileJSON tiles.json). They hold every geocoded property,
+// so the map draws them while no filter removes anything; filtered views
+// cluster the loaded rows in the browser instead.
+
+export async function loadTiles(baseUrl) {
+  const root = new URL(baseUrl + 'tiles/', window.location.href).href;
+  const res = await fetch(root + 'tiles.json', { cache: 'no-cache' });
+  if (!res.ok) throw new Error(`tiles.json: HTTP ${res.status}`);
+  const tilejson = await res.json();
+  // Tile URLs in the TileJSON are relative to it; MapLibre needs absolute ones
+  const absolute = (url) => (/^[a-z]+:\/\//i.test(url) ? url : root + url);
+  return { ...tilejson, tiles: tilejson.tiles.map(absolute) };
+}
@@ -1,8 +1,15 @@
-import requests
+import argparse
+import sys
 import zipfile
-import io
-import os
 from pathlib import Path
+from urllib.parse import quote
+
+# Add project root to path for imports
+sys.path.append(str(Path(__file__).parent.parent))
+
+from scripts.utils.county_lookup import COUNTY_NAMES
+from scripts.utils.downloader import download_all, extract_members
+from scripts.utils.fingerprint import load_manifest, save_manifest
 
 # URL for Florida Statewide Parcels 2025 (Shapefile download)
 # Sourced from Florida Geographic Information Office (FGIO) Open Data Portal
@@ -34,60 +41,68 @@ from pathlib import Path
 URL_DOR_MAP_DATA = "https://floridarevenue.com/property/dataportal/Documents/PTO%20Data%20Portal/Map%20Data/"
 # It usually contains county zips like "11_Alachua_2025.zip" or similar.
 
-def download_gis_data(output_dir):
-    """Download GIS shapefiles."""
-    
+# The portal's naming for county parcel zips is not documented; candidates
+# are tried in order and the first one the server has wins
+GIS_PATTERNS = [
+    "{county} {id} Parcel Data {year}.zip",
+    "{id} {county} Parcel Data {year}.zip",
+    "{county}_{id}_{year}.zip",
+]
+GIS_YEARS = ["2025", "2024"]
+MANIFEST_NAME = 'downloads.json'
+
+def gis_urls(county_no, base_url=URL_DOR_MAP_DATA, patterns=GIS_PATTERNS, years=GIS_YEARS):
+    """Candidate URLs for a county's parcel zip, most likely first."""
+    county = COUNTY_NAMES[county_no]
+    names = [p.format(county=county, id=county_no, year=y) for y in years for p in patterns]
+    return [base_url.rstrip('/') + '/' + quote(name) for name in names]
+
+def download_gis_data(output_dir, base_url=URL_DOR_MAP_DATA, workers=4, counties=None):
+    """Download county parcel shapefiles into <output_dir>/<CO_NO>_<County>/.
+
+    Uses the same streaming, resumable, conditional-GET downloader as the
+    NAL step; a county whose zip is unchanged costs one 304. The folder
+    layout is what find_shapefile() in the GIS stage looks for.
+    """
     gis_dir = Path(output_dir)
     gis_dir.mkdir(parents=True, exist_ok=True)
-    
-    print("Checking FL DOR Map Data directory...")
-    
-    # Since we can't easily list files on the IIS server without directory browsing enabled (which seemed to fail in browser),
-    # we might need to rely on the valid NAL logic: County Name + ID.
-    # The search result said: "Department typically collects county GIS parcel shapefiles every April".
-    # And "Map Data directory".
-    
-    # Let's try a test download for Alachua to see the naming convention.
-    # Possible names:
-    # "Alachua 11 2025.zip"
-    # "11 Alachua 2025.zip"
-    # "11_Alachua_2025.zip"
-    # "Alachua 2025.zip"
-    
-    headers = {
-        'User-Agent': 'Mozilla/5.0'
-    }
-    
-    # User's NAL pattern: "Alachua 11 Final NAL 2025.zip"
-    # Maybe GIS is "Alachua 11 Final GIS 2025.zip"?
-    # Or "Alachua 11 Map 2025.zip"?
-    
-    # Let's try to query the Statewide Parcels from FGIO instead which is a single giant file? 
-    # Or per county. The geocoding script `02_geocode_gis.py` expects per-county files (or folders).
-    # "list(gis_path.glob(f'*{county_no}*/*.shp'))"
-    
-    # Let's try to download Alachua from DOR with a few guesses.
-    base_url = "https://floridarevenue.com/property/dataportal/Documents/PTO%20Data%20Portal/Map%20Data/"
-    years = ["2025", "2024"]
-    patterns = [
-        "{county} {id} Parcel Data {year}.zip",
-        "{id} {county} Parcel Data {year}.zip",
-        "{county}_{id}_{year}.zip",
-        "{county} {id} Final SDF {year}.zip"  # SDF is Standard Data File (often has geometry?) No, SDF is textual.
-    ]
-    
-    # Actually, FGIO is the safer bet for 2025.
-    # https://floridagio.gov/search?q=parcels
-    
-    print("For now, please manually download the GIS files if automatic guess fails.")
-    print("Trying Alachua test...")
-    
-    test_url = base_url + "Alachua%2011%20Parcel%20Data%202025.zip" # Guess
-    r = requests.head(test_url, headers=headers)
-    print(f"Guess 1 ({test_url}): {r.status_code}")
-    
-    # If the user can provide the link from the "Map Data" section of the portal, that would be best.
-    
+    manifest_path = gis_dir / MANIFEST_NAME
+    manifest = load_manifest(manifest_path)
+
+    jobs = {}
+    for county_no in sorted(counties or COUNTY_NAMES):
+        name = f"{county_no}_{COUNTY_NAMES[county_no].replace(' ', '_')}"
+        zip_path = gis_dir / f'{name}.zip'
+        jobs[name] = (gis_urls(county_no, base_url), zip_path, manifest.get(name) if zip_path.exists() else None)
+
+    print(f"Fetching parcel data for {len(jobs)} counties with {workers} workers...")
+    missing = []
+    for name, status, url, validators in download_all(jobs, workers=workers):
+        if status in ('missing', 'failed'):
+            missing.append(name)
+            continue
+        folder = gis_dir / name
+        if status != 'not_modified' or not folder.exists():
+            try:
+                extract_members(jobs[name][1], folder)
+            except zipfile.BadZipFile:
+                print(f"  {name}: bad zip file")
+                jobs[name][1].unlink()
+                continue
+        manifest[name] = {**(validators or {}), 'url': url}
+        save_manifest(manifest_path, manifest)
+        print(f"  {name}: {status.replace('_', ' ')} ({url.rsplit('/', 1)[-1]})")
+
+    if missing:
+        print(f"No parcel zip found for {len(missing)} counties: {', '.join(sorted(missing))}")
+        print("Download those manually from the portal's Map Data section into the same folders.")
+    return missing
+
 if __name__ == "__main__":
     base_dir = Path(__file__).parent.parent
-    download_gis_data(str(base_dir / 'data/raw/dor_gis'))
+    parser = argparse.ArgumentParser(description='Download county parcel shapefiles.')
+    parser.add_argument('--output-dir', default=str(base_dir / 'data/raw/dor_gis'))
+    parser.add_argument('--base-url', default=URL_DOR_MAP_DATA)
+    parser.add_argument('--workers', type=int, default=4)
+    args = parser.parse_args()
+    download_gis_data(args.output_dir, base_url=args.base_url, workers=args.workers)
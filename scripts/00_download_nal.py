@@ -1,11 +1,15 @@
-import os
-import requests
+import argparse
+import sys
 import zipfile
-import io
-import time
 from pathlib import Path
 from urllib.parse import quote
 
+# Add project root to path for imports
+sys.path.append(str(Path(__file__).parent.parent))
+
+from scripts.utils.downloader import download_all, extract_members
+from scripts.utils.fingerprint import load_manifest, save_manifest
+
 # Base URL for the 2025 Final NAL files
 BASE_URL = "https://floridarevenue.com/property/dataportal/Documents/PTO%20Data%20Portal/Tax%20Roll%20Data%20Files/NAL/2025F/"
 
@@ -37,86 +41,84 @@ NAL_FILES = [
     "Washington 77 Final NAL 2025.zip"
 ]
 
-def download_and_extract(output_dir):
-    """Download extract NAL files."""
-    
+# Validators (ETag/Last-Modified) and extracted members per zip, for conditional GETs
+MANIFEST_NAME = 'downloads.json'
+NAL_SUFFIXES = ('.csv', '.txt')
+
+def nal_urls(filename, base_url=BASE_URL):
+    """Candidate URLs for a county zip; Miami-Dade has been published under both names."""
+    names = [filename]
+    if 'Dade' in filename and 'Miami-Dade' not in filename:
+        names.append(filename.replace('Dade', 'Miami-Dade'))
+    return [base_url.rstrip('/') + '/' + quote(name) for name in names]
+
+def download_and_extract(output_dir, base_url=BASE_URL, workers=4, extract=False, keep_zips=True, files=NAL_FILES):
+    """Download the NAL county zips, optionally extracting their CSVs.
+
+    Up to `workers` files download at once, streamed to disk. Interrupted
+    downloads resume from their .part file, and a zip already downloaded
+    is revalidated with a conditional GET (ETag/Last-Modified), so
+    unchanged counties cost one 304 each. The ingest step reads the CSVs
+    straight out of the zips, so extraction is off by default; with
+    extract=True members are extracted only when their zip changed or an
+    extract is missing, and keep_zips=False then deletes each zip
+    (revalidation relies on the extracts).
+    """
     raw_dir = Path(output_dir)
     raw_dir.mkdir(parents=True, exist_ok=True)
-    
-    # Session headers to look like a browser
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-    }
+    manifest_path = raw_dir / MANIFEST_NAME
+    manifest = load_manifest(manifest_path)
+
+    def have_local(filename):
+        entry = manifest.get(filename, {})
+        members = entry.get('members')
+        extracted = bool(members) and all((raw_dir / m).exists() for m in members)
+        return (raw_dir / filename).exists() or (extracted and not keep_zips)
+
+    jobs = {filename: (nal_urls(filename, base_url), raw_dir / filename,
+                       manifest.get(filename) if have_local(filename) else None)
+            for filename in files}
+    print(f"Fetching {len(jobs)} NAL files with {workers} workers...")
+    counts = {}
+    for filename, status, url, validators in download_all(jobs, workers=workers):
+        counts[status] = counts.get(status, 0) + 1
+        if status in ('missing', 'failed'):
+            print(f"  {filename}: {status}{f' ({url})' if url else ''}")
+            continue
 
-    for filename in NAL_FILES:
-        # Construct URL (handling spaces)
-        # We need to quote the component parts
-        # The path part .../NAL/2025F/ is fixed. The filename needs encoding.
-        encoded_filename = quote(filename) 
-        # But wait, python requests handles full url, but spaces in URL string are invalid.
-        # "Documents/PTO Data Portal/..." also has spaces.
-        # Let's quote the whole path segment or just handle the filename if base is standard.
-        # safely construct the full url
-        # The base url in browser usually has %20 for spaces.
-        
-        # Let's try fully encoded URL construction manually or use requests to handle params?
-        # Parameters? No, it's a path.
-        
-        # Let's clean the base url
-        clean_base = BASE_URL.replace(" ", "%20")
-        clean_filename = filename.replace(" ", "%20")
-        
-        file_url = f"{clean_base}{clean_filename}"
-        
-        print(f"Downloading {filename}...")
-        
-        try:
-            r = requests.get(file_url, headers=headers, stream=True)
-            if r.status_code == 200:
-                # Save zip
-                zip_path = raw_dir / filename
-                with open(zip_path, 'wb') as f:
-                    for chunk in r.iter_content(chunk_size=8192):
-                        f.write(chunk)
-                
-                print(f"  Saved zip. Extracting...")
-                
-                # Extract
-                try:
-                    with zipfile.ZipFile(zip_path, 'r') as z:
-                        z.extractall(raw_dir)
-                    print(f"  Extracted.")
-                    
-                    # Optional: Remove zip to save space
-                    os.remove(zip_path)
-                    
-                except zipfile.BadZipFile:
-                    print(f"  Error: Bad zip file.")
-            else:
-                print(f"  Failed: HTTP {r.status_code}")
-                # Try fallback for 'Dade' -> 'Miami-Dade' or vice-versa?
-                if "Dade" in filename:
-                    print("  Retrying with 'Miami-Dade' prefix...")
-                    alt_name = filename.replace("Dade", "Miami-Dade")
-                    clean_alt = alt_name.replace(" ", "%20")
-                    alt_url = f"{clean_base}{clean_alt}"
-                    r_alt = requests.get(alt_url, headers=headers)
-                    if r_alt.status_code == 200:
-                         zip_path = raw_dir / alt_name
-                         with open(zip_path, 'wb') as f:
-                            f.write(r_alt.content)
-                         with zipfile.ZipFile(zip_path, 'r') as z:
-                            z.extractall(raw_dir)
-                         os.remove(zip_path)
-                         print("  Success with Miami-Dade.")
-                    else:
-                        print(f"  Retry failed: {r_alt.status_code}")
+        entry = {**manifest.get(filename, {}), **(validators or {}), 'url': url}
+        zip_path = raw_dir / filename
+        members = entry.get('members') or []
+        stale = status != 'not_modified' or not members or not all((raw_dir / m).exists() for m in members)
+        if extract and stale and zip_path.exists():
+            try:
+                entry['members'] = extract_members(zip_path, raw_dir, NAL_SUFFIXES)
+            except zipfile.BadZipFile:
+                print(f"  {filename}: bad zip file")
+                # Forget the validators so the next run downloads it again
+                zip_path.unlink()
+                manifest.pop(filename, None)
+                save_manifest(manifest_path, manifest)
+                continue
+        if extract and not keep_zips:
+            zip_path.unlink(missing_ok=True)
+        manifest[filename] = entry
+        save_manifest(manifest_path, manifest)
+        print(f"  {filename}: {status.replace('_', ' ')}")
 
-        except Exception as e:
-            print(f"  Exception: {e}")
-            
-        time.sleep(1) # Be nice to server
+    save_manifest(manifest_path, manifest)
+    print("Done: " + ", ".join(f"{n} {status.replace('_', ' ')}" for status, n in sorted(counts.items())))
+    return counts
 
 if __name__ == "__main__":
     base_dir = Path(__file__).parent.parent
-    download_and_extract(str(base_dir / 'data/raw/dor_nal'))
+    parser = argparse.ArgumentParser(description='Download the county NAL files.')
+    parser.add_argument('--output-dir', default=str(base_dir / 'data/raw/dor_nal'))
+    parser.add_argument('--base-url', default=BASE_URL)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--extract', action='store_true', help='also extract the CSVs (ingest reads the zips directly)')
+    parser.add_argument('--no-keep-zips', dest='keep_zips', action='store_false',
+                        help='with --extract, delete each zip after extracting it')
+    args = parser.parse_args()
+    download_and_extract(args.output_dir, base_url=args.base_url, workers=args.workers,
+                         extract=args.extract, keep_zips=args.keep_zips)
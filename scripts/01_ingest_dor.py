@@ -1,12 +1,23 @@
+import csv
+import io
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
 import os
 import sys
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 from pathlib import Path
 
 # Add project root to path for imports
 sys.path.append(str(Path(__file__).parent.parent))
 
-from scripts.utils.county_lookup import COUNTY_NAMES, PRIORITY_COUNTIES
+from scripts.utils.county_lookup import COUNTY_NAMES, PRIORITY_COUNTIES, county_from_filename
+from scripts.utils.fingerprint import load_manifest, save_manifest
+from scripts.utils.metrics import metrics, timed_call
+from scripts.utils.nal_archive import NalMember, nal_fingerprint, nal_sources, open_nal
+from scripts.utils.roster_store import write_roster
 
 # Columns to keep (saves memory — NAL has 165 columns)
 KEEP_COLS = [
@@ -21,8 +32,280 @@ KEEP_COLS = [
     'PHY_ADDR1', 'PHY_ADDR2', 'PHY_CITY', 'PHY_ZIPCD',
 ]
 
-def ingest_all_counties(nal_dir: str, output_path: str):
-    """Load all 67 county NAL files, filter to multifamily 50+ units."""
+NUMERIC_COLS = [
+    'JV', 'AV_NSD', 'TV_NSD', 'LND_VAL', 'LND_SQFOOT',
+    'TOT_LVG_AREA', 'NO_BULDNG', 'ACT_YR_BLT', 'EFF_YR_BLT',
+    'SALE_PRC1', 'SALE_YR1', 'SALE_MO1',
+    'SALE_PRC2', 'SALE_YR2', 'SALE_MO2',
+]
+
+ADDRESS_COLS = ['PHY_ADDR1', 'PHY_ADDR2', 'PHY_CITY', 'PHY_ZIPCD']
+
+# Rough in-memory cost of one parsed row restricted to KEEP_COLS (32 short
+# strings plus parser buffers). Turns a memory ceiling into a chunk size.
+BYTES_PER_ROW = 2048
+MIN_CHUNK_ROWS = 10_000
+# Zip members are always streamed (they cannot be memory-mapped), this many rows at a time
+MEMBER_CHUNK_ROWS = 100_000
+
+def chunksize_for_memory(memory_limit_mb, workers=1):
+    """Rows per read_csv chunk that keep each worker within its share of memory_limit_mb."""
+    budget = memory_limit_mb * 1024 * 1024 // max(1, workers)
+    return max(MIN_CHUNK_ROWS, int(budget // BYTES_PER_ROW))
+
+def filter_multifamily(df):
+    """Keep DOR_UC 003/008 rows and convert the key integer fields.
+
+    Returns None when the frame has no DOR_UC column.
+    """
+    # Normalize column names to uppercase
+    df.columns = df.columns.str.upper().str.strip()
+    
+    # Filter: DOR_UC in ('003', '008') — ALL multifamily properties
+    # 003 = Multi-family 10+ units (Commercial)
+    # 008 = Multi-family fewer than 10 units (Residential)
+    if 'DOR_UC' not in df.columns:
+        return None
+    dor_uc_clean = df['DOR_UC'].astype(str).str.strip().str.zfill(3)
+    mask = dor_uc_clean.isin(['003', '008'])
+    filtered = df[mask].copy()
+    
+    # Convert numeric fields
+    filtered['NO_RES_UNTS'] = pd.to_numeric(filtered.get('NO_RES_UNTS', 0), errors='coerce').fillna(0).astype(int)
+    filtered['CO_NO'] = pd.to_numeric(filtered.get('CO_NO', 0), errors='coerce').fillna(0).astype(int)
+    return filtered
+
+def process_county_file(csv_file, chunksize=None):
+    """Read, filter and type-convert a single county NAL file.
+
+    Returns the multifamily rows as a DataFrame, or None if the file could not
+    be read or has no DOR_UC column. Runs inside worker processes in parallel mode,
+    so it must stay a module-level function.
+
+    With chunksize set the file is streamed that many rows at a time and only
+    the rows passing the DOR_UC filter are kept, so peak memory is bounded by
+    the chunk size rather than the county size. csv_file may be a NalMember,
+    which is decompressed and filtered chunk by chunk straight from its zip.
+    """
+    name = csv_file.name if isinstance(csv_file, NalMember) else Path(csv_file).name
+    print(f"Processing: {name}")
+    if chunksize is None and isinstance(csv_file, NalMember):
+        chunksize = MEMBER_CHUNK_ROWS
+    
+    # Read only needed columns (handles large files efficiently)
+    try:
+        with open_nal(csv_file) as f:
+            reader = pd.read_csv(
+                f,
+                usecols=lambda c: c.upper() in [col.upper() for col in KEEP_COLS],
+                dtype=str,
+                low_memory=False,
+                encoding='latin-1',  # Some counties use non-UTF8 characters
+                chunksize=chunksize
+            )
+            if chunksize is None:
+                filtered = filter_multifamily(reader)
+            else:
+                parts = []
+                with reader:
+                    for chunk in reader:
+                        part = filter_multifamily(chunk)
+                        if part is None:
+                            parts = None
+                            break
+                        parts.append(part)
+                if parts is None:
+                    filtered = None
+                elif parts:
+                    filtered = pd.concat(parts, ignore_index=True)
+                else:
+                    # Header-only file: nothing to filter
+                    filtered = filter_multifamily(pd.DataFrame(columns=[c.upper() for c in KEEP_COLS], dtype=str))
+    except Exception as e:
+        print(f"  ERROR reading {name}: {e}")
+        return None
+    
+    if filtered is None:
+        print(f"  Warning: DOR_UC column missing in {name}")
+        return None
+    
+    # Convert remaining numeric fields. Done per county so workers hand back
+    # typed frames; pd.concat upcasts int/float mixes the same way a single
+    # pd.to_numeric over the combined column would.
+    for col in NUMERIC_COLS:
+        if col in filtered.columns:
+            filtered[col] = pd.to_numeric(filtered[col], errors='coerce')
+    
+    return filtered
+
+# Typed Arrow schema for the kept columns (engine='arrow'). Codes are
+# dictionary-encoded so they arrive in pandas as categoricals; identifiers,
+# names and addresses stay strings. CO_NO is parsed as an integer and turned
+# into a categorical after filtering (Arrow only dictionary-encodes strings).
+# The win is mostly parse time: bench_ingest measures the arrow engine ~4x
+# faster but its roster only ~1.3x smaller, since pandas strings are already
+# Arrow-backed and the large columns (IDs, names, addresses) are unique per row.
+CODE = pa.dictionary(pa.int32(), pa.string())
+NAL_SCHEMA = {
+    'CO_NO': pa.int16(), 'PARCEL_ID': pa.string(), 'ASMNT_YR': pa.string(),
+    'DOR_UC': CODE, 'PA_UC': CODE,
+    'JV': pa.float64(), 'AV_NSD': pa.float64(), 'TV_NSD': pa.float64(),
+    'LND_VAL': pa.float64(), 'NO_LND_UNTS': pa.string(), 'LND_SQFOOT': pa.float64(),
+    'ACT_YR_BLT': pa.float32(), 'EFF_YR_BLT': pa.float32(), 'TOT_LVG_AREA': pa.float64(),
+    'NO_BULDNG': pa.float32(), 'NO_RES_UNTS': pa.float64(),
+    'SALE_PRC1': pa.float64(), 'SALE_YR1': pa.float32(), 'SALE_MO1': pa.float32(),
+    'SALE_PRC2': pa.float64(), 'SALE_YR2': pa.float32(), 'SALE_MO2': pa.float32(),
+    'OWN_NAME': pa.string(), 'OWN_ADDR1': pa.string(), 'OWN_ADDR2': pa.string(),
+    'OWN_CITY': pa.string(), 'OWN_STATE': CODE, 'OWN_ZIPCD': pa.string(),
+    'PHY_ADDR1': pa.string(), 'PHY_ADDR2': pa.string(), 'PHY_CITY': pa.string(),
+    'PHY_ZIPCD': pa.string(),
+}
+
+CATEGORY_COLS = ['CO_NO', 'DOR_UC', 'PA_UC', 'OWN_STATE']
+
+# Approximate raw bytes of one full 165-column NAL line; converts a row
+# chunksize into an Arrow streaming block size.
+RAW_BYTES_PER_ROW = 1024
+
+def process_county_file_arrow(csv_file, chunksize=None, use_threads=True):
+    """Arrow counterpart of process_county_file using pyarrow's CSV reader.
+
+    Parses only the kept columns straight into NAL_SCHEMA types and applies the
+    DOR_UC filter in Arrow before anything becomes a pandas object. If a
+    county has unparseable numbers the file is re-read with numeric columns
+    as strings and coerced like the pandas path. A NalMember is streamed
+    from its zip with the filter applied block by block.
+    """
+    name = csv_file.name if isinstance(csv_file, NalMember) else Path(csv_file).name
+    print(f"Processing: {name}")
+    if chunksize is None and isinstance(csv_file, NalMember):
+        chunksize = MEMBER_CHUNK_ROWS
+    
+    try:
+        # Column names vary in case between counties; map them from the header
+        with io.TextIOWrapper(open_nal(csv_file), encoding='latin-1', newline='') as f:
+            header = next(csv.reader(f), [])
+        names = {c.upper().strip(): c for c in header}
+        if 'DOR_UC' not in names:
+            print(f"  Warning: DOR_UC column missing in {name}")
+            return None
+        include = [names[c] for c in KEEP_COLS if c in names]
+        
+        try:
+            table = _read_nal_arrow(csv_file, include, names, NAL_SCHEMA, chunksize, use_threads)
+            coerce = []
+        except pa.ArrowInvalid:
+            # Dirty numeric values: parse them as text and coerce below
+            loose = {c: (pa.string() if pa.types.is_integer(t) or pa.types.is_floating(t) else t)
+                     for c, t in NAL_SCHEMA.items()}
+            table = _read_nal_arrow(csv_file, include, names, loose, chunksize, use_threads)
+            coerce = [c for c in NAL_SCHEMA if loose[c] != NAL_SCHEMA[c]]
+    except Exception as e:
+        print(f"  ERROR reading {name}: {e}")
+        return None
+    
+    filtered = table.to_pandas()
+    filtered.columns = filtered.columns.str.upper().str.strip()
+    for col in coerce:
+        if col in filtered.columns:
+            filtered[col] = pd.to_numeric(filtered[col], errors='coerce')
+    
+    filtered['NO_RES_UNTS'] = filtered.get('NO_RES_UNTS', pd.Series(0, index=filtered.index)).fillna(0).astype('int32')
+    filtered['CO_NO'] = filtered.get('CO_NO', pd.Series(0, index=filtered.index)).fillna(0).astype('int16').astype('category')
+    return filtered
+
+def _read_nal_arrow(csv_file, include, names, schema, chunksize, use_threads):
+    """Read the DOR_UC 003/008 rows of a NAL file into an Arrow table."""
+    read_options = pacsv.ReadOptions(encoding='latin-1', use_threads=use_threads)
+    if chunksize is not None:
+        read_options.block_size = max(1 << 20, chunksize * RAW_BYTES_PER_ROW)
+    convert_options = pacsv.ConvertOptions(
+        include_columns=include,
+        column_types={names[c]: t for c, t in schema.items() if c in names},
+        strings_can_be_null=True,  # empty fields become nulls, as in read_csv
+    )
+    
+    def keep_multifamily(batch):
+        dor_uc = pc.utf8_trim_whitespace(batch.column(names['DOR_UC']).cast(pa.string()))
+        mask = pc.is_in(pc.utf8_lpad(dor_uc, width=3, padding='0'), value_set=pa.array(['003', '008']))
+        return batch.filter(mask)
+    
+    if chunksize is None:
+        return keep_multifamily(pacsv.read_csv(csv_file, read_options=read_options,
+                                               convert_options=convert_options))
+    
+    # Streaming: only the filtered slice of each block is retained
+    with open_nal(csv_file) as f, pacsv.open_csv(f, read_options=read_options,
+                                                 convert_options=convert_options) as reader:
+        batches = [keep_multifamily(batch) for batch in reader]
+        return pa.Table.from_batches(batches, schema=reader.schema)
+
+# Bump when the per-county processing changes so cached partitions are rebuilt
+INGEST_VERSION = 1
+
+def plan_incremental(csv_files, cache_dir, engine, sources=None):
+    """Compare source files against the cache manifest.
+
+    Returns (manifest, changed files). Unchanged files have an up-to-date
+    fingerprint and partition in cache_dir; everything else must be re-read.
+    sources is every source file on disk (default csv_files): entries for
+    sources left out of this run are kept as they are, and only entries for
+    files that no longer exist are dropped along with their partitions.
+    """
+    cache_path = Path(cache_dir)
+    cache_path.mkdir(parents=True, exist_ok=True)
+    previous = load_manifest(cache_path / 'manifest.json')
+    if previous.get('version') != INGEST_VERSION or previous.get('engine') != engine:
+        previous = {}
+    old_files = previous.get('files', {})
+
+    manifest = {'version': INGEST_VERSION, 'engine': engine, 'files': {}}
+    changed = []
+    for csv_file in csv_files:
+        entry = old_files.get(csv_file.name)
+        fingerprint = nal_fingerprint(csv_file, entry)
+        if (entry and entry.get('sha256') == fingerprint['sha256']
+                and (cache_path / entry['partition']).exists()):
+            manifest['files'][csv_file.name] = {**entry, **fingerprint}
+        else:
+            manifest['files'][csv_file.name] = fingerprint
+            changed.append(csv_file)
+    # e.g. the other counties of a counties-limited run
+    for source in sources or ():
+        if source.name not in manifest['files'] and source.name in old_files:
+            manifest['files'][source.name] = old_files[source.name]
+
+    for name, entry in old_files.items():
+        if name not in manifest['files'] and entry.get('partition'):
+            (cache_path / entry['partition']).unlink(missing_ok=True)
+    return manifest, changed
+
+def ingest_all_counties(nal_dir: str, output_path: str, workers: int = 1,
+                        chunksize: int = None, memory_limit_mb: int = None,
+                        engine: str = 'pandas', cache_dir: str = None,
+                        counties=None):
+    """Load all 67 county NAL files, filter to multifamily 50+ units.
+
+    NAL files are read from nal_dir as extracted .csv/.txt files or
+    directly from the county .zip archives the download step leaves there.
+
+    workers > 1 parses counties in a process pool (None = one per CPU core).
+    Frames are collected in file order, so the output matches the serial run.
+
+    chunksize streams each file in fixed-size row chunks; alternatively
+    memory_limit_mb derives the chunk size from a ceiling shared by all workers.
+
+    engine='arrow' parses with pyarrow's multithreaded CSV reader into
+    NAL_SCHEMA types, storing codes as categoricals.
+
+    cache_dir enables incremental mode: each file's filtered rows are cached
+    as a parquet partition next to a manifest of content hashes and row
+    counts, and only files whose content changed are parsed again.
+
+    counties limits the run to those county numbers. Files are picked by the
+    county number in their name, and when output_path is a partitioned
+    dataset directory only those partitions are rewritten.
+    """
     
     frames = []
     nal_path = Path(nal_dir)
@@ -34,52 +317,91 @@ def ingest_all_counties(nal_dir: str, output_path: str):
         print(f"Warning: Raw NAL directory not found: {nal_dir}")
         return None
 
-    csv_files = sorted(nal_path.glob('*.csv')) + sorted(nal_path.glob('*.txt'))
+    csv_files = sources = nal_sources(nal_path)
+    
+    if counties is not None:
+        counties = {int(c) for c in counties}
+        # Unrecognised file names are kept (zip members fall back to the
+        # archive's name); their rows are filtered on CO_NO below
+        county_of = lambda f: county_from_filename(f.name) or (
+            county_from_filename(f.archive.name) if isinstance(f, NalMember) else None)
+        csv_files = [f for f in csv_files if county_of(f) in counties | {None}]
     
     if not csv_files:
-        print(f"No CSV files found in {nal_dir}")
+        print(f"No NAL files found in {nal_dir}")
         return None
 
+    manifest = None
+    to_read = csv_files
+    if cache_dir is not None:
+        manifest, to_read = plan_incremental(csv_files, cache_dir, engine, sources)
+        print(f"Incremental ingest: {len(to_read)} of {len(csv_files)} files changed")
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = max(1, min(workers, len(to_read)))
+
+    if chunksize is None and memory_limit_mb is not None:
+        chunksize = chunksize_for_memory(memory_limit_mb, workers)
+    if chunksize is not None:
+        print(f"Streaming NAL files in chunks of {chunksize:,} rows")
+    if engine == 'arrow':
+        # Arrow threads only when counties are not already spread over processes
+        read_file = partial(process_county_file_arrow, chunksize=chunksize, use_threads=workers == 1)
+    elif engine == 'pandas':
+        read_file = partial(process_county_file, chunksize=chunksize)
+    else:
+        raise ValueError(f"Unknown ingest engine: {engine}")
+    # Workers send their timing back with each frame for the run report
+    read_file = partial(timed_call, read_file)
+
+    if workers == 1:
+        results = map(read_file, to_read)
+        pool = None
+    else:
+        print(f"Processing {len(to_read)} files with {workers} worker processes...")
+        pool = ProcessPoolExecutor(max_workers=workers)
+        # map() yields in submission order as each county finishes
+        results = pool.map(read_file, to_read)
+
+    fresh = {}
+    try:
+        for csv_file, (filtered, seconds, peak_mb) in zip(to_read, results):
+            metrics.record(f'ingest.file.{csv_file.stem}', seconds,
+                           rows_out=None if filtered is None else len(filtered), peak_rss_mb=peak_mb)
+            if filtered is None:
+                if manifest is not None:
+                    # Leave it out of the manifest so the next run retries it
+                    del manifest['files'][csv_file.name]
+                continue
+            
+            if len(filtered) > 0:
+                county_name = COUNTY_NAMES.get(filtered['CO_NO'].iloc[0], 'Unknown')
+                print(f"  -> {len(filtered)} properties in {county_name} ({csv_file.name})")
+            else:
+                print(f"  -> 0 multifamily properties found ({csv_file.name})")
+            fresh[csv_file] = filtered
+            
+            if manifest is not None:
+                entry = manifest['files'][csv_file.name]
+                entry['partition'] = f'{csv_file.stem}.parquet'
+                entry['rows'] = max(0, (entry.get('lines') or 0) - 1)  # minus header
+                entry['filtered_rows'] = len(filtered)
+                filtered.to_parquet(Path(cache_dir) / entry['partition'], index=False)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    
+    if manifest is not None:
+        save_manifest(Path(cache_dir) / 'manifest.json', manifest)
+    
+    # Assemble in file order, pulling unchanged counties from the cache
     for csv_file in csv_files:
-        print(f"Processing: {csv_file.name}")
-        
-        # Read only needed columns (handles large files efficiently)
-        try:
-            df = pd.read_csv(
-                csv_file,
-                usecols=lambda c: c.upper() in [col.upper() for col in KEEP_COLS],
-                dtype=str,
-                low_memory=False,
-                encoding='latin-1'  # Some counties use non-UTF8 characters
-            )
-        except Exception as e:
-            print(f"  ERROR reading {csv_file.name}: {e}")
-            continue
-        
-        # Normalize column names to uppercase
-        df.columns = df.columns.str.upper().str.strip()
-        
-        # Convert numeric fields
-        df['NO_RES_UNTS'] = pd.to_numeric(df.get('NO_RES_UNTS', 0), errors='coerce').fillna(0).astype(int)
-        df['CO_NO'] = pd.to_numeric(df.get('CO_NO', 0), errors='coerce').fillna(0).astype(int)
-        
-        # Filter: DOR_UC in ('003', '008') — ALL multifamily properties
-        # 003 = Multi-family 10+ units (Commercial)
-        # 008 = Multi-family fewer than 10 units (Residential)
-        if 'DOR_UC' in df.columns:
-            dor_uc_clean = df['DOR_UC'].astype(str).str.strip().str.zfill(3)
-            mask = dor_uc_clean.isin(['003', '008'])
-            filtered = df[mask].copy()
-        else:
-            print("  Warning: DOR_UC column missing")
-            continue
-        
-        if len(filtered) > 0:
-            county_name = COUNTY_NAMES.get(filtered['CO_NO'].iloc[0], 'Unknown')
-            print(f"  -> {len(filtered)} properties in {county_name}")
+        filtered = fresh.get(csv_file)
+        if filtered is None and manifest is not None and csv_file not in to_read:
+            filtered = pd.read_parquet(Path(cache_dir) / manifest['files'][csv_file.name]['partition'])
+        if filtered is not None and len(filtered) > 0:
             frames.append(filtered)
-        else:
-            print(f"  -> 0 multifamily properties found")
     
     if not frames:
         print("No data found matching criteria.")
@@ -87,6 +409,13 @@ def ingest_all_counties(nal_dir: str, output_path: str):
 
     # Combine all counties
     result = pd.concat(frames, ignore_index=True)
+    if counties is not None:
+        result = result[result['CO_NO'].astype(int).isin(counties)].reset_index(drop=True)
+    if engine == 'arrow':
+        # Per-county categories differ, so concat falls back to object
+        for col in CATEGORY_COLS:
+            if col in result.columns:
+                result[col] = result[col].astype('category')
     
     # Add county name
     result['COUNTY_NAME'] = result['CO_NO'].map(COUNTY_NAMES)
@@ -94,16 +423,8 @@ def ingest_all_counties(nal_dir: str, output_path: str):
     # Flag priority metros
     result['IS_PRIORITY'] = result['CO_NO'].isin(PRIORITY_COUNTIES)
     
-    # Convert remaining numeric fields
-    for col in ['JV', 'AV_NSD', 'TV_NSD', 'LND_VAL', 'LND_SQFOOT',
-                'TOT_LVG_AREA', 'NO_BULDNG', 'ACT_YR_BLT', 'EFF_YR_BLT',
-                'SALE_PRC1', 'SALE_YR1', 'SALE_MO1',
-                'SALE_PRC2', 'SALE_YR2', 'SALE_MO2']:
-        if col in result.columns:
-            result[col] = pd.to_numeric(result[col], errors='coerce')
-    
     # Clean address fields
-    for col in ['PHY_ADDR1', 'PHY_ADDR2', 'PHY_CITY', 'PHY_ZIPCD']:
+    for col in ADDRESS_COLS:
         if col in result.columns:
             result[col] = result[col].fillna('').str.strip()
     
@@ -114,7 +435,7 @@ def ingest_all_counties(nal_dir: str, output_path: str):
     ).str.strip() + ', ' + result['PHY_CITY'] + ', FL ' + result['PHY_ZIPCD'].str[:5]
     
     # Save
-    result.to_parquet(output_path, index=False)
+    write_roster(result, output_path, counties=counties)
     print(f"\n{'='*60}")
     print(f"TOTAL: {len(result)} multifamily properties across {result['CO_NO'].nunique()} counties")
     print(f"  DOR_UC 003 (10+ units): {(result['DOR_UC'].str.zfill(3) == '003').sum()}")
@@ -131,5 +452,8 @@ if __name__ == '__main__':
     base_dir = Path(__file__).parent.parent
     df = ingest_all_counties(
         nal_dir=str(base_dir / 'data/raw/dor_nal'),
-        output_path=str(base_dir / 'data/processed/base_roster.parquet')
+        output_path=str(base_dir / 'data/processed/base_roster'),  # partitioned by CO_NO
+        workers=None,  # one process per CPU core
+        engine='arrow',
+        cache_dir=str(base_dir / 'data/processed/ingest_cache')
     )
@@ -0,0 +1,47 @@
+from pathlib import Path
+import sys
+import time
+
+# Add project root to path for imports
+sys.path.append(str(Path(__file__).parent.parent))
+
+from scripts.utils.owner_entities import resolve_owners
+from scripts.utils.roster_store import read_roster, write_roster
+
+OWNER_COLS = ['OWN_NAME', 'OWN_ADDR1', 'OWN_ZIPCD']
+
+def resolve_roster_owners(roster_path, output_path, workers=1):
+    """Add owner_entity_id and owner_entity_name columns to the roster.
+
+    Resolution is statewide (owners hold parcels in many counties), so the
+    whole roster is read; only the owner columns take part in matching.
+    """
+    if not Path(roster_path).exists():
+        print(f"Error: File not found at {roster_path}")
+        return None
+
+    df = read_roster(roster_path)
+    print(f"Resolving owners for {len(df)} properties...")
+    start = time.perf_counter()
+    df['owner_entity_id'], df['owner_entity_name'] = resolve_owners(
+        df['OWN_NAME'], df['OWN_ADDR1'], df['OWN_ZIPCD'], workers=workers)
+    print(f"Resolved in {time.perf_counter() - start:.1f}s")
+
+    # Largest portfolios, as a quick sanity check of the clustering
+    portfolios = (df.groupby('owner_entity_name')
+                    .agg(properties=('owner_entity_id', 'size'), names=('OWN_NAME', 'nunique'),
+                         units=('NO_RES_UNTS', 'sum'))
+                    .sort_values('units', ascending=False))
+    print(portfolios.head(10).to_string())
+
+    write_roster(df, output_path)
+    print(f"Saved roster with owner entities to {output_path}")
+    return df
+
+if __name__ == '__main__':
+    base_dir = Path(__file__).parent.parent
+    resolve_roster_owners(
+        roster_path=str(base_dir / 'data/processed/base_roster'),
+        output_path=str(base_dir / 'data/processed/owner_roster'),
+        workers=None  # one process per core
+    )
@@ -0,0 +1,70 @@
+import argparse
+import os
+import pandas as pd
+import sys
+import time
+from pathlib import Path
+
+# Add project root to path for imports
+sys.path.append(str(Path(__file__).parent.parent))
+
+from scripts.utils.county_lookup import COUNTY_NAMES
+from scripts.utils.roll_diff import CHANGE_KINDS, carry_geocodes, diff_rolls
+from scripts.utils.roster_store import read_roster, write_roster
+
+def diff_roll(current_path, previous_path, output_path, changes_path):
+    """Compare a new roll against the previous snapshot and carry its geocodes over.
+
+    Writes the change set (new/removed/changed properties, see
+    diff_rolls) to changes_path, and the current roster to output_path with
+    latitude/longitude/geocode_source copied from previous_path for every
+    property that still exists at the same address. The geocoding stages
+    only fill rows without coordinates, so after this they work on the
+    delta alone. With no previous snapshot every property is new.
+    """
+    if not Path(current_path).exists():
+        print(f"Error: File not found at {current_path}")
+        return None
+
+    current = read_roster(current_path)
+    if Path(previous_path).exists():
+        previous = read_roster(previous_path)
+    else:
+        print(f"No previous snapshot at {previous_path}; every property is new.")
+        previous = pd.DataFrame({'CO_NO': pd.Series(dtype='int64'), 'PARCEL_ID': pd.Series(dtype=object)})
+
+    start = time.perf_counter()
+    changes = diff_rolls(previous, current)
+    print(f"Compared {len(previous):,} previous and {len(current):,} current properties "
+          f"in {time.perf_counter() - start:.1f}s")
+
+    counts = changes.groupby(['CO_NO', 'change'], observed=False).size().unstack(fill_value=0)
+    for county_no, row in counts[counts.sum(axis=1) > 0].iterrows():
+        county_name = COUNTY_NAMES.get(county_no, str(county_no))
+        print(f"  {county_name}: " + ', '.join(f"{row[kind]} {kind}" for kind in CHANGE_KINDS))
+    totals = changes['change'].value_counts()
+    regeocode = int(((changes['change'] == 'new') | changes['address_changed']).sum())
+    print(f"Roll changes: " + ', '.join(f"{totals[kind]:,} {kind}" for kind in CHANGE_KINDS)
+          + f"; {regeocode:,} properties need geocoding")
+
+    changes_path = Path(changes_path)
+    changes_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = changes_path.with_name(changes_path.name + '.tmp')
+    changes.to_parquet(tmp, index=False)
+    os.replace(tmp, changes_path)
+
+    roster = carry_geocodes(current, previous, changes)
+    write_roster(roster, output_path)
+    print(f"Saved change set to {changes_path} and roster to {output_path}")
+    return changes
+
+if __name__ == '__main__':
+    base_dir = Path(__file__).parent.parent
+    processed = base_dir / 'data/processed'
+    parser = argparse.ArgumentParser(description='Diff two roster snapshots keyed on (CO_NO, PARCEL_ID).')
+    parser.add_argument('--current', default=str(processed / 'owner_roster'), help='new roll')
+    parser.add_argument('--previous', default=str(processed / 'geocoded'), help='snapshot to compare against')
+    parser.add_argument('--output', default=str(processed / 'roll_roster'), help='current roster with carried geocodes')
+    parser.add_argument('--changes', default=str(processed / 'roll_changes.parquet'), help='change set')
+    args = parser.parse_args()
+    diff_roll(args.current, args.previous, args.output, args.changes)
@@ -1,119 +1,193 @@
-import geopandas as gpd
+import numpy as np
+import os
 import pandas as pd
 import sys
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 from pathlib import Path
 
 # Add project root to path for imports
 sys.path.append(str(Path(__file__).parent.parent))
 
+from scripts.utils.centroid_store import id_columns, load_centroids
 from scripts.utils.county_lookup import COUNTY_NAMES
+from scripts.utils.metrics import metrics, timed_call
+from scripts.utils.parcel_keys import choose_parcel_key, normalize_parcel_ids
+from scripts.utils.roster_store import read_roster, write_roster
 
-def geocode_from_gis(roster_path, gis_dir, output_path):
-    """Join parcel centroids from county GIS shapefiles to base roster."""
+# Polygons sharing a parcel key further apart than this (in degrees, about
+# 500 m) are different parcels whose IDs collided after normalization
+AMBIGUOUS_KEY_DEGREES = 0.005
+
+def dedupe_parcel_keys(table):
+    """One centroid per (CO_NO, _PARCEL_KEY) so the join stays 1:1.
+
+    Multipart parcels repeat their ID with nearby centroids; those keys keep
+    their first centroid. Keys whose centroids spread further than
+    AMBIGUOUS_KEY_DEGREES are dropped, so their roster rows fall through to
+    the next geocoding tier rather than take another parcel's location.
+    Returns (table, repeated keys kept, ambiguous keys dropped).
+    """
+    keys = ['CO_NO', '_PARCEL_KEY']
+    duplicated = table.duplicated(subset=keys, keep=False)
+    if not duplicated.any():
+        return table, 0, 0
+    spread = table[duplicated].groupby(keys)[['_centroid_lat', '_centroid_lng']].agg(lambda s: s.max() - s.min())
+    ambiguous = (spread.max(axis=1) > AMBIGUOUS_KEY_DEGREES) | spread.isna().any(axis=1)
+    drop = pd.MultiIndex.from_frame(table[keys]).isin(spread.index[ambiguous])
+    table = table[~drop].drop_duplicates(subset=keys, keep='first')
+    return table, int((~ambiguous).sum()), int(ambiguous.sum())
+
+def county_centroids(county_no, gis_dir, cache_dir, roster_ids):
+    """Worker: centroid table for one county keyed on (CO_NO, _PARCEL_KEY).
+
+    The GIS ID column and canonical-key normalizer are chosen by measuring
+    overlap with the county's roster parcel IDs (roster_ids). Returns
+    (county_no, DataFrame or None, normalizer, message). Runs in worker
+    processes, so it must stay a module-level function.
+    """
+    county_name = COUNTY_NAMES.get(county_no, str(county_no))
+    try:
+        # Precomputed centroid table; the shapefile is only parsed when it is
+        # new or has changed since the last run
+        centroids = load_centroids(county_no, gis_dir, cache_dir)
+    except Exception as e:
+        return county_no, None, None, f"  Error reading shapefile for {county_name}: {e}"
+    
+    if centroids is None:
+        return county_no, None, None, f"  No GIS data directory found for {county_name} ({county_no})"
+    
+    parcel_col, normalizer, _ = choose_parcel_key(roster_ids, centroids, id_columns(centroids))
+    if parcel_col is None:
+        return county_no, None, None, f"  {county_name}: no GIS parcel ID column overlaps the roster"
+    
+    table = pd.DataFrame({
+        'CO_NO': county_no,
+        '_PARCEL_KEY': normalize_parcel_ids(centroids[parcel_col], normalizer),
+        '_centroid_lat': centroids['latitude'],
+        '_centroid_lng': centroids['longitude'],
+    })
+    table = table[table['_PARCEL_KEY'] != '']
+    table, repeated, ambiguous = dedupe_parcel_keys(table)
+    message = f"  {county_name}: keyed on GIS {parcel_col} ({normalizer})"
+    if repeated or ambiguous:
+        message += (f"; {repeated} repeated keys merged, "
+                    f"{ambiguous} ambiguous keys dropped (centroids over {AMBIGUOUS_KEY_DEGREES} deg apart)")
+    return county_no, table, normalizer, message
+
+def geocode_from_gis(roster_path, gis_dir, output_path, counties=None, cache_dir=None, workers=1):
+    """Join parcel centroids from county GIS shapefiles to base roster.
+
+    counties limits the run to those county numbers; only their partitions
+    are read from roster_path and rewritten in output_path.
+    Centroid tables are cached in cache_dir (default: gis_centroids/ next to output_path).
+    workers > 1 loads the county centroid tables in a process pool (None =
+    one per CPU core); they are then joined to the roster in one merge on
+    (CO_NO, canonical parcel key). Each county's key is normalized with the
+    GIS column and normalizer that overlap the roster best.
+    """
     
     if not Path(roster_path).exists():
         print(f"Error: Roster file not found at {roster_path}")
         return None
 
-    roster = pd.read_parquet(roster_path)
+    roster = read_roster(roster_path, counties=counties)
+    if cache_dir is None:
+        cache_dir = Path(output_path).parent / 'gis_centroids'
     
     # Initialize columns if they don't exist
-    for col in ['latitude', 'longitude', 'geocode_source']:
+    for col in ['latitude', 'longitude']:
         if col not in roster.columns:
-            roster[col] = None
+            roster[col] = np.nan
+        roster[col] = pd.to_numeric(roster[col], errors='coerce')
+    if 'geocode_source' not in roster.columns:
+        roster['geocode_source'] = None
     
-    gis_path = Path(gis_dir)
+    county_codes = roster['CO_NO'].astype(int)
+    # Counties whose rows all have coordinates (e.g. carried over from the
+    # previous roll) need no centroid table
+    missing = roster['latitude'].isna() | roster['longitude'].isna()
+    county_nos = sorted(county_codes[missing].unique())
+    roster_ids = [roster.loc[county_codes == c, 'PARCEL_ID'].to_numpy() for c in county_nos]
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = max(1, min(workers, len(county_nos)))
     
-    for county_no in roster['CO_NO'].unique():
-        county_name = COUNTY_NAMES.get(county_no, str(county_no))
-        
-        # Find matching shapefile (naming varies by county)
-        # Look for subdirectories first
-        shp_files = list(gis_path.glob(f'*{county_no}*/*.shp')) + \
-                    list(gis_path.glob(f'*{county_name.lower()}*/*.shp')) + \
-                    list(gis_path.glob(f'*{county_name}*/*.shp'))
-        
-        if not shp_files:
-            print(f"  No GIS data directory found for {county_name} ({county_no})")
-            continue
-        
-        try:
-            parcels_gis = gpd.read_file(shp_files[0])
-        except Exception as e:
-            print(f"  Error reading shapefile for {county_name}: {e}")
-            continue
-        
-        # Standardize parcel ID column name
-        parcel_col = None
-        for candidate in ['PARCELNO', 'PARCEL_ID', 'FOLIO', 'PIN', 'PARCEL', 'STRAP']:
-            # Case insensitive check
-            match = next((col for col in parcels_gis.columns if col.upper() == candidate), None)
-            if match:
-                parcel_col = match
-                break
-        
-        if not parcel_col:
-            print(f"  Cannot find parcel ID column in {county_name} GIS data. Columns: {parcels_gis.columns.tolist()[:5]}...")
-            continue
-        
-        # Re-project to WGS84 (Lat/Lon) if needed
-        if parcels_gis.crs and parcels_gis.crs.to_epsg() != 4326:
-            parcels_gis = parcels_gis.to_crs(epsg=4326)
-        
-        # Calculate centroids
-        parcels_gis['_centroid_lat'] = parcels_gis.geometry.centroid.y
-        parcels_gis['_centroid_lng'] = parcels_gis.geometry.centroid.x
-        
-        # Create lookup dictionary (Parcel ID -> (Lat, Lng))
-        # Ensure parcel IDs are strings and stripped
-        parcels_gis['clean_pid'] = parcels_gis[parcel_col].astype(str).str.strip()
-        gis_lookup = parcels_gis.set_index('clean_pid')[['_centroid_lat', '_centroid_lng']].to_dict('index')
-        
-        # Update roster for this county
-        county_mask = roster['CO_NO'] == county_no
-        
-        def get_lat_lng(pid):
-            clean_pid = str(pid).strip()
-            if clean_pid in gis_lookup:
-                val = gis_lookup[clean_pid]
-                return val['_centroid_lat'], val['_centroid_lng'], 'county_gis'
-            return None, None, None
-
-        # Apply mapping
-        # This can be slow; for large datasets, a merge is faster.
-        # But doing it iteratively per county to handle memory.
-        
-        # Let's do a merge for speed on the slice
-        county_df = roster.loc[county_mask].copy()
-        county_df['PARCEL_ID_CLEAN'] = county_df['PARCEL_ID'].astype(str).str.strip()
-        
-        # Prepare GIS DF for merge
-        gis_merge = parcels_gis[['clean_pid', '_centroid_lat', '_centroid_lng']].rename(
-            columns={'clean_pid': 'PARCEL_ID_CLEAN'}
-        )
-        
-        merged = county_df.merge(gis_merge, on='PARCEL_ID_CLEAN', how='left')
-        
-        # Update original roster using index
-        roster.loc[county_mask, 'latitude'] = roster.loc[county_mask, 'latitude'].fillna(merged['_centroid_lat'].values)
-        roster.loc[county_mask, 'longitude'] = roster.loc[county_mask, 'longitude'].fillna(merged['_centroid_lng'].values)
+    tables = []
+    normalizers = {}
+    args = (county_nos, [gis_dir] * len(county_nos), [str(cache_dir)] * len(county_nos), roster_ids)
+    # Workers send their timing back with each table for the run report
+    load_county = partial(timed_call, county_centroids)
+    if workers == 1:
+        results = map(load_county, *args)
+        pool = None
+    else:
+        print(f"Loading GIS centroids for {len(county_nos)} counties with {workers} worker processes...")
+        pool = ProcessPoolExecutor(max_workers=workers)
+        results = pool.map(load_county, *args)
+    try:
+        for ids, ((county_no, table, normalizer, message), seconds, peak_mb) in zip(roster_ids, results):
+            metrics.record(f'gis.county.{county_no}', seconds, rows_in=len(ids),
+                           rows_out=None if table is None else len(table), peak_rss_mb=peak_mb)
+            if message:
+                print(message)
+            if table is not None:
+                tables.append(table)
+                normalizers[county_no] = normalizer
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    
+    if tables:
+        lookup = pd.concat(tables, ignore_index=True)
+        
+        # Canonical roster keys, using each county's chosen normalizer
+        roster_keys = pd.Series('', index=roster.index, dtype=object)
+        for county_no, normalizer in normalizers.items():
+            in_county = county_codes == county_no
+            roster_keys[in_county] = normalize_parcel_ids(roster.loc[in_county, 'PARCEL_ID'], normalizer)
+        
+        # Single hashed join for all counties. The left merge keeps roster row
+        # order, and the results are re-attached by label via roster.index,
+        # so a non-contiguous index is handled correctly.
+        keys = pd.DataFrame({
+            'CO_NO': county_codes.to_numpy(),
+            '_PARCEL_KEY': roster_keys.to_numpy(),
+        })
+        merged = keys.merge(lookup, on=['CO_NO', '_PARCEL_KEY'], how='left', validate='many_to_one')
+        gis_lat = pd.Series(merged['_centroid_lat'].to_numpy(), index=roster.index)
+        gis_lng = pd.Series(merged['_centroid_lng'].to_numpy(), index=roster.index)
+        
+        # Tier 1 fills only rows without coordinates
+        missing = roster['latitude'].isna() | roster['longitude'].isna()
+        fill = missing & gis_lat.notna() & gis_lng.notna()
+        roster.loc[fill, 'latitude'] = gis_lat[fill]
+        roster.loc[fill, 'longitude'] = gis_lng[fill]
         
         # Set source only where we found a match and it wasn't already set
-        # (Though here we are overwriting or filling na, logic depends on precedence. Tier 1 has highest precedence)
-        updated_mask = county_mask & (roster['latitude'].notna()) & (roster['geocode_source'].isna())
+        updated_mask = fill & roster['geocode_source'].isna()
         roster.loc[updated_mask, 'geocode_source'] = 'county_gis'
         
-        match_count = merged['_centroid_lat'].notna().sum()
-        print(f"  {county_name}: {match_count}/{county_mask.sum()} matched via GIS")
+        # Match rate per county with GIS data, over the rows this stage had to
+        # geocode (rows carried in with coordinates are not counted)
+        matched = (gis_lat.notna() & gis_lng.notna())[missing]
+        matched = matched.groupby(county_codes[missing].to_numpy()).agg(['sum', 'count'])
+        with_gis = set(lookup['CO_NO'].unique())
+        for county_no, row in matched.iterrows():
+            if county_no in with_gis:
+                county_name = COUNTY_NAMES.get(county_no, str(county_no))
+                print(f"  {county_name}: {row['sum']}/{row['count']} matched via GIS ({row['sum'] / row['count']:.1%})")
+        print(f"GIS matches: {fill.sum()} of {len(roster)} properties")
     
-    roster.to_parquet(output_path, index=False)
+    write_roster(roster, output_path, counties=counties)
     print(f"Saved geocoded roster to {output_path}")
     return roster
 
 if __name__ == '__main__':
     base_dir = Path(__file__).parent.parent
     geocode_from_gis(
-        roster_path=str(base_dir / 'data/processed/base_roster.parquet'),
+        roster_path=str(base_dir / 'data/processed/roll_roster'),
         gis_dir=str(base_dir / 'data/raw/dor_gis'),
-        output_path=str(base_dir / 'data/processed/geocoded.parquet')
+        output_path=str(base_dir / 'data/processed/geocoded_gis'),
+        workers=None  # one process per county shapefile, up to the core count
     )
@@ -0,0 +1,112 @@
+from pathlib import Path
+import shutil
+import sys
+import time
+
+# Add project root to path for imports
+sys.path.append(str(Path(__file__).parent.parent))
+
+from scripts.utils.address_store import AddressStore, build_address_store
+from scripts.utils.county_lookup import COUNTY_FIPS, STATE_FIPS
+from scripts.utils.fingerprint import file_fingerprint, load_manifest, save_manifest
+from scripts.utils.roster_store import read_roster, write_roster
+
+TIGER_YEAR = 2024
+
+def tiger_addrfeat_url(county_no, year=TIGER_YEAR):
+    """Census download URL of a county's TIGER/Line ADDRFEAT (address range) file."""
+    return (f'https://www2.census.gov/geo/tiger/TIGER{year}/ADDRFEAT/'
+            f'tl_{year}_{STATE_FIPS}{COUNTY_FIPS[county_no]}_addrfeat.zip')
+
+def address_sources(tiger_dir, points_dir):
+    """ADDRFEAT files (zip or shp) and address-point files (csv/parquet) on disk."""
+    tiger_files = sorted(Path(tiger_dir).glob('*addrfeat*.zip')) + sorted(Path(tiger_dir).glob('*addrfeat*.shp'))
+    point_files = sorted(Path(points_dir).glob('*.csv')) + sorted(Path(points_dir).glob('*.parquet'))
+    return tiger_files, point_files
+
+def ensure_address_store(store_path, tiger_dir, points_dir):
+    """Build the address store if it is missing or its source files changed.
+
+    Source fingerprints are kept in a JSON sidecar next to the store.
+    Returns False if there are no source files to build from.
+    """
+    store_path = Path(store_path)
+    meta_path = store_path.with_suffix('.json')
+    tiger_files, point_files = address_sources(tiger_dir, points_dir)
+    if not tiger_files and not point_files:
+        return store_path.exists()
+
+    meta = load_manifest(meta_path)
+    previous = meta.get('sources', {})
+    sources = {str(f): file_fingerprint(f, previous.get(str(f))) for f in tiger_files + point_files}
+    hashes = lambda fps: {k: v['sha256'] for k, v in fps.items()}
+    if store_path.exists() and hashes(sources) == hashes(previous):
+        if sources != previous:
+            save_manifest(meta_path, {**meta, 'sources': sources})
+        return True
+
+    print(f"Building address store from {len(tiger_files)} TIGER files and {len(point_files)} address-point files...")
+    ranges, points = build_address_store(store_path, tiger_files, point_files)
+    save_manifest(meta_path, {'sources': sources, 'ranges': ranges, 'points': points})
+    return True
+
+def geocode_offline(roster_path, output_path, store_path, counties=None):
+    """Fill missing coordinates from the local address store (no network).
+
+    Runs between the county GIS tier and the Census tier. Exact address
+    points are tagged 'address_point', interpolated TIGER ranges 'tiger_range'.
+    """
+    if not Path(roster_path).exists():
+        print(f"Error: File not found at {roster_path}")
+        return None
+    if not Path(store_path).exists():
+        print(f"Error: Address store not found at {store_path}")
+        return None
+
+    df = read_roster(roster_path, counties=counties)
+    for col in ['latitude', 'longitude', 'geocode_source']:
+        if col not in df.columns:
+            df[col] = None
+
+    missing_mask = df['latitude'].isna() | df['longitude'].isna()
+    to_geocode = df[missing_mask]
+    print(f"Found {len(to_geocode)} properties missing coordinates.")
+
+    if len(to_geocode) > 0:
+        start = time.perf_counter()
+        with AddressStore(store_path) as store:
+            located = store.geocode(to_geocode['PHY_ADDR1'], to_geocode['PHY_ZIPCD'])
+        elapsed = time.perf_counter() - start
+
+        hit = located['match'].notna()
+        df.loc[located.index[hit], 'latitude'] = located.loc[hit, 'latitude'].astype(float)
+        df.loc[located.index[hit], 'longitude'] = located.loc[hit, 'longitude'].astype(float)
+        df.loc[located.index[hit], 'geocode_source'] = located.loc[hit, 'match'].map(
+            {'point': 'address_point', 'range': 'tiger_range'})
+
+        counts = located['match'].value_counts()
+        print(f"Offline matches: {hit.sum()} of {len(to_geocode)} "
+              f"({counts.get('point', 0)} address points, {counts.get('range', 0)} interpolated ranges) "
+              f"in {elapsed:.1f}s ({len(to_geocode) / max(elapsed, 1e-9):,.0f} addresses/s)")
+
+    write_roster(df, output_path, counties=counties)
+    print(f"Saved updated roster to {output_path}")
+    return df
+
+if __name__ == '__main__':
+    base_dir = Path(__file__).parent.parent
+    store_path = base_dir / 'data/processed/address_store.sqlite'
+    # ADDRFEAT zips come from tiger_addrfeat_url(county_no); address points
+    # from OpenAddresses or county exports (number, street, zip, lat, lon)
+    if ensure_address_store(store_path,
+                            tiger_dir=base_dir / 'data/raw/tiger',
+                            points_dir=base_dir / 'data/raw/address_points'):
+        geocode_offline(
+            roster_path=str(base_dir / 'data/processed/geocoded_gis'),
+            output_path=str(base_dir / 'data/processed/geocoded_offline'),
+            store_path=str(store_path)
+        )
+    else:
+        print("No address store or source files; passing the roster through.")
+        shutil.rmtree(base_dir / 'data/processed/geocoded_offline', ignore_errors=True)
+        shutil.copytree(base_dir / 'data/processed/geocoded_gis', base_dir / 'data/processed/geocoded_offline')
@@ -1,25 +1,39 @@
-import requests
 import pandas as pd
-import io
-import time
 import sys
 from pathlib import Path
 
 # Add project root to path for imports
 sys.path.append(str(Path(__file__).parent.parent))
 
-CENSUS_URL = 'https://geocoding.geo.census.gov/geocoder/geographies/addressbatch'
+from scripts.utils.address import address_keys
+from scripts.utils.census_client import CENSUS_URL, geocode_batches
+from scripts.utils.geocode_cache import GeocodeCache
+from scripts.utils.geocode_journal import JOURNAL_COLS, GeocodeJournal
+from scripts.utils.roster_store import read_roster, write_roster
 
-def geocode_census_batch(roster_path, output_path, batch_size=500):
+def geocode_census_batch(roster_path, output_path, batch_size=500, counties=None,
+                         concurrency=4, census_url=CENSUS_URL, cache_path='auto', journal_path='auto'):
     """Geocode addresses using US Census Bureau batch geocoder.
     Max 10,000 addresses per batch officially, but smaller batches are more reliable.
+    batch_size is the starting size; it adapts to observed latency and errors
+    while `concurrency` batches are in flight (see geocode_batches).
+    counties limits the run (and the partitions rewritten) to those county numbers.
+    Results are cached by normalized address in a SQLite file (cache_path;
+    'auto' = geocode_cache.sqlite next to output_path, None disables it).
+    Completed batches are checkpointed to journal_path ('auto' =
+    census_journal.jsonl next to output_path) so an interrupted run resumes
+    where it stopped; the journal is deleted after the roster is written.
     """
     
     if not Path(roster_path).exists():
         print(f"Error: File not found at {roster_path}")
         return None
 
-    df = pd.read_parquet(roster_path)
+    df = read_roster(roster_path, counties=counties)
+    if cache_path == 'auto':
+        cache_path = Path(output_path).parent / 'geocode_cache.sqlite'
+    if journal_path == 'auto':
+        journal_path = Path(output_path).parent / 'census_journal.jsonl'
     
     # Initialize columns if they don't exist
     for col in ['latitude', 'longitude', 'geocode_source']:
@@ -33,102 +47,109 @@ def geocode_census_batch(roster_path, output_path, batch_size=500):
     print(f"Found {len(to_geocode)} properties missing coordinates.")
     
     if len(to_geocode) == 0:
+        # Still publish the roster: the next stage reads output_path
+        write_roster(df, output_path, counties=counties)
+        print(f"Saved updated roster to {output_path}")
         return df
 
-    results = []
+    # Normalized address keys: consult the on-disk cache before any network call
+    to_geocode['address_key'] = address_keys(to_geocode['PHY_ADDR1'], to_geocode['PHY_CITY'], to_geocode['PHY_ZIPCD'])
+    # No street, nothing to look up: keep them out of the cache, journal and batches
+    no_street = to_geocode['address_key'] == ''
+    if no_street.any():
+        print(f"Skipping {no_street.sum()} properties without a street address.")
+        to_geocode = to_geocode[~no_street]
+    cache = GeocodeCache(cache_path) if cache_path else None
+    journal = GeocodeJournal(journal_path) if journal_path else None
+    found = pd.DataFrame(columns=['address_key', 'latitude', 'longitude', 'source'])
+    to_send = to_geocode
     
-    # Prepare data for census format: ID, Street, City, State, ZIP
-    # We need a temporary unique ID for the batch
-    to_geocode['temp_id'] = range(len(to_geocode))
-    
-    for start in range(0, len(to_geocode), batch_size):
-        batch = to_geocode.iloc[start:start + batch_size]
-        print(f"  Processing batch {start}-{start+len(batch)}...")
-        
-        # Create CSV buffer
-        # Columns: ID, Street, City, State, ZIP
-        batch_csv = batch[['temp_id', 'PHY_ADDR1', 'PHY_CITY', 'OWN_STATE', 'PHY_ZIPCD']].copy()
-        # Ensure state is FL (PHY_ADDR doesn't have state col in this extraction usually, assume FL)
-        # Wait, previous script constructed FULL_ADDRESS but individual cols exist.
-        # PHY_CITY is present. State is FL.
-        batch_csv['State'] = 'FL'
+    try:
+        if cache is not None:
+            evicted = cache.evict_expired()
+            cached = cache.lookup(to_geocode['address_key'])
+            hit = to_send['address_key'].isin(cached['address_key'])
+            print(f"Geocode cache: {hit.sum()} rows answered ({cached['latitude'].notna().sum()} matched addresses, "
+                  f"{cached['latitude'].isna().sum()} known misses), {evicted} expired entries evicted")
+            found = cached[cached['latitude'].notna()]
+            to_send = to_send[~hit]
         
-        # Rename for clarity (though csv structure matters, not headers)
-        submit_df = batch_csv[['temp_id', 'PHY_ADDR1', 'PHY_CITY', 'State', 'PHY_ZIPCD']]
+        # Resume: batches answered by an interrupted run are not sent again
+        answers = journal.load() if journal is not None else pd.DataFrame(columns=JOURNAL_COLS)
+        if not answers.empty:
+            done = to_send['address_key'].isin(answers['address_key'])
+            print(f"Resuming from {journal_path}: {done.sum()} rows already answered")
+            to_send = to_send[~done]
         
-        csv_buffer = io.StringIO()
-        submit_df.to_csv(csv_buffer, index=False, header=False)
-        csv_data = csv_buffer.getvalue()
+        # Geocode each distinct address once; results fan back out via address_key
+        pending = len(to_send)
+        to_send = to_send.drop_duplicates(subset='address_key')
+        if pending > 0:
+            print(f"Deduplicated {pending} rows to {len(to_send)} unique addresses "
+                  f"({pending / max(len(to_send), 1):.2f} rows per request)")
         
-        try:
-            response = requests.post(
-                CENSUS_URL,
-                files={'addressFile': ('batch.csv', csv_data, 'text/csv')},
-                data={'benchmark': 'Public_AR_Current', 'vintage': 'Current_Current'},
-                timeout=120
-            )
+        if len(to_send) > 0:
+            to_send = to_send.copy()
+            # Prepare data for census format: ID, Street, City, State, ZIP
+            # We need a temporary unique ID for the batch
+            to_send['temp_id'] = range(len(to_send))
+            temp_keys = to_send.set_index('temp_id')['address_key']
+            # PHY_ADDR doesn't have a state col in this extraction; all properties are in FL
+            addresses = pd.DataFrame({
+                'id': to_send['temp_id'].to_numpy(),
+                'street': to_send['PHY_ADDR1'].to_numpy(),
+                'city': to_send['PHY_CITY'].to_numpy(),
+                'state': 'FL',
+                'zip': to_send['PHY_ZIPCD'].to_numpy(),
+            })
             
-            if response.status_code == 200:
-                # Response format: "id, input_addr, match_flag, match_type, matched_addr, lon,lat, ..."
-                # Note: Census returns lon,lat (x,y)
-                result_df = pd.read_csv(
-                    io.StringIO(response.text),
-                    header=None,
-                    names=['id', 'input_addr', 'match_flag', 'match_type', 
-                           'matched_addr', 'lonlat', 'tiger_id', 'side',
-                           'state_fips', 'county_fips', 'tract', 'block'],
-                    on_bad_lines='skip'
-                )
-                
-                matched = result_df[result_df['match_flag'] == 'Match'].copy()
-                if not matched.empty:
-                    # Split lon,lat
-                    matched[['longitude', 'latitude']] = matched['lonlat'].str.split(',', expand=True).astype(float)
-                    results.append(matched[['id', 'latitude', 'longitude']])
-            else:
-                print(f"    Error: Status {response.status_code}")
-                
-        except Exception as e:
-            print(f"    Exception: {e}")
+            def checkpoint(batch_answers):
+                journal.append(batch_answers.assign(address_key=batch_answers['id'].map(temp_keys)))
             
-        time.sleep(1) # Rate limit courtesy
+            fresh = geocode_batches(addresses, url=census_url, concurrency=concurrency, batch_size=batch_size,
+                                    on_batch=checkpoint if journal is not None else None)
+            fresh['address_key'] = fresh['id'].map(temp_keys)
+            answers = pd.concat([answers, fresh[JOURNAL_COLS]], ignore_index=True)
         
+        if cache is not None:
+            # Store matches and misses; addresses from dropped batches stay uncached
+            cache.store(answers, source='census')
+        matched = answers[answers['latitude'].notna()].assign(source='census')
+        found = pd.concat([found, matched[found.columns]], ignore_index=True)
+    finally:
+        if cache is not None:
+            cache.close()
+        if journal is not None:
+            journal.close()
+    
     # Update main dataframe
-    if results:
-        all_matches = pd.concat(results, ignore_index=True)
-        # Join back on temp_id
-        # We need to map temp_id back to the original index
-        
-        # Create a mapping dictionary from results
-        lat_map = all_matches.set_index('id')['latitude'].to_dict()
-        lon_map = all_matches.set_index('id')['longitude'].to_dict()
-        
-        # Apply to to_geocode first using map on temp_id
-        to_geocode['new_lat'] = to_geocode['temp_id'].map(lat_map)
-        to_geocode['new_lon'] = to_geocode['temp_id'].map(lon_map)
+    if not found.empty:
+        # Join back on the address key
+        found = found.drop_duplicates(subset='address_key').set_index('address_key')
+        new_lat = to_geocode['address_key'].map(found['latitude']).astype(float)
+        new_lon = to_geocode['address_key'].map(found['longitude']).astype(float)
+        new_source = to_geocode['address_key'].map(found['source'])
         
-        # Now update original df
-        # Iterate or use update.
-        # Using index alignment
-        df.loc[to_geocode.index, 'latitude'] = df.loc[to_geocode.index, 'latitude'].fillna(to_geocode['new_lat'])
-        df.loc[to_geocode.index, 'longitude'] = df.loc[to_geocode.index, 'longitude'].fillna(to_geocode['new_lon'])
+        # Now update original df using index alignment
+        df.loc[to_geocode.index, 'latitude'] = df.loc[to_geocode.index, 'latitude'].fillna(new_lat)
+        df.loc[to_geocode.index, 'longitude'] = df.loc[to_geocode.index, 'longitude'].fillna(new_lon)
         
         # Update source
         updated_mask = df['latitude'].notna() & df['geocode_source'].isna()
-        df.loc[updated_mask, 'geocode_source'] = 'census'
+        df.loc[updated_mask, 'geocode_source'] = new_source.reindex(df.index)[updated_mask]
         
-        print(f"Total new matches: {len(all_matches)}")
+        print(f"Total new matches: {new_lat.notna().sum()}")
     
-    df.to_parquet(output_path, index=False)
+    write_roster(df, output_path, counties=counties)
     print(f"Saved updated roster to {output_path}")
+    if journal is not None:
+        # Everything in the journal is now merged into the roster (and cache)
+        journal.remove()
     return df
 
 if __name__ == '__main__':
     base_dir = Path(__file__).parent.parent
     geocode_census_batch(
-        roster_path=str(base_dir / 'data/processed/geocoded.parquet'), # Input: output of prev step
-        output_path=str(base_dir / 'data/processed/geocoded.parquet')  # Overwrite or separate? Plan implies separate but usually strictly cumulative.
-        # Let's overwrite to keep it simple, or use distinct filenames if debugging. 
-        # The script input was 'geocoded.parquet' in the call, assuming it exists?
-        # Actually in the plan, Tier 1 produces 'geocoded.parquet'. Tier 2 should probably refine it.
+        roster_path=str(base_dir / 'data/processed/geocoded_offline'),  # output of the offline tier
+        output_path=str(base_dir / 'data/processed/geocoded')  # separate, so a rerun starts from the same input
     )
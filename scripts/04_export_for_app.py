@@ -1,17 +1,138 @@
 import pandas as pd
+import numpy as np
 import json
 import shutil
+import sys
 from pathlib import Path
 
-def export_for_app(input_path, output_path):
-    """Export geocoded roster to app public folder."""
+# Add project root to path for imports
+sys.path.append(str(Path(__file__).parent.parent))
+
+from scripts.utils.columnar import FORMAT_VERSION, content_hash, encode_columnar
+from scripts.utils.fingerprint import save_manifest
+from scripts.utils.roster_store import read_roster, roster_columns
+
+# Select columns for frontend
+EXPORT_COLS = [
+    'PARCEL_ID', 'COUNTY_NAME', 'PHY_ADDR1', 'PHY_CITY', 'PHY_ZIPCD',
+    'NO_RES_UNTS', 'ACT_YR_BLT', 'OWN_NAME', 'latitude', 'longitude',
+    'SALE_PRC1', 'SALE_YR1', 'JV', 'TOT_LVG_AREA'
+]
+
+# Columnar export: low-cardinality strings are dictionary-encoded, numbers typed
+DICTIONARY_FIELDS = ['county', 'city', 'zip', 'owner', 'owner_entity']
+NUMERIC_FIELDS = ['units', 'year', 'latitude', 'longitude', 'sale_price', 'sale_year', 'value', 'sqft']
+
+def write_columnar(final_df, manifest_path):
+    """Write the columnar payload under a content-hashed name plus its manifest.
+
+    The payload (properties.<hash>.bin) never changes under a given name, so
+    browsers can cache it indefinitely; only the small manifest needs to be
+    revalidated. Payloads from earlier exports are removed.
+    """
+    manifest_path = Path(manifest_path)
+    payload, columns = encode_columnar(final_df, dictionary_cols=DICTIONARY_FIELDS, float_cols=NUMERIC_FIELDS)
+    data_name = f'properties.{content_hash(payload)}.bin'
+    manifest_path.parent.mkdir(parents=True, exist_ok=True)
+    (manifest_path.parent / data_name).write_bytes(payload)
+    save_manifest(manifest_path, {
+        'version': FORMAT_VERSION,
+        'file': data_name,
+        'rows': len(final_df),
+        'columns': columns,
+    })
+    for old in manifest_path.parent.glob('properties.*.bin'):
+        if old.name != data_name:
+            old.unlink()
+    print(f"Wrote {data_name} ({len(payload) / 1e6:.1f} MB) and {manifest_path.name}")
+
+# Rollups: lower edges of the unit-size buckets (aligned with the Min Units
+# slider stops) and the unit threshold the owner rankings are computed at
+UNIT_BUCKET_EDGES = [0, 10, 20, 50, 100, 200, 500]
+OWNER_MIN_UNITS = 10
+TOP_OWNERS = 100
+
+def build_rollups(final_df, top_n=TOP_OWNERS):
+    """Pre-aggregate the analytics view: (cube, owners) as JSON-ready dicts.
+
+    cube rows are [county, unit bucket index, decade built or None,
+    properties, units]. owners maps each county (and 'All Counties') to its
+    top_n owners by units among properties with >= OWNER_MIN_UNITS units, as
+    [owner, units, properties]. Owners are resolved entities when the roster
+    has them (01b_resolve_owners.py), raw names otherwise. Missing values
+    follow the app: an empty entity falls back to the raw name, then
+    'Unknown'; missing units and years count as 0.
+    """
+    owner = final_df['owner'].astype(object)
+    if 'owner_entity' in final_df:
+        # Same as AnalyticsView's `d.owner_entity || d.owner || 'Unknown'`
+        entity = final_df['owner_entity'].astype(object)
+        owner = entity.where(entity.notna() & (entity != ''), owner)
+    df = pd.DataFrame({
+        'county': final_df['county'].astype(object).where(final_df['county'].notna() & (final_df['county'] != ''), 'Unknown'),
+        'owner': owner.where(owner.notna() & (owner != ''), 'Unknown'),
+        'units': pd.to_numeric(final_df['units'], errors='coerce').fillna(0).astype('int64'),
+        'year': pd.to_numeric(final_df['year'], errors='coerce').fillna(0),
+    })
+    df['bucket'] = np.searchsorted(UNIT_BUCKET_EDGES, df['units'].to_numpy(), side='right') - 1
+    df['bucket'] = df['bucket'].clip(lower=0)
+    df['decade'] = (df['year'] // 10 * 10).astype('int64').where(df['year'] > 0, -1)
+
+    cube = (df.groupby(['county', 'bucket', 'decade'], sort=True)
+              .agg(properties=('units', 'size'), units=('units', 'sum'))
+              .reset_index())
+    cube_rows = [[county, int(bucket), None if decade < 0 else int(decade), int(n), int(units)]
+                 for county, bucket, decade, n, units in cube.itertuples(index=False)]
+
+    eligible = df[df['units'] >= OWNER_MIN_UNITS]
+    by_owner = (eligible.groupby(['county', 'owner'], sort=False)
+                        .agg(units=('units', 'sum'), properties=('units', 'size'))
+                        .reset_index())
+    statewide = (eligible.groupby('owner', sort=False)
+                         .agg(units=('units', 'sum'), properties=('units', 'size'))
+                         .reset_index()
+                         .assign(county='All Counties'))
+    ranked = pd.concat([statewide, by_owner], ignore_index=True)
+    ranked = ranked.sort_values(['county', 'units', 'owner'], ascending=[True, False, True], kind='mergesort')
+    ranked = ranked.groupby('county', sort=False).head(top_n)
+    owners = {county: [[owner, int(units), int(n)] for owner, units, n in group[['owner', 'units', 'properties']].itertuples(index=False)]
+              for county, group in ranked.groupby('county', sort=True)}
+
+    return (
+        {'unit_bucket_edges': UNIT_BUCKET_EDGES, 'rows': cube_rows},
+        {'min_units': OWNER_MIN_UNITS, 'top_n': top_n, 'counties': owners},
+    )
+
+def write_rollups(final_df, rollup_dir, top_n=TOP_OWNERS):
+    """Write cube.json and owners.json into rollup_dir."""
+    cube, owners = build_rollups(final_df, top_n)
+    rollup_dir = Path(rollup_dir)
+    for name, payload in [('cube.json', cube), ('owners.json', owners)]:
+        tmp = rollup_dir / (name + '.tmp')
+        rollup_dir.mkdir(parents=True, exist_ok=True)
+        with open(tmp, 'w') as f:
+            json.dump(payload, f, separators=(',', ':'))
+        tmp.replace(rollup_dir / name)
+    print(f"Wrote rollups to {rollup_dir} ({len(cube['rows'])} cube cells, {len(owners['counties'])} owner lists)")
+
+def export_for_app(input_path, output_path, counties=None, format='columnar'):
+    """Export geocoded roster to app public folder.
+
+    counties restricts the export to those county numbers; only their
+    partitions and the exported columns are read. format='columnar' writes
+    output_path as a manifest next to a content-hashed binary payload (see
+    scripts/utils/columnar.py); format='json' writes row-oriented JSON records.
+    Rollups for the analytics view go to a rollups/ folder next to output_path.
+    """
     
     if not Path(input_path).exists():
         print(f"Error: {input_path} not found.")
         return
 
     print(f"Reading {input_path}...")
-    df = pd.read_parquet(input_path)
+    # Resolved owner entities are exported when the roster has them
+    entity_cols = [c for c in ['owner_entity_name'] if c in roster_columns(input_path)]
+    df = read_roster(input_path, counties=counties, columns=EXPORT_COLS + entity_cols)
     
     # Filter for valid coordinates
     # Ensure they are numeric
@@ -29,13 +150,6 @@ def export_for_app(input_path, output_path):
         # Or just return
         return
 
-    # Select columns for frontend
-    cols = [
-        'PARCEL_ID', 'COUNTY_NAME', 'PHY_ADDR1', 'PHY_CITY', 'PHY_ZIPCD',
-        'NO_RES_UNTS', 'ACT_YR_BLT', 'OWN_NAME', 'latitude', 'longitude',
-        'SALE_PRC1', 'SALE_YR1', 'JV', 'TOT_LVG_AREA'
-    ]
-    
     # Rename for lighter JSON keys if desired, or keep as is.
     # Let's keep simpler keys
     rename_map = {
@@ -50,20 +164,24 @@ def export_for_app(input_path, output_path):
         'SALE_PRC1': 'sale_price',
         'SALE_YR1': 'sale_year',
         'JV': 'value',
-        'TOT_LVG_AREA': 'sqft'
+        'TOT_LVG_AREA': 'sqft',
+        'owner_entity_name': 'owner_entity'
     }
     
-    final_df = export_df[cols].rename(columns=rename_map)
+    final_df = export_df[EXPORT_COLS + entity_cols].rename(columns=rename_map)
     
-    # Save as JSON
-    # Orient 'records' saves a list of objects
     print(f"Exporting to {output_path}...")
-    final_df.to_json(output_path, orient='records')
+    if format == 'columnar':
+        write_columnar(final_df, output_path)
+    else:
+        # Orient 'records' saves a list of objects
+        final_df.to_json(output_path, orient='records')
+    write_rollups(final_df, Path(output_path).parent / 'rollups')
     print("Done.")
 
 if __name__ == '__main__':
     base_dir = Path(__file__).parent.parent
     export_for_app(
-        input_path=str(base_dir / 'data/processed/geocoded.parquet'),
-        output_path=str(base_dir / 'app/public/properties.json')
+        input_path=str(base_dir / 'data/processed/geocoded'),
+        output_path=str(base_dir / 'app/public/properties.manifest.json')
     )
@@ -0,0 +1,191 @@
+import pandas as pd
+import numpy as np
+import gzip
+import json
+import os
+import shutil
+import sqlite3
+import sys
+from pathlib import Path
+
+# Add project root to path for imports
+sys.path.append(str(Path(__file__).parent.parent))
+
+from scripts.utils.mvt import EXTENT, encode_tile
+from scripts.utils.roster_store import read_roster
+
+# Roster columns carried on individual points, renamed as in the app export
+TILE_FIELDS = {
+    'PARCEL_ID': 'id',
+    'COUNTY_NAME': 'county',
+    'PHY_ADDR1': 'address',
+    'PHY_CITY': 'city',
+    'PHY_ZIPCD': 'zip',
+    'NO_RES_UNTS': 'units',
+    'ACT_YR_BLT': 'year',
+    'TOT_LVG_AREA': 'sqft',
+    'OWN_NAME': 'owner',
+    'JV': 'value',
+    'SALE_PRC1': 'sale_price',
+    'SALE_YR1': 'sale_year',
+}
+INT_FIELDS = ['units', 'year', 'sqft', 'value', 'sale_price', 'sale_year']
+
+LAYER = 'properties'
+TILE_SIZE = 256
+# Grid cell for clustering, in pixels of a 256px tile (8x8 cells per tile)
+CLUSTER_CELL_PX = 32
+MAX_LAT = 85.05112878
+
+def to_world(lon, lat):
+    """Web Mercator coordinates in 0..1 (x east, y south)."""
+    lat = np.clip(lat, -MAX_LAT, MAX_LAT)
+    x = (lon + 180.0) / 360.0
+    y = (1.0 - np.log(np.tan(np.radians(lat)) + 1.0 / np.cos(np.radians(lat))) / np.pi) / 2.0
+    return x, y
+
+def _point_props(row):
+    props = {}
+    for name in TILE_FIELDS.values():
+        v = row[name]
+        if pd.isna(v):
+            continue
+        props[name] = int(v) if name in INT_FIELDS else (float(v) if isinstance(v, (float, np.floating)) else str(v))
+    return props
+
+def zoom_features(points, records, zoom, max_zoom, cell_px=CLUSTER_CELL_PX):
+    """Features for one zoom level as {(x, y): [(tx, ty, props), ...]}.
+
+    Below max_zoom, points falling in the same grid cell are merged into a
+    cluster at their mean position with point_count and summed units; cells
+    holding a single property keep the full point. At max_zoom every
+    property is its own point. records holds each point's properties.
+    """
+    scale = TILE_SIZE * 2 ** zoom
+    px = points['wx'].to_numpy() * scale
+    py = points['wy'].to_numpy() * scale
+
+    cells = pd.DataFrame({
+        'px': px, 'py': py,
+        'units': points['units'].fillna(0).to_numpy(),
+        'row': np.arange(len(points)),
+    })
+    if zoom < max_zoom:
+        cells['gx'] = np.floor(px / cell_px).astype(np.int64)
+        cells['gy'] = np.floor(py / cell_px).astype(np.int64)
+        cells = cells.groupby(['gx', 'gy'], sort=True).agg(
+            count=('row', 'size'), row=('row', 'min'), units=('units', 'sum'), px=('px', 'mean'), py=('py', 'mean'))
+    else:
+        cells['count'] = 1
+
+    tiles = {}
+    for count, row, fx, fy, units in zip(cells['count'], cells['row'], cells['px'], cells['py'], cells['units']):
+        if count == 1:
+            fx, fy = px[row], py[row]
+            props = records[row]
+        else:
+            props = {'cluster': True, 'point_count': int(count), 'units': int(units)}
+        tx, ty = int(fx // TILE_SIZE), int(fy // TILE_SIZE)
+        local_x = min(EXTENT - 1, int(round((fx - tx * TILE_SIZE) * EXTENT / TILE_SIZE)))
+        local_y = min(EXTENT - 1, int(round((fy - ty * TILE_SIZE) * EXTENT / TILE_SIZE)))
+        tiles.setdefault((tx, ty), []).append((local_x, local_y, props))
+    return tiles
+
+def _write_mbtiles(path, tiles, metadata):
+    # MBTiles 1.3: gzipped tiles, TMS row numbering (y flipped)
+    tmp = path.with_name(path.name + '.tmp')
+    tmp.unlink(missing_ok=True)
+    conn = sqlite3.connect(str(tmp))
+    try:
+        conn.execute('CREATE TABLE metadata (name TEXT, value TEXT)')
+        conn.execute('CREATE TABLE tiles (zoom_level INTEGER, tile_column INTEGER, tile_row INTEGER, tile_data BLOB)')
+        conn.execute('CREATE UNIQUE INDEX tile_index ON tiles (zoom_level, tile_column, tile_row)')
+        conn.executemany('INSERT INTO metadata VALUES (?, ?)', sorted(metadata.items()))
+        conn.executemany('INSERT INTO tiles VALUES (?, ?, ?, ?)', (
+            (z, x, (1 << z) - 1 - y, gzip.compress(data, mtime=0)) for (z, x, y), data in sorted(tiles.items())))
+        conn.commit()
+    finally:
+        conn.close()
+    os.replace(tmp, path)
+
+def build_tiles(input_path, output_dir, min_zoom=0, max_zoom=14, mbtiles_path=None, counties=None):
+    """Pre-build a clustered point tile pyramid from the geocoded roster.
+
+    Writes <output_dir>/{z}/{x}/{y}.pbf (uncompressed MVT, for static hosting)
+    and a TileJSON <output_dir>/tiles.json; with mbtiles_path, also an
+    MBTiles file. Output is byte-for-byte reproducible for the same roster.
+    """
+    if not Path(input_path).exists():
+        print(f"Error: {input_path} not found.")
+        return None
+
+    df = read_roster(input_path, counties=counties, columns=list(TILE_FIELDS) + ['latitude', 'longitude'])
+    df['latitude'] = pd.to_numeric(df['latitude'], errors='coerce')
+    df['longitude'] = pd.to_numeric(df['longitude'], errors='coerce')
+    points = df[df['latitude'].notna() & df['longitude'].notna()].rename(columns=TILE_FIELDS)
+    # Stable input order so cluster membership and feature order never vary
+    points = points.sort_values(['id', 'latitude', 'longitude'], kind='mergesort').reset_index(drop=True)
+    for name in INT_FIELDS:
+        points[name] = pd.to_numeric(points[name], errors='coerce')
+    points['wx'], points['wy'] = to_world(points['longitude'].to_numpy(), points['latitude'].to_numpy())
+    print(f"Tiling {len(points)} geocoded properties, zoom {min_zoom}-{max_zoom}...")
+
+    records = [_point_props(r) for r in points[list(TILE_FIELDS.values())].to_dict('records')]
+    tiles = {}
+    for zoom in range(min_zoom, max_zoom + 1):
+        level = zoom_features(points, records, zoom, max_zoom)
+        for (x, y), features in level.items():
+            tiles[(zoom, x, y)] = encode_tile({LAYER: features})
+        print(f"  z{zoom}: {len(level)} tiles, {sum(len(f) for f in level.values())} features")
+
+    output_dir = Path(output_dir)
+    bounds = [round(float(points['longitude'].min()), 6), round(float(points['latitude'].min()), 6),
+              round(float(points['longitude'].max()), 6), round(float(points['latitude'].max()), 6)] if len(points) else [-180, -85, 180, 85]
+    vector_layers = [{'id': LAYER, 'minzoom': min_zoom, 'maxzoom': max_zoom,
+                      'fields': {**{name: 'String' for name in TILE_FIELDS.values()},
+                                 **{name: 'Number' for name in INT_FIELDS},
+                                 'cluster': 'Boolean', 'point_count': 'Number'}}]
+    tilejson = {
+        'tilejson': '3.0.0',
+        'tiles': ['{z}/{x}/{y}.pbf'],
+        'minzoom': min_zoom,
+        'maxzoom': max_zoom,
+        'bounds': bounds,
+        'vector_layers': vector_layers,
+    }
+
+    # Build next to the target and swap it in, so a failed run keeps the old pyramid
+    tmp_dir = output_dir.with_name(output_dir.name + '.tmp')
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    tmp_dir.mkdir(parents=True)
+    for (z, x, y), data in tiles.items():
+        tile_path = tmp_dir / str(z) / str(x) / f'{y}.pbf'
+        tile_path.parent.mkdir(parents=True, exist_ok=True)
+        tile_path.write_bytes(data)
+    with open(tmp_dir / 'tiles.json', 'w') as f:
+        json.dump(tilejson, f, indent=2, sort_keys=True)
+    shutil.rmtree(output_dir, ignore_errors=True)
+    os.replace(tmp_dir, output_dir)
+    print(f"Wrote {len(tiles)} tiles to {output_dir}")
+
+    if mbtiles_path:
+        mbtiles_path = Path(mbtiles_path)
+        mbtiles_path.parent.mkdir(parents=True, exist_ok=True)
+        _write_mbtiles(mbtiles_path, tiles, {
+            'name': 'florida-multifamily',
+            'format': 'pbf',
+            'minzoom': str(min_zoom),
+            'maxzoom': str(max_zoom),
+            'bounds': ','.join(str(b) for b in bounds),
+            'json': json.dumps({'vector_layers': vector_layers}, sort_keys=True),
+        })
+        print(f"Wrote {mbtiles_path}")
+    return tiles
+
+if __name__ == '__main__':
+    base_dir = Path(__file__).parent.parent
+    build_tiles(
+        input_path=str(base_dir / 'data/processed/geocoded'),
+        output_dir=str(base_dir / 'app/public/tiles'),
+        mbtiles_path=str(base_dir / 'data/processed/properties.mbtiles')
+    )
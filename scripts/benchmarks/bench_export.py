@@ -0,0 +1,125 @@
+import argparse
+import gzip
+import json
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+# Add project root to path for imports
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from scripts.utils.columnar import decode_columnar
+from scripts.utils.stage_loader import load_stage
+
+APP_LOADER = Path(__file__).parent.parent.parent / 'app/src/loadProperties.js'
+
+# Times JSON.parse against the app's columnar loader, with fetch() served from disk
+NODE_SCRIPT = """
+import { readFileSync } from 'node:fs';
+import { pathToFileURL } from 'node:url';
+const [dir, loader, runs] = process.argv.slice(2);
+globalThis.fetch = async (url) => {
+  const data = readFileSync(dir + '/' + url);
+  return { json: async () => JSON.parse(data.toString('utf8')),
+           arrayBuffer: async () => data.buffer.slice(data.byteOffset, data.byteOffset + data.byteLength) };
+};
+const { loadProperties } = await import(pathToFileURL(loader).href);
+const best = async (fn) => {
+  let t = Infinity;
+  for (let i = 0; i < Number(runs); i++) {
+    const start = performance.now();
+    const rows = await fn();
+    t = Math.min(t, performance.now() - start);
+    if (!rows.length) throw new Error('no rows');
+  }
+  return t / 1000;
+};
+const json = await best(async () => JSON.parse(readFileSync(dir + '/properties.json', 'utf8')));
+const columnar = await best(() => loadProperties(''));
+console.log(JSON.stringify({ json, columnar }));
+"""
+
+def synthetic_export(rows, seed=0):
+    """A frame shaped like the app export: ids, addresses, a few thousand owners."""
+    rng = random.Random(seed)
+    cities = [f'CITY {i}' for i in range(400)]
+    counties = [f'County {i}' for i in range(67)]
+    return pd.DataFrame({
+        'id': [f'{rng.randint(10, 99)}-{i:012d}' for i in range(rows)],
+        'county': [rng.choice(counties) for _ in range(rows)],
+        'address': [f'{rng.randint(1, 19999)} NW {rng.randint(1, 200)} ST' for _ in range(rows)],
+        'city': [rng.choice(cities) for _ in range(rows)],
+        'zip': [str(rng.randint(32003, 34997)) for _ in range(rows)],
+        'units': [rng.randint(10, 400) for _ in range(rows)],
+        'year': [rng.choice([rng.randint(1920, 2025), None]) for _ in range(rows)],
+        'owner': [f'OWNER {rng.randint(1, rows // 10 + 1)} LLC' for _ in range(rows)],
+        'latitude': [rng.uniform(24.5, 31.0) for _ in range(rows)],
+        'longitude': [rng.uniform(-87.6, -80.0) for _ in range(rows)],
+        'sale_price': [rng.choice([rng.randint(100_000, 90_000_000), None]) for _ in range(rows)],
+        'sale_year': [rng.randint(1990, 2025) for _ in range(rows)],
+        'value': [rng.randint(100_000, 90_000_000) for _ in range(rows)],
+        'sqft': [rng.randint(5_000, 500_000) for _ in range(rows)],
+    })
+
+def _best(fn, runs):
+    best = float('inf')
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def run_benchmark(rows, runs=3):
+    """Compare size and load time of the JSON and columnar exports."""
+    export = load_stage('04_export_for_app.py')
+    df = synthetic_export(rows)
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        json_path = tmp / 'properties.json'
+        manifest_path = tmp / 'properties.manifest.json'
+        df.to_json(json_path, orient='records')
+        export.write_columnar(df, manifest_path)
+        manifest = json.loads(manifest_path.read_text())
+        payload = (tmp / manifest['file']).read_bytes()
+        json_bytes = json_path.read_bytes()
+
+        sizes = {
+            'json': (len(json_bytes), len(gzip.compress(json_bytes, 6))),
+            'columnar': (len(payload) + manifest_path.stat().st_size,
+                         len(gzip.compress(payload, 6)) + len(gzip.compress(manifest_path.read_bytes(), 6))),
+        }
+        load = {
+            'json': _best(lambda: json.loads(json_bytes), runs),
+            'columnar': _best(lambda: decode_columnar(payload, manifest), runs),
+        }
+        node = None
+        if shutil.which('node'):
+            script = tmp / 'bench.mjs'
+            script.write_text(NODE_SCRIPT)
+            out = subprocess.run(['node', str(script), str(tmp), str(APP_LOADER), str(runs)],
+                                 capture_output=True, text=True)
+            node = json.loads(out.stdout) if out.returncode == 0 else None
+            if node is None:
+                print(f"node benchmark failed: {out.stderr.strip()}")
+
+    print(f"\n{rows:,} properties")
+    print(f"{'format':<10} {'MB':>8} {'gzip MB':>8} {'python s':>9} {'node s':>8}")
+    for fmt in ['json', 'columnar']:
+        node_s = f"{node[fmt]:.3f}" if node else 'n/a'
+        print(f"{fmt:<10} {sizes[fmt][0] / 1e6:>8.2f} {sizes[fmt][1] / 1e6:>8.2f} {load[fmt]:>9.3f} {node_s:>8}")
+    print(f"\ncolumnar is {sizes['json'][0] / sizes['columnar'][0]:.1f}x smaller "
+          f"({sizes['json'][1] / sizes['columnar'][1]:.1f}x gzipped)")
+    return sizes, load, node
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the JSON and columnar app exports.')
+    parser.add_argument('--rows', type=int, default=200_000)
+    parser.add_argument('--runs', type=int, default=3, help='timing runs (best is reported)')
+    args = parser.parse_args()
+    run_benchmark(args.rows, args.runs)
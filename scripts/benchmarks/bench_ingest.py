@@ -0,0 +1,62 @@
+import argparse
+import multiprocessing as mp
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add project root to path for imports
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from scripts.benchmarks.synthetic import write_synthetic_nal
+from scripts.utils.metrics import peak_rss_mb
+from scripts.utils.stage_loader import load_stage
+
+def _run_engine(engine, nal_dir, output_path, queue):
+    ingest = load_stage('01_ingest_dor.py')
+    start = time.perf_counter()
+    df = ingest.ingest_all_counties(nal_dir, output_path, engine=engine)
+    elapsed = time.perf_counter() - start
+    queue.put({
+        'seconds': elapsed,
+        'peak_rss_mb': peak_rss_mb(),
+        'frame_mb': df.memory_usage(deep=True).sum() / 2**20,
+        'parquet_mb': os.path.getsize(output_path) / 2**20,
+        'rows': len(df),
+    })
+
+def run_benchmark(rows_per_county, counties):
+    """Time the pandas and arrow ingest engines on the same synthetic NAL files."""
+    ingest = load_stage('01_ingest_dor.py')
+    with tempfile.TemporaryDirectory() as tmp:
+        nal_dir = Path(tmp) / 'nal'
+        nal_dir.mkdir()
+        print(f"Generating {counties} synthetic NAL files x {rows_per_county:,} rows...")
+        for county_no in range(11, 11 + counties):
+            write_synthetic_nal(nal_dir / f'NAL{county_no}F202501.csv', rows_per_county, county_no, ingest.KEEP_COLS)
+
+        results = {}
+        ctx = mp.get_context('spawn')  # fresh process per engine so peak RSS is not shared
+        for engine in ['pandas', 'arrow']:
+            queue = ctx.Queue()
+            proc = ctx.Process(target=_run_engine, args=(engine, str(nal_dir), str(Path(tmp) / f'{engine}.parquet'), queue))
+            proc.start()
+            results[engine] = queue.get()
+            proc.join()
+
+    print(f"\n{'engine':<8} {'rows':>8} {'seconds':>8} {'peak RSS MB':>12} {'frame MB':>9} {'parquet MB':>11}")
+    for engine, r in results.items():
+        peak = f"{r['peak_rss_mb']:.0f}" if r['peak_rss_mb'] is not None else 'n/a'
+        print(f"{engine:<8} {r['rows']:>8} {r['seconds']:>8.2f} {peak:>12} {r['frame_mb']:>9.1f} {r['parquet_mb']:>11.2f}")
+    base, fast = results['pandas'], results['arrow']
+    print(f"\narrow speedup: {base['seconds'] / fast['seconds']:.1f}x, "
+          f"in-memory roster: {base['frame_mb'] / max(fast['frame_mb'], 1e-9):.1f}x smaller")
+    return results
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark NAL ingest engines on synthetic data.')
+    parser.add_argument('--rows', type=int, default=200_000, help='rows per synthetic county file')
+    parser.add_argument('--counties', type=int, default=3)
+    args = parser.parse_args()
+    run_benchmark(args.rows, args.counties)
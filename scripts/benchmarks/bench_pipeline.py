@@ -0,0 +1,377 @@
+import argparse
+import csv
+import email.parser
+import email.policy
+import io
+import json
+import multiprocessing as mp
+import platform
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pacsv
+
+# Add project root to path for imports
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from scripts.benchmarks.synthetic import parcel_ids, write_synthetic_nal
+from scripts.utils.county_lookup import COUNTY_NAMES
+from scripts.utils.stage_loader import load_stage
+
+BASELINE_PATH = Path(__file__).parent / 'pipeline_baseline.json'
+SCALES = {'10k': 10_000, '1m': 1_000_000, '10m': 10_000_000}
+STAGE_NAMES = ['ingest', 'geocode_gis', 'geocode_census', 'export']
+# Share of NAL parcels in the county parcel layer, and of Census addresses matched
+GIS_COVERAGE = 0.9
+CENSUS_MATCH_RATE = 0.8
+
+# ---------------------------------------------------------------- generators
+
+def _county_box(county_no):
+    # A 0.3 degree square somewhere inside Florida, fixed per county
+    rng = np.random.default_rng(county_no)
+    return rng.uniform(25.5, 30.2), rng.uniform(-87.0, -80.5)
+
+def write_nal_files(nal_dir, rows, counties, keep_cols, seed=0):
+    """Split rows over synthetic NAL CSVs (NAL<co>F2025.csv)."""
+    nal_dir = Path(nal_dir)
+    nal_dir.mkdir(parents=True, exist_ok=True)
+    for county_no, county_rows in zip(counties, np.array_split(np.arange(rows), len(counties))):
+        write_synthetic_nal(nal_dir / f'NAL{county_no}F2025.csv', len(county_rows), county_no, keep_cols, seed)
+
+def write_parcel_shapefiles(gis_dir, rows, counties, seed=0):
+    """One parcel polygon layer per county, laid out like the DOR GIS download.
+
+    Covers GIS_COVERAGE of the county's NAL parcel IDs (as PARCELNO) with
+    small squares inside the county's box, so the GIS join matches most
+    rows and leaves the rest for the Census tier.
+    """
+    import geopandas as gpd
+    import shapely
+
+    per_county = np.array_split(np.arange(rows), len(counties))
+    for county_no, county_rows in zip(counties, per_county):
+        rng = np.random.default_rng(seed + 1000 + county_no)
+        keep = np.flatnonzero(rng.random(len(county_rows)) < GIS_COVERAGE)
+        lat0, lon0 = _county_box(county_no)
+        lat = lat0 + rng.random(len(keep)) * 0.3
+        lon = lon0 + rng.random(len(keep)) * 0.3
+        half = 0.0002  # ~20m parcels
+        layer = gpd.GeoDataFrame(
+            {'PARCELNO': parcel_ids(county_no, 0, len(county_rows)).to_numpy()[keep]},
+            geometry=shapely.box(lon - half, lat - half, lon + half, lat + half), crs='EPSG:4326')
+        county_dir = Path(gis_dir) / f'{county_no}_{COUNTY_NAMES.get(county_no, county_no)}'
+        county_dir.mkdir(parents=True, exist_ok=True)
+        layer.to_file(county_dir / 'parcels.shp')
+
+class _CensusHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        message = email.parser.BytesParser(policy=email.policy.default).parsebytes(
+            b'Content-Type: ' + self.headers['Content-Type'].encode() + b'\r\n\r\n' + body)
+        upload = next(p for p in message.iter_parts() if p.get_param('name', header='content-disposition') == 'addressFile')
+        batch = pd.read_csv(io.BytesIO(upload.get_payload(decode=True)), header=None, dtype=str)
+        self.server.batches += 1
+        time.sleep(self.server.latency)
+
+        # Deterministic per address: the same id always matches (or not) the same way
+        ids = batch[0].astype(np.int64).to_numpy()
+        rng = np.random.default_rng(ids)
+        matched = (ids * 2654435761 % 1000) < self.server.match_rate * 1000
+        lines = [
+            f'"{i}","{a}","Match","Exact","{a}","{rng.uniform(-87, -80.5):.6f},{rng.uniform(25.5, 30.2):.6f}","1","L","12","086","1","1"'
+            if m else f'"{i}","{a}","No_Match"'
+            for i, a, m in zip(ids, batch[1], matched)
+        ]
+        payload = ('\n'.join(lines) + '\n').encode()
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+class FakeCensusServer:
+    """Local stand-in for the Census batch geocoder (context manager).
+
+    Answers the same multipart upload with the same CSV layout, matching
+    match_rate of addresses, after `latency` seconds per batch.
+    """
+
+    def __init__(self, latency=0.0, match_rate=CENSUS_MATCH_RATE):
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), _CensusHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.latency = latency
+        self.httpd.match_rate = match_rate
+        self.httpd.batches = 0
+        self.url = f'http://127.0.0.1:{self.httpd.server_address[1]}/'
+
+    def __enter__(self):
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    @property
+    def batches(self):
+        """Batches answered so far."""
+        return self.httpd.batches
+
+def generate_inputs(data_dir, rows, counties, seed=0):
+    """NAL files and parcel layers for one scale under data_dir (reused when present)."""
+    data_dir = Path(data_dir)
+    marker = data_dir / 'inputs.json'
+    spec = {'rows': rows, 'counties': counties, 'seed': seed}
+    if marker.exists() and json.loads(marker.read_text()) == spec:
+        return
+    shutil.rmtree(data_dir, ignore_errors=True)
+    keep_cols = load_stage('01_ingest_dor.py').KEEP_COLS
+    start = time.perf_counter()
+    print(f"Generating {rows:,} NAL rows over {len(counties)} counties in {data_dir}...")
+    write_nal_files(data_dir / 'raw/dor_nal', rows, counties, keep_cols, seed)
+    write_parcel_shapefiles(data_dir / 'raw/dor_gis', rows, counties, seed)
+    marker.write_text(json.dumps(spec))
+    print(f"  generated in {time.perf_counter() - start:.1f}s")
+
+# ---------------------------------------------------------------- stages
+
+def _stage_call(name, data_dir, work_dir, census_url, processes):
+    # (function, roster rows in) for one stage; outputs chain like run_pipeline's
+    data_dir, work_dir = Path(data_dir), Path(work_dir)
+    base, gis, geocoded = work_dir / 'base_roster', work_dir / 'geocoded_gis', work_dir / 'geocoded'
+    if name == 'ingest':
+        return lambda: load_stage('01_ingest_dor.py').ingest_all_counties(
+            str(data_dir / 'raw/dor_nal'), str(base), workers=processes, engine='arrow'), None
+    if name == 'geocode_gis':
+        return lambda: load_stage('02_geocode_gis.py').geocode_from_gis(
+            str(base), str(data_dir / 'raw/dor_gis'), str(gis),
+            cache_dir=str(work_dir / 'gis_centroids'), workers=processes), base
+    if name == 'geocode_census':
+        return lambda: load_stage('03_geocode_census.py').geocode_census_batch(
+            str(gis), str(geocoded), census_url=census_url), gis
+    if name == 'export':
+        return lambda: load_stage('04_export_for_app.py').export_for_app(
+            str(geocoded), str(work_dir / 'app/properties.manifest.json')), geocoded
+    raise ValueError(f"Unknown stage {name}; expected one of {STAGE_NAMES}")
+
+def _run_stage(name, data_dir, work_dir, census_url, processes, rows, queue):
+    # Runs in a fresh process so peak RSS belongs to this stage alone
+    from scripts.run_pipeline import roster_rows
+    from scripts.utils.metrics import metrics, peak_rss_mb
+
+    fn, source = _stage_call(name, data_dir, work_dir, census_url, processes)
+    rows_in = rows if source is None else roster_rows(source)
+    try:
+        with metrics.stage(name, rows_in=rows_in) as record:
+            fn()
+    except Exception as e:
+        queue.put({'error': f'{type(e).__name__}: {e}'})
+        return
+    queue.put({
+        'rows_in': rows_in,
+        'seconds': record['seconds'],
+        'rows_per_second': round(rows_in / max(record['seconds'], 1e-9)) if rows_in else None,
+        # Pool workers are children of the stage process; the larger peak counts
+        'peak_rss_mb': round(max(peak_rss_mb(), peak_rss_mb(children=True)), 1) if peak_rss_mb() is not None else None,
+        'http': metrics.report()['http'],
+    })
+
+def run_scale(rows, counties, stages=STAGE_NAMES, data_dir=None, census_latency=0.0, processes=2, seed=0):
+    """Run the stages in order on synthetic inputs of `rows` NAL rows; returns per-stage results.
+
+    processes is passed to the stages that use process pools (ingest, GIS join).
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir = Path(data_dir or Path(tmp) / 'inputs')
+        generate_inputs(data_dir, rows, counties, seed)
+        work_dir = Path(tmp) / 'work'
+        results = {}
+        ctx = mp.get_context('spawn')
+        # Every stage up to the last one asked for runs, to produce the next one's input
+        needed = STAGE_NAMES[:max(STAGE_NAMES.index(s) for s in stages) + 1]
+        with FakeCensusServer(census_latency) as census:
+            for name in needed:
+                queue = ctx.Queue()
+                proc = ctx.Process(target=_run_stage, args=(name, str(data_dir), str(work_dir), census.url, processes, rows, queue))
+                proc.start()
+                result = queue.get()
+                proc.join()
+                if 'error' in result:
+                    raise RuntimeError(f"{name} failed: {result['error']}")
+                # A stage that quietly dropped failed requests would look fast
+                failed = {s: n for h in result['http'].values() for s, n in h['status'].items() if s != '200'}
+                if failed:
+                    raise RuntimeError(f"{name} had failed HTTP calls: {failed}")
+                results[name] = result
+        # Earlier stages only ran to produce inputs for the requested ones
+        return {name: r for name, r in results.items() if name in stages}
+
+# ---------------------------------------------------------------- refresh check
+
+def bump_values(nal_dir, every=20):
+    """Value-only roll change: add 1 to JV on every `every`-th row of each NAL file."""
+    import pyarrow.compute as pc
+
+    for path in sorted(Path(nal_dir).glob('*.csv')):
+        # Everything else is read back as text so codes like DOR_UC keep their zeros
+        with open(path, newline='') as f:
+            columns = next(csv.reader(f))
+        table = pacsv.read_csv(path, convert_options=pacsv.ConvertOptions(
+            column_types={c: pa.float64() if c == 'JV' else pa.string() for c in columns}))
+        bump = pa.array(np.arange(len(table)) % every == 0)
+        jv = table.column('JV')
+        table = table.set_column(table.schema.get_field_index('JV'), 'JV', pc.if_else(bump, pc.add(jv, 1), jv))
+        tmp = path.with_name(path.name + '.tmp')
+        pacsv.write_csv(table, tmp)
+        tmp.replace(path)
+
+def check_refresh(rows, counties, processes=2):
+    """Run the real pipeline twice, the second time after a value-only roll change.
+
+    Every address is geocoded on the first run (the fake Census service
+    matches all of them), so the second run has nothing to geocode. It
+    must still succeed, send no Census batches, and publish a geocoded
+    roster with the new values and unchanged coordinates. Returns True if so.
+    """
+    from scripts.run_pipeline import run_pipeline
+    from scripts.utils.roster_store import read_roster
+
+    with tempfile.TemporaryDirectory() as tmp, FakeCensusServer(match_rate=1.0) as census:
+        base_dir = Path(tmp)
+        generate_inputs(base_dir / 'data', rows, counties)
+        geocoded_path = base_dir / 'data/processed/geocoded'
+        run = lambda: run_pipeline(base_dir, targets=['export'], processes=processes, census_url=census.url)
+
+        print("\n=== refresh check: first run ===")
+        if not run():
+            print("REFRESH CHECK first run failed")
+            return False
+        before = read_roster(geocoded_path).set_index(['CO_NO', 'PARCEL_ID']).sort_index()
+        missing = int(before['latitude'].isna().sum())
+        if missing:
+            print(f"REFRESH CHECK {missing} properties left without coordinates on the first run")
+            return False
+
+        bump_values(base_dir / 'data/raw/dor_nal')
+        batches = census.batches
+        print("\n=== refresh check: value-only roll change ===")
+        if not run():
+            print("REFRESH CHECK second run failed")
+            return False
+
+        problems = []
+        changes = pd.read_parquet(base_dir / 'data/processed/roll_changes.parquet')
+        if set(changes['change'].astype(str)) - {'changed'} or changes['address_changed'].any():
+            problems.append(f"change set is not value-only: {changes['change'].value_counts().to_dict()}")
+        if not geocoded_path.exists():
+            problems.append("geocoded roster was not published")
+        else:
+            after = read_roster(geocoded_path).set_index(['CO_NO', 'PARCEL_ID']).sort_index()
+            if not after.index.equals(before.index):
+                problems.append("geocoded roster has different properties")
+            elif not (after[['latitude', 'longitude']].to_numpy() == before[['latitude', 'longitude']].to_numpy()).all():
+                problems.append("coordinates changed")
+            elif (after['JV'] != before['JV']).sum() != len(changes):
+                problems.append(f"{(after['JV'] != before['JV']).sum()} JV values changed, expected {len(changes)}")
+        if census.batches != batches:
+            problems.append(f"{census.batches - batches} Census batches sent for a value-only change")
+        for problem in problems:
+            print(f"REFRESH CHECK {problem}")
+        if not problems:
+            print(f"\nRefresh check passed: {len(changes):,} changed properties, nothing re-geocoded.")
+        return not problems
+
+# ---------------------------------------------------------------- baseline
+
+def compare(results, baseline, threshold):
+    """Regressions of results against baseline: throughput down or peak RSS up by more than threshold."""
+    problems = []
+    for scale, stages in results.items():
+        for name, r in stages.items():
+            base = baseline.get(scale, {}).get(name)
+            if not base:
+                continue
+            if base.get('rows_per_second') and r['rows_per_second'] is not None \
+                    and r['rows_per_second'] < base['rows_per_second'] * (1 - threshold):
+                problems.append(f"{scale} {name}: {r['rows_per_second']:,} rows/s vs baseline {base['rows_per_second']:,}")
+            if base.get('peak_rss_mb') and r['peak_rss_mb'] is not None \
+                    and r['peak_rss_mb'] > base['peak_rss_mb'] * (1 + threshold):
+                problems.append(f"{scale} {name}: {r['peak_rss_mb']:.0f} MB peak vs baseline {base['peak_rss_mb']:.0f} MB")
+    return problems
+
+def run_benchmark(scales, counties=3, stages=STAGE_NAMES, data_dir=None, census_latency=0.0,
+                  baseline_path=BASELINE_PATH, threshold=0.25, update_baseline=False, processes=2):
+    """Benchmark the stages at each scale and check them against the baseline file.
+
+    Returns True when nothing regressed by more than threshold (a fraction).
+    update_baseline stores these results as the new baseline for their scales.
+    """
+    county_nos = sorted(COUNTY_NAMES)[:counties]
+    results = {}
+    for scale in scales:
+        rows = SCALES[scale]
+        print(f"\n=== {scale}: {rows:,} NAL rows ===")
+        scale_dir = Path(data_dir) / scale if data_dir else None
+        results[scale] = run_scale(rows, county_nos, stages, scale_dir, census_latency, processes)
+
+    print(f"\n{'scale':<6} {'stage':<15} {'rows in':>11} {'seconds':>8} {'rows/s':>11} {'peak RSS MB':>12}")
+    for scale, stage_results in results.items():
+        for name, r in stage_results.items():
+            peak = f"{r['peak_rss_mb']:.0f}" if r['peak_rss_mb'] is not None else 'n/a'
+            rate = f"{r['rows_per_second']:,}" if r['rows_per_second'] is not None else ''
+            print(f"{scale:<6} {name:<15} {r['rows_in'] or 0:>11,} {r['seconds']:>8.2f} {rate:>11} {peak:>12}")
+
+    baseline_path = Path(baseline_path)
+    baseline = json.loads(baseline_path.read_text()) if baseline_path.exists() else {}
+    problems = compare(results, baseline.get('results', {}), threshold)
+    if update_baseline:
+        baseline = {
+            'machine': {'platform': platform.platform(), 'python': platform.python_version(), 'cpus': mp.cpu_count()},
+            'results': {**baseline.get('results', {}),
+                        **{scale: {name: {k: r[k] for k in ['rows_per_second', 'peak_rss_mb']}
+                                   for name, r in stage_results.items()}
+                           for scale, stage_results in results.items()}},
+        }
+        baseline_path.write_text(json.dumps(baseline, indent=2) + '\n')
+        print(f"\nBaseline updated: {baseline_path}")
+    elif not baseline:
+        print(f"\nNo baseline at {baseline_path}; run with --update-baseline to record one.")
+
+    for problem in problems:
+        print(f"REGRESSION {problem}")
+    if baseline and not problems and not update_baseline:
+        print(f"\nNo regressions beyond {threshold:.0%} of the baseline.")
+    return not problems
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the pipeline stages on synthetic NAL, GIS and Census data.')
+    parser.add_argument('--scale', nargs='+', choices=list(SCALES), default=['10k'], help='NAL row counts to run')
+    parser.add_argument('--stages', nargs='+', choices=STAGE_NAMES, default=STAGE_NAMES,
+                        help='stages to measure (earlier ones still run to produce their inputs)')
+    parser.add_argument('--counties', type=int, default=3, help='counties the rows are spread over')
+    parser.add_argument('--data-dir', help='keep generated inputs here between runs (default: temp dir)')
+    parser.add_argument('--processes', type=int, default=2,
+                        help='worker processes for ingest and the GIS join (0 = one per core)')
+    parser.add_argument('--census-latency', type=float, default=0.0, help='fake Census seconds per batch')
+    parser.add_argument('--baseline', default=str(BASELINE_PATH))
+    parser.add_argument('--threshold', type=float, default=0.25, help='allowed regression (fraction)')
+    parser.add_argument('--update-baseline', action='store_true', help='record these results as the baseline')
+    parser.add_argument('--check-refresh', action='store_true',
+                        help='also run the full pipeline twice around a value-only roll change')
+    args = parser.parse_args()
+    ok = run_benchmark(args.scale, args.counties, args.stages, args.data_dir, args.census_latency,
+                       args.baseline, args.threshold, args.update_baseline, args.processes or None)
+    if args.check_refresh:
+        ok = check_refresh(SCALES[args.scale[0]], sorted(COUNTY_NAMES)[:args.counties], args.processes or None) and ok
+    sys.exit(0 if ok else 1)
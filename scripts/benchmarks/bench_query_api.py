@@ -0,0 +1,134 @@
+import argparse
+import http.client
+import random
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from urllib.parse import urlencode
+
+import numpy as np
+import pandas as pd
+
+# Add project root to path for imports
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from scripts.utils.county_lookup import COUNTY_NAMES
+from scripts.utils.roster_store import write_roster
+from scripts.utils.spatial_index import build_parcel_index
+from scripts.utils.stage_loader import load_stage
+
+CITIES = [f'CITY {i}' for i in range(300)]
+
+def synthetic_roster(rows, seed=0):
+    """A geocoded roster with realistic cardinalities, spread over Florida."""
+    rng = np.random.default_rng(seed)
+    co_no = rng.choice(list(COUNTY_NAMES), rows)
+    return pd.DataFrame({
+        'CO_NO': co_no.astype('int16'),
+        'COUNTY_NAME': [COUNTY_NAMES[c] for c in co_no],
+        'PARCEL_ID': [f'P{i:010d}' for i in range(rows)],
+        'PHY_ADDR1': [f'{n} MAIN ST' for n in rng.integers(1, 20000, rows)],
+        'PHY_CITY': rng.choice(CITIES, rows),
+        'PHY_ZIPCD': rng.integers(32003, 34997, rows).astype(str),
+        'latitude': rng.uniform(24.5, 31.0, rows),
+        'longitude': rng.uniform(-87.6, -80.0, rows),
+        'NO_RES_UNTS': rng.integers(10, 500, rows).astype('int32'),
+        'ACT_YR_BLT': rng.integers(1920, 2025, rows).astype('float32'),
+        'JV': rng.integers(100_000, 90_000_000, rows).astype('float64'),
+        'OWN_NAME': [f'OWNER {i} LLC' for i in rng.integers(0, rows // 5 + 1, rows)],
+    })
+
+def query_mix(n_queries, seed=0):
+    """Distinct dashboard-style queries: filtered pages, bbox pages, aggregates."""
+    rng = random.Random(seed)
+    counties = list(COUNTY_NAMES.values())
+    queries = []
+    for _ in range(n_queries):
+        kind = rng.random()
+        params = {'min_units': rng.choice([10, 20, 50, 100, 200])}
+        if kind < 0.4:
+            params['county'] = rng.choice(counties)
+            params['sort'] = rng.choice(['-units', '-value', 'year'])
+            params['offset'] = rng.choice([0, 0, 0, 100, 200])
+            path = '/properties'
+        elif kind < 0.7:
+            lon, lat = rng.uniform(-87, -80.5), rng.uniform(25, 30.5)
+            size = rng.choice([0.05, 0.1, 0.25])
+            params['bbox'] = f'{lon:.3f},{lat:.3f},{lon + size:.3f},{lat + size:.3f}'
+            path = '/properties'
+        else:
+            params['group_by'] = rng.choice(['county', 'decade', 'owner'])
+            if rng.random() < 0.5:
+                params['county'] = rng.choice(counties)
+            path = '/aggregate'
+        queries.append(f'{path}?{urlencode(params)}')
+    return queries
+
+def load_test(port, queries, clients, duration, seed=0):
+    """Hammer the server from `clients` keep-alive connections; returns latencies (s)."""
+    latencies = [[] for _ in range(clients)]
+    deadline = time.perf_counter() + duration
+
+    def client(i):
+        rng = random.Random(seed + i)
+        conn = http.client.HTTPConnection('127.0.0.1', port)
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            conn.request('GET', rng.choice(queries))
+            response = conn.getresponse()
+            response.read()
+            if response.status != 200:
+                raise RuntimeError(f'HTTP {response.status}')
+            latencies[i].append(time.perf_counter() - start)
+        conn.close()
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return np.array([l for per_client in latencies for l in per_client])
+
+def run_benchmark(rows, n_queries, clients, duration):
+    """Report throughput and latency percentiles with the response cache off and on."""
+    api = load_stage('query_api.py')
+    with tempfile.TemporaryDirectory() as tmp:
+        roster_path = Path(tmp) / 'geocoded'
+        db_path = Path(tmp) / 'query.sqlite'
+        index_path = Path(tmp) / 'parcel_index.npz'
+        write_roster(synthetic_roster(rows), roster_path)
+        start = time.perf_counter()
+        api.build_query_db(roster_path, db_path)
+        print(f"Database build: {time.perf_counter() - start:.1f}s for {rows:,} rows")
+        build_parcel_index(roster_path, index_path)
+
+        queries = query_mix(n_queries)
+        results = {}
+        for label, cache_size in [('no cache', 0), ('cache', api.CACHE_SIZE)]:
+            server = api.make_server(db_path, port=0, cache_size=cache_size, index_path=index_path)
+            thread = threading.Thread(target=server.serve_forever, daemon=True)
+            thread.start()
+            try:
+                lat = load_test(server.server_address[1], queries, clients, duration)
+            finally:
+                server.shutdown()
+                server.server_close()
+            results[label] = lat
+
+    print(f"\n{n_queries} distinct queries, {clients} clients, {duration:.0f}s per run")
+    print(f"{'mode':<10} {'requests':>9} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for label, lat in results.items():
+        p50, p95, p99 = np.percentile(lat, [50, 95, 99]) * 1000
+        print(f"{label:<10} {len(lat):>9} {len(lat) / duration:>8.0f} {p50:>8.1f} {p95:>8.1f} {p99:>8.1f}")
+    return results
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Load-test the roster query API.')
+    parser.add_argument('--rows', type=int, default=200_000)
+    parser.add_argument('--queries', type=int, default=500, help='distinct queries in the mix')
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=10.0, help='seconds per run')
+    args = parser.parse_args()
+    run_benchmark(args.rows, args.queries, args.clients, args.duration)
@@ -0,0 +1,69 @@
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pacsv
+
+NAL_WIDTH = 165  # columns in a real NAL file
+CHUNK_ROWS = 250_000
+
+def parcel_ids(county_no, start, stop):
+    """PARCEL_IDs of rows start..stop of a county ('<co>-<row:09d>')."""
+    return pd.Series(np.arange(start, stop)).map(lambda i: f'{county_no}-{i:09d}')
+
+def nal_chunk(county_no, start, stop, keep_cols, rng):
+    """Rows start..stop of a synthetic NAL file as an Arrow table in file column order.
+
+    About 8% of parcels are multifamily (DOR_UC 003/008), close to a
+    metro county roll; the rest of the 165 columns are filler.
+    """
+    n = stop - start
+    ints = lambda lo, hi: rng.integers(lo, hi, n)
+    pick = lambda values: np.asarray(values, dtype=object)[rng.integers(0, len(values), n)]
+    dor_uc = np.where(rng.random(n) < 0.08, pick(['003', '008']), pick(['000', '001', '004', '010', '100']))
+    street = pd.Series(ints(1, 20000)).astype(str) + ' NW ' + pd.Series(ints(1, 200)).astype(str) + ' ST'
+    values = {
+        'CO_NO': np.full(n, county_no), 'PARCEL_ID': parcel_ids(county_no, start, stop), 'ASMNT_YR': np.full(n, 2025),
+        'DOR_UC': dor_uc, 'PA_UC': pick(['0100', '0300', '0800']),
+        'JV': ints(50_000, 90_000_000), 'AV_NSD': ints(50_000, 90_000_000), 'TV_NSD': ints(50_000, 90_000_000),
+        'LND_VAL': ints(10_000, 9_000_000), 'NO_LND_UNTS': ints(0, 50), 'LND_SQFOOT': ints(1_000, 900_000),
+        'ACT_YR_BLT': ints(1920, 2026), 'EFF_YR_BLT': ints(1920, 2026), 'TOT_LVG_AREA': ints(500, 500_000),
+        'NO_BULDNG': ints(1, 30), 'NO_RES_UNTS': ints(1, 400),
+        'SALE_PRC1': ints(0, 90_000_000), 'SALE_YR1': ints(1990, 2026), 'SALE_MO1': ints(1, 13),
+        'SALE_PRC2': pa.nulls(n, pa.int64()), 'SALE_YR2': pa.nulls(n, pa.int64()), 'SALE_MO2': pa.nulls(n, pa.int64()),
+        'OWN_NAME': 'OWNER ' + pd.Series(ints(1, 5000)).astype(str) + ' LLC',
+        'OWN_ADDR1': pd.Series(ints(1, 10000)).astype(str) + ' OWNER WAY', 'OWN_ADDR2': pa.nulls(n, pa.string()),
+        'OWN_CITY': np.full(n, 'MIAMI', dtype=object), 'OWN_STATE': pick(['FL', 'NY', 'TX']),
+        'OWN_ZIPCD': ints(32003, 34998).astype(str),
+        'PHY_ADDR1': street, 'PHY_ADDR2': pa.nulls(n, pa.string()),
+        'PHY_CITY': pick(['MIAMI', 'HIALEAH', 'DORAL']), 'PHY_ZIPCD': ints(33010, 33200).astype(str),
+    }
+    columns = {c: values[c] if isinstance(values[c], pa.Array) else pa.array(np.asarray(values[c]))
+               for c in keep_cols}
+    filler = pa.array(np.arange(start, stop) % 10)  # one shared array: cheap to build
+    for i in range(NAL_WIDTH - len(keep_cols)):
+        columns[f'FILLER_{i}'] = filler
+    return pa.table(columns)
+
+def write_synthetic_nal(path, rows, county_no, keep_cols, seed=0):
+    """Write a NAL-shaped CSV of one county, CHUNK_ROWS at a time.
+
+    The kept columns are padded out to the real 165-column width. The same
+    seed and county always give the same file.
+    """
+    path = Path(path)
+    rng = np.random.default_rng(seed + county_no)
+    tmp = path.with_name(path.name + '.tmp')
+    writer = None
+    try:
+        for start in range(0, rows, CHUNK_ROWS):
+            chunk = nal_chunk(county_no, start, min(start + CHUNK_ROWS, rows), keep_cols, rng)
+            if writer is None:
+                writer = pacsv.CSVWriter(tmp, chunk.schema)
+            writer.write_table(chunk)
+    finally:
+        if writer is not None:
+            writer.close()
+    if writer is not None:
+        tmp.replace(path)
@@ -0,0 +1,368 @@
+import argparse
+import os
+import shutil
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+
+import pyarrow.parquet as pq
+
+# Add project root to path for imports
+sys.path.append(str(Path(__file__).parent.parent))
+
+from scripts.utils.census_client import CENSUS_URL
+from scripts.utils.fingerprint import file_fingerprint, load_manifest, save_manifest
+from scripts.utils.metrics import metrics
+from scripts.utils.roster_store import is_dataset
+from scripts.utils.spatial_index import build_parcel_index
+from scripts.utils.stage_loader import SCRIPTS_DIR, load_stage
+
+# Each stage reads its inputs and writes outputs no other stage writes, so
+# the graph below is the whole dependency story: a stage runs once every
+# stage producing one of its inputs has finished. Roster outputs are
+# 'staged': the stage writes <output>.tmp, which replaces the output only
+# when the stage succeeds. The other stages already publish atomically
+# (content-hashed export payload, tile directory swap, SQLite replace).
+def _run_ingest(base_dir, src, out, options):
+    df = load_stage('01_ingest_dor.py').ingest_all_counties(
+        nal_dir=src['nal'], output_path=out['roster'], workers=options['processes'], engine='arrow',
+        cache_dir=str(base_dir / 'data/processed/ingest_cache'))
+    if df is None:
+        raise RuntimeError('ingest produced no roster')
+
+def _run_owners(base_dir, src, out, options):
+    if load_stage('01b_resolve_owners.py').resolve_roster_owners(src['roster'], out['roster'], workers=options['processes']) is None:
+        raise RuntimeError('owner resolution failed')
+
+def _run_roll_diff(base_dir, src, out, options):
+    # The last geocoded roster is the previous snapshot. It is state, like the
+    # geocode cache, not a declared input: declaring it would make a cycle
+    previous = base_dir / STAGES['geocode_census']['outputs']['roster']
+    if load_stage('01c_roll_diff.py').diff_roll(src['roster'], str(previous), out['roster'], out['changes']) is None:
+        raise RuntimeError('roll diff failed')
+
+def _run_geocode_gis(base_dir, src, out, options):
+    if load_stage('02_geocode_gis.py').geocode_from_gis(
+            roster_path=src['roster'], gis_dir=src['gis'], output_path=out['roster'],
+            cache_dir=str(base_dir / 'data/processed/gis_centroids'), workers=options['processes']) is None:
+        raise RuntimeError('GIS geocoding failed')
+
+def _run_address_store(base_dir, src, out, options):
+    if not load_stage('02b_geocode_offline.py').ensure_address_store(
+            out['store'], tiger_dir=src['tiger'], points_dir=src['points']):
+        print("No address store sources; the offline tier will pass rows through.")
+
+def _run_geocode_offline(base_dir, src, out, options):
+    stage = load_stage('02b_geocode_offline.py')
+    if Path(src['store']).exists():
+        if stage.geocode_offline(src['roster'], out['roster'], src['store']) is None:
+            raise RuntimeError('offline geocoding failed')
+    elif is_dataset(src['roster']):
+        shutil.copytree(src['roster'], out['roster'])
+    else:
+        shutil.copy2(src['roster'], out['roster'])
+
+def _run_geocode_census(base_dir, src, out, options):
+    if load_stage('03_geocode_census.py').geocode_census_batch(
+            src['roster'], out['roster'], census_url=options['census_url'],
+            concurrency=options['census_concurrency']) is None:
+        raise RuntimeError('Census geocoding failed')
+
+def _run_export(base_dir, src, out, options):
+    load_stage('04_export_for_app.py').export_for_app(src['roster'], out['manifest'])
+
+def _run_tiles(base_dir, src, out, options):
+    if load_stage('05_build_tiles.py').build_tiles(src['roster'], out['tiles'], mbtiles_path=out['mbtiles']) is None:
+        raise RuntimeError('tile build failed')
+
+def _run_query_db(base_dir, src, out, options):
+    load_stage('query_api.py').build_query_db(src['roster'], out['db'])
+
+def _run_spatial_index(base_dir, src, out, options):
+    build_parcel_index(src['roster'], out['index'])
+
+STAGES = {
+    'ingest': {
+        'script': '01_ingest_dor.py', 'run': _run_ingest,
+        'inputs': {'nal': 'data/raw/dor_nal'},
+        'outputs': {'roster': 'data/processed/base_roster'}, 'staged': True,
+    },
+    'owners': {
+        'script': '01b_resolve_owners.py', 'run': _run_owners,
+        'inputs': {'roster': 'data/processed/base_roster'},
+        'outputs': {'roster': 'data/processed/owner_roster'}, 'staged': True,
+    },
+    'roll_diff': {
+        'script': '01c_roll_diff.py', 'run': _run_roll_diff,
+        'inputs': {'roster': 'data/processed/owner_roster'},
+        'outputs': {'roster': 'data/processed/roll_roster', 'changes': 'data/processed/roll_changes.parquet'},
+        'staged': True,
+    },
+    'geocode_gis': {
+        'script': '02_geocode_gis.py', 'run': _run_geocode_gis,
+        'inputs': {'roster': 'data/processed/roll_roster', 'gis': 'data/raw/dor_gis'},
+        'outputs': {'roster': 'data/processed/geocoded_gis'}, 'staged': True,
+    },
+    'address_store': {
+        'script': '02b_geocode_offline.py', 'run': _run_address_store,
+        'inputs': {'tiger': 'data/raw/tiger', 'points': 'data/raw/address_points'},
+        'outputs': {'store': 'data/processed/address_store.sqlite'}, 'staged': False,
+    },
+    'geocode_offline': {
+        'script': '02b_geocode_offline.py', 'run': _run_geocode_offline,
+        'inputs': {'roster': 'data/processed/geocoded_gis', 'store': 'data/processed/address_store.sqlite'},
+        'outputs': {'roster': 'data/processed/geocoded_offline'}, 'staged': True,
+    },
+    'geocode_census': {
+        'script': '03_geocode_census.py', 'run': _run_geocode_census,
+        'inputs': {'roster': 'data/processed/geocoded_offline'},
+        'outputs': {'roster': 'data/processed/geocoded'}, 'staged': True,
+    },
+    'export': {
+        'script': '04_export_for_app.py', 'run': _run_export,
+        'inputs': {'roster': 'data/processed/geocoded'},
+        'outputs': {'manifest': 'app/public/properties.manifest.json', 'rollups': 'app/public/rollups'}, 'staged': False,
+    },
+    'tiles': {
+        'script': '05_build_tiles.py', 'run': _run_tiles,
+        'inputs': {'roster': 'data/processed/geocoded'},
+        'outputs': {'tiles': 'app/public/tiles', 'mbtiles': 'data/processed/properties.mbtiles'}, 'staged': False,
+    },
+    'query_db': {
+        'script': 'query_api.py', 'run': _run_query_db,
+        'inputs': {'roster': 'data/processed/geocoded'},
+        'outputs': {'db': 'data/processed/query.sqlite'}, 'staged': False,
+    },
+    'spatial_index': {
+        'script': 'utils/spatial_index.py', 'run': _run_spatial_index,
+        'inputs': {'roster': 'data/processed/geocoded'},
+        'outputs': {'index': 'data/processed/parcel_index.npz'}, 'staged': False,
+    },
+}
+
+def dependencies(stages):
+    """Map each stage to the stages producing its inputs."""
+    producers = {}
+    for name, spec in stages.items():
+        for path in spec['outputs'].values():
+            if path in producers:
+                raise ValueError(f"{path} is written by both {producers[path]} and {name}")
+            producers[path] = name
+    return {name: sorted({producers[p] for p in spec['inputs'].values() if p in producers})
+            for name, spec in stages.items()}
+
+def _files(path):
+    path = Path(path)
+    if path.is_dir():
+        return sorted(f for f in path.rglob('*') if f.is_file() and not f.name.endswith('.tmp'))
+    return [path] if path.exists() else []
+
+def input_fingerprints(base_dir, spec, previous=None):
+    """Fingerprints of every file under the stage's inputs, plus its script."""
+    previous = previous or {}
+    paths = [base_dir / p for p in spec['inputs'].values()] + [SCRIPTS_DIR / spec['script']]
+    files = {os.path.relpath(f, base_dir): f for path in paths for f in _files(path)}
+    return {key: file_fingerprint(f, previous.get(key)) for key, f in files.items()}
+
+def is_fresh(base_dir, spec, entry, fingerprints):
+    """True if the stage ran on exactly these inputs and its outputs are as it left them.
+
+    An output the stage legitimately did not write (recorded as 'absent',
+    e.g. no address store without TIGER or address point sources) counts
+    as present while it is still missing.
+    """
+    if not entry:
+        return False
+    absent = set(entry.get('absent', []))
+    for key, p in spec['outputs'].items():
+        if not (base_dir / p).exists() and key not in absent:
+            return False
+    hashes = lambda fps: {k: v['sha256'] for k, v in fps.items()}
+    return hashes(fingerprints) == hashes(entry.get('inputs', {}))
+
+def roster_rows(path):
+    """Row count of a roster from parquet footers (no data read)."""
+    path = Path(path)
+    if not path.exists():
+        return None
+    files = sorted(path.glob('*/*.parquet')) if is_dataset(path) else [path]
+    return sum(pq.ParquetFile(f).metadata.num_rows for f in files)
+
+def _remove(path):
+    if path.is_dir():
+        shutil.rmtree(path, ignore_errors=True)
+    else:
+        path.unlink(missing_ok=True)
+
+def _publish(staged, target):
+    # Swap the staged output in; a failed stage never gets here. The old
+    # output is moved aside rather than deleted first, so a stage that did
+    # not write its output leaves the published one in place
+    staged, target = Path(staged), Path(target)
+    if not staged.exists():
+        raise RuntimeError(f"stage did not write {target.name}")
+    old = target.with_name(target.name + '.old')
+    _remove(old)
+    if target.exists():
+        os.replace(target, old)
+    try:
+        os.replace(staged, target)
+    except BaseException:
+        if old.exists():
+            os.replace(old, target)
+        raise
+    _remove(old)
+
+def run_stage(base_dir, name, spec, options, profile=None, profile_dir=None):
+    """Run one stage, staging roster outputs through temp paths. Returns its record."""
+    src = {k: str(base_dir / p) for k, p in spec['inputs'].items()}
+    final = {k: base_dir / p for k, p in spec['outputs'].items()}
+    out = dict(final)
+    if spec['staged']:
+        out = {k: p.with_name(p.name + '.tmp') for k, p in final.items()}
+        for p in out.values():
+            _remove(p)
+
+    rows_in = roster_rows(src['roster']) if 'roster' in src else None
+    with metrics.stage(name, rows_in=rows_in, profile=profile, profile_dir=profile_dir) as record:
+        try:
+            spec['run'](base_dir, src, {k: str(p) for k, p in out.items()}, options)
+            missing = [final[k].name for k, p in out.items() if spec['staged'] and not p.exists()]
+            if missing:
+                # Publishing only some outputs would leave them out of step
+                raise RuntimeError(f"stage did not write {', '.join(missing)}")
+        except BaseException:
+            if spec['staged']:
+                for p in out.values():
+                    _remove(p)
+            raise
+        if spec['staged']:
+            for k, p in out.items():
+                _publish(p, final[k])
+        record['rows_out'] = roster_rows(final['roster']) if 'roster' in final else None
+    return {'seconds': round(record['seconds'], 2), 'rows_in': rows_in, 'rows_out': record['rows_out'],
+            'absent': sorted(k for k, p in final.items() if not p.exists()),
+            'finished': time.strftime('%Y-%m-%dT%H:%M:%S')}
+
+def run_pipeline(base_dir, targets=None, force=(), workers=2, dry_run=False, state_path=None,
+                 report_path=None, profile=None, processes=None, census_url=CENSUS_URL,
+                 census_concurrency=4):
+    """Run the stages needed for targets (default: all), skipping fresh ones.
+
+    A stage is fresh when its inputs (files under each input path, and its
+    own script) hash the same as on its last successful run and its outputs
+    exist. Stages whose dependencies are done run concurrently, up to
+    workers at a time; ingest, owner resolution and the GIS join each use
+    `processes` worker processes (None = one per CPU core). The Census
+    tier posts to census_url with census_concurrency batches in flight.
+    Per-stage timing and row counts are kept in the state file
+    (data/processed/pipeline_state.json). Returns True if every stage
+    succeeded or was fresh.
+
+    Unless dry_run, a JSON run report (stage timings and peak RSS,
+    per-county timers, geocoder HTTP latency histograms) is written to
+    report_path (default: data/processed/reports/run-<timestamp>.json).
+    profile ('cprofile' or 'pyinstrument') also dumps a profile per stage
+    next to the report; stages then run one at a time so profiles and
+    memory peaks are not mixed up between stages.
+    """
+    base_dir = Path(base_dir)
+    state_path = Path(state_path or base_dir / 'data/processed/pipeline_state.json')
+    report_path = Path(report_path or base_dir / 'data/processed/reports' / time.strftime('run-%Y%m%d-%H%M%S.json'))
+    profile_dir = report_path.with_suffix('')
+    if profile:
+        workers = 1
+    options = {'processes': processes, 'census_url': census_url, 'census_concurrency': census_concurrency}
+    state = load_manifest(state_path)
+    deps = dependencies(STAGES)
+
+    # Targets plus everything upstream of them
+    wanted, todo = set(), list(targets or STAGES)
+    while todo:
+        name = todo.pop()
+        if name not in STAGES:
+            raise ValueError(f"Unknown stage {name}; expected one of {list(STAGES)}")
+        if name not in wanted:
+            wanted.add(name)
+            todo += deps[name]
+    order = [name for name in STAGES if name in wanted]
+
+    done, failed, results = set(), set(), {}
+    pending = list(order)
+    running = {}
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        while pending or running:
+            for name in list(pending):
+                if any(d in failed for d in deps[name]):
+                    pending.remove(name)
+                    failed.add(name)
+                    results[name] = 'blocked'
+                    continue
+                if not all(d in done for d in deps[name] if d in wanted):
+                    continue
+                pending.remove(name)
+                spec = STAGES[name]
+                fingerprints = input_fingerprints(base_dir, spec, state.get(name, {}).get('inputs'))
+                upstream_runs = dry_run and any(results.get(d) == 'would run' for d in deps[name])
+                if name not in force and not upstream_runs and is_fresh(base_dir, spec, state.get(name), fingerprints):
+                    done.add(name)
+                    results[name] = 'fresh'
+                    continue
+                if dry_run:
+                    # Everything downstream of a stage that would run would run too
+                    done.add(name)
+                    results[name] = 'would run'
+                    continue
+                print(f"[{name}] starting")
+                running[pool.submit(run_stage, base_dir, name, spec, options, profile, profile_dir)] = (name, fingerprints)
+            if not running:
+                continue
+
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                name, fingerprints = running.pop(future)
+                try:
+                    record = future.result()
+                except Exception as e:
+                    failed.add(name)
+                    results[name] = 'failed'
+                    print(f"[{name}] failed: {e}")
+                    continue
+                done.add(name)
+                results[name] = 'ran'
+                # Fingerprints taken before the run: an input edited mid-run reruns next time
+                state[name] = {'inputs': fingerprints, **record}
+                save_manifest(state_path, state)
+                print(f"[{name}] done in {record['seconds']:.1f}s")
+
+    print(f"\n{'stage':<16} {'status':<10} {'seconds':>8} {'rows in':>10} {'rows out':>10}")
+    for name in order:
+        entry = state.get(name, {}) if results[name] in ('ran', 'fresh') else {}
+        fmt = lambda v: '' if v is None else f'{v:,}'
+        seconds = entry['seconds'] if results[name] == 'ran' else ''
+        print(f"{name:<16} {results[name]:<10} {seconds:>8} "
+              f"{fmt(entry.get('rows_in')):>10} {fmt(entry.get('rows_out')):>10}")
+    if not dry_run:
+        metrics.save(report_path, extra={'results': {name: results[name] for name in order}})
+        print(f"\nRun report: {report_path}")
+    return not failed
+
+if __name__ == '__main__':
+    base_dir = Path(__file__).parent.parent
+    parser = argparse.ArgumentParser(description='Run the pipeline stages that are out of date.')
+    parser.add_argument('targets', nargs='*', help=f"stages to bring up to date (default: all of {', '.join(STAGES)})")
+    parser.add_argument('--force', nargs='*', default=[], help='stages to rerun even if fresh')
+    parser.add_argument('--workers', type=int, default=2, help='stages run concurrently')
+    parser.add_argument('--dry-run', action='store_true', help='only report what would run')
+    parser.add_argument('--processes', type=int, help='worker processes per stage (default: one per core)')
+    parser.add_argument('--census-url', default=CENSUS_URL, help='Census batch geocoder endpoint')
+    parser.add_argument('--census-concurrency', type=int, default=4, help='Census batches in flight')
+    parser.add_argument('--report', help='run report path (default: data/processed/reports/run-<timestamp>.json)')
+    parser.add_argument('--profile', choices=['cprofile', 'pyinstrument'], help='dump a profile per stage (runs stages serially)')
+    args = parser.parse_args()
+    ok = run_pipeline(base_dir, args.targets or None, force=set(args.force), workers=args.workers,
+                      dry_run=args.dry_run, report_path=args.report, profile=args.profile,
+                      processes=args.processes, census_url=args.census_url,
+                      census_concurrency=args.census_concurrency)
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,34 @@
+import re
+
+# USPS-style abbreviations so 'N MAIN STREET' and 'NORTH MAIN ST' share a key
+STREET_ABBREVIATIONS = {
+    'NORTH': 'N', 'SOUTH': 'S', 'EAST': 'E', 'WEST': 'W',
+    'NORTHEAST': 'NE', 'NORTHWEST': 'NW', 'SOUTHEAST': 'SE', 'SOUTHWEST': 'SW',
+    'STREET': 'ST', 'AVENUE': 'AVE', 'AV': 'AVE', 'ROAD': 'RD', 'DRIVE': 'DR',
+    'BOULEVARD': 'BLVD', 'LANE': 'LN', 'COURT': 'CT', 'PLACE': 'PL',
+    'CIRCLE': 'CIR', 'TERRACE': 'TER', 'HIGHWAY': 'HWY', 'PARKWAY': 'PKWY',
+    'TRAIL': 'TRL', 'WAY': 'WAY', 'SQUARE': 'SQ', 'CAUSEWAY': 'CSWY',
+}
+
+_ABBREVIATION_RE = re.compile(r'\b(' + '|'.join(STREET_ABBREVIATIONS) + r')\b')
+
+def normalize_street(street):
+    """Uppercase, drop punctuation, collapse spaces and abbreviate a Series of street lines."""
+    street = street.fillna('').astype(str).str.upper()
+    street = street.str.replace(r'[^\w\s#/-]', ' ', regex=True).str.replace(r'\s+', ' ', regex=True).str.strip()
+    return street.str.replace(_ABBREVIATION_RE, lambda m: STREET_ABBREVIATIONS[m.group(1)], regex=True)
+
+def zip5(zipcode):
+    """First five digits of a Series of ZIP codes ('' when missing)."""
+    return zipcode.fillna('').astype(str).str.extract(r'(\d{5})', expand=False).fillna('')
+
+def address_keys(street, city, zipcode):
+    """Normalized 'STREET|CITY|ZIP5' keys for parallel Series of address parts.
+
+    The same physical address yields the same key across rolls, counties and
+    formatting differences, so it can key caches and deduplication. Rows
+    without a street get '': a city and ZIP alone do not identify an address.
+    """
+    street = normalize_street(street)
+    city = city.fillna('').astype(str).str.upper().str.replace(r'\s+', ' ', regex=True).str.strip()
+    return (street + '|' + city + '|' + zip5(zipcode)).where(street != '', '')
@@ -0,0 +1,248 @@
+import json
+import os
+import sqlite3
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Add project root to path for imports
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from scripts.utils.address import normalize_street, zip5
+
+# House number, optional fraction/letter suffix, then the street name
+HOUSE_NUMBER_RE = r'^\s*(\d+)(?:-\d+|\s+1/2|[A-Z])?\s+(.+?)\s*$'
+# Trailing unit designators are not part of the street name
+UNIT_RE = r'\s+(?:#|APT|UNIT|STE|SUITE|BLDG|BLD|LOT|RM)\b.*$|\s+#\S*$'
+
+# Column names accepted for address-point files (OpenAddresses, county/state exports)
+POINT_COLUMNS = {
+    'number': ['NUMBER', 'ADD_NUMBER', 'ADDNUM', 'HOUSE_NUM', 'HOUSENUM'],
+    'street': ['STREET', 'FULLNAME', 'STREET_NAME', 'ST_NAME'],
+    'zip': ['POSTCODE', 'ZIP', 'ZIPCODE', 'ZIP_CODE', 'ZIP5'],
+    'latitude': ['LAT', 'LATITUDE', 'Y'],
+    'longitude': ['LON', 'LONG', 'LONGITUDE', 'X'],
+}
+
+SCHEMA = """
+CREATE TABLE points (
+    street TEXT NOT NULL,
+    zip TEXT NOT NULL,
+    number INTEGER NOT NULL,
+    latitude REAL NOT NULL,
+    longitude REAL NOT NULL
+);
+CREATE TABLE ranges (
+    street TEXT NOT NULL,
+    zip TEXT NOT NULL,
+    lo INTEGER NOT NULL,
+    hi INTEGER NOT NULL,
+    from_num INTEGER NOT NULL,
+    to_num INTEGER NOT NULL,
+    parity TEXT NOT NULL,
+    coords TEXT NOT NULL
+);
+"""
+
+INDEXES = """
+CREATE INDEX idx_points ON points (street, zip, number);
+CREATE INDEX idx_ranges ON ranges (street, zip, lo);
+"""
+
+def split_address(street):
+    """Split a Series of PHY_ADDR1-style lines into house number and normalized street.
+
+    Returns a DataFrame with 'number' (nullable int) and 'street'; lines
+    without a leading house number get a missing number.
+    """
+    raw = street.fillna('').astype(str).str.upper().str.replace(UNIT_RE, '', regex=True)
+    parts = raw.str.extract(HOUSE_NUMBER_RE)
+    return pd.DataFrame({
+        'number': pd.to_numeric(parts[0], errors='coerce').astype('Int64'),
+        'street': normalize_street(parts[1]),
+    }, index=street.index)
+
+def _pick(df, names):
+    upper = {c.upper(): c for c in df.columns}
+    return next((upper[n] for n in names if n in upper), None)
+
+def read_address_points(path):
+    """Load an address-point CSV/parquet into (street, zip, number, latitude, longitude)."""
+    path = Path(path)
+    df = pd.read_parquet(path) if path.suffix.lower() == '.parquet' else pd.read_csv(path, dtype=str, low_memory=False)
+    cols = {key: _pick(df, names) for key, names in POINT_COLUMNS.items()}
+    missing = [key for key, col in cols.items() if col is None]
+    if missing:
+        raise ValueError(f"{path.name}: no column for {missing}. Columns: {df.columns.tolist()[:10]}...")
+    points = pd.DataFrame({
+        'street': normalize_street(df[cols['street']]),
+        'zip': zip5(df[cols['zip']]),
+        'number': pd.to_numeric(df[cols['number']], errors='coerce'),
+        'latitude': pd.to_numeric(df[cols['latitude']], errors='coerce'),
+        'longitude': pd.to_numeric(df[cols['longitude']], errors='coerce'),
+    })
+    points = points.dropna()
+    points = points[(points['street'] != '') & (points['zip'] != '')]
+    return points.astype({'number': 'int64'})
+
+def _line_coords(geom):
+    if geom.geom_type == 'MultiLineString':
+        return [xy for part in geom.geoms for xy in part.coords]
+    return list(geom.coords)
+
+def read_tiger_ranges(path):
+    """Load a TIGER/Line ADDRFEAT file (zip or .shp) into one row per side with a range.
+
+    ADDRFEAT has a left and a right range per edge (LFROMHN/LTOHN/ZIPL/PARITYL
+    and the R equivalents); each becomes a row with the edge geometry as
+    [[lon, lat], ...] JSON.
+    """
+    import geopandas as gpd  # only needed when the store is (re)built
+
+    edges = gpd.read_file(path)
+    if edges.crs and edges.crs.to_epsg() != 4326:
+        edges = edges.to_crs(epsg=4326)
+    edges = edges[edges.geometry.notna() & edges['FULLNAME'].notna()]
+    coords = [json.dumps([[round(x, 6), round(y, 6)] for x, y, *_ in _line_coords(g)]) for g in edges.geometry]
+    street = normalize_street(edges['FULLNAME'])
+
+    sides = []
+    for side in ['L', 'R']:
+        rows = pd.DataFrame({
+            'street': street.to_numpy(),
+            'zip': zip5(edges[f'ZIP{side}']).to_numpy(),
+            'from_num': pd.to_numeric(edges[f'{side}FROMHN'], errors='coerce').to_numpy(),
+            'to_num': pd.to_numeric(edges[f'{side}TOHN'], errors='coerce').to_numpy(),
+            'parity': edges[f'PARITY{side}'].fillna('B').astype(str).to_numpy(),
+            'coords': coords,
+        })
+        sides.append(rows.dropna(subset=['from_num', 'to_num']))
+    ranges = pd.concat(sides, ignore_index=True)
+    ranges = ranges[(ranges['street'] != '') & (ranges['zip'] != '')]
+    ranges = ranges.astype({'from_num': 'int64', 'to_num': 'int64'})
+    ranges['lo'] = ranges[['from_num', 'to_num']].min(axis=1)
+    ranges['hi'] = ranges[['from_num', 'to_num']].max(axis=1)
+    return ranges[['street', 'zip', 'lo', 'hi', 'from_num', 'to_num', 'parity', 'coords']]
+
+def build_address_store(path, tiger_files=(), point_files=()):
+    """Build the SQLite address store from ADDRFEAT and address-point files.
+
+    The database is written to a temp file and renamed into place, so a
+    failed build leaves any previous store intact. Returns (ranges, points)
+    row counts.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + '.tmp')
+    tmp.unlink(missing_ok=True)
+    conn = sqlite3.connect(str(tmp))
+    counts = [0, 0]
+    try:
+        conn.executescript(SCHEMA)
+        for f in tiger_files:
+            ranges = read_tiger_ranges(f)
+            conn.executemany('INSERT INTO ranges VALUES (?, ?, ?, ?, ?, ?, ?, ?)', ranges.itertuples(index=False))
+            counts[0] += len(ranges)
+            print(f"  {Path(f).name}: {len(ranges)} address ranges")
+        for f in point_files:
+            points = read_address_points(f)
+            conn.executemany('INSERT INTO points VALUES (?, ?, ?, ?, ?)', points.itertuples(index=False))
+            counts[1] += len(points)
+            print(f"  {Path(f).name}: {len(points)} address points")
+        conn.executescript(INDEXES)
+        conn.commit()
+    finally:
+        conn.close()
+    os.replace(tmp, path)
+    return tuple(counts)
+
+def interpolate_along(coords, fraction):
+    """Point at `fraction` (0..1) of the way along a [[lon, lat], ...] polyline."""
+    line = np.asarray(coords, dtype=float)
+    if len(line) == 1:
+        return line[0]
+    seg = np.hypot(*np.diff(line, axis=0).T)
+    total = seg.sum()
+    if total == 0:
+        return line[0]
+    cum = np.concatenate([[0.0], np.cumsum(seg)])
+    target = min(max(fraction, 0.0), 1.0) * total
+    i = min(np.searchsorted(cum, target, side='right') - 1, len(seg) - 1)
+    t = (target - cum[i]) / seg[i] if seg[i] else 0.0
+    return line[i] + t * (line[i + 1] - line[i])
+
+class AddressStore:
+    """Read-only lookups against a store built by build_address_store.
+
+    Exact address points are preferred; otherwise the house number is
+    interpolated along the TIGER range on the same street and ZIP whose
+    parity matches.
+    """
+
+    def __init__(self, path):
+        self.conn = sqlite3.connect(f'file:{Path(path)}?mode=ro', uri=True)
+        self.conn.execute('CREATE TEMP TABLE wanted (qid INTEGER PRIMARY KEY, street TEXT, zip TEXT, number INTEGER)')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.conn.close()
+
+    def geocode(self, street, zipcode):
+        """Geocode parallel Series of street lines and ZIP codes.
+
+        Returns a DataFrame on the input index with latitude, longitude and
+        match ('point', 'range' or missing).
+        """
+        query = split_address(street).reset_index(drop=True)
+        query['zip'] = zip5(zipcode).to_numpy()
+        lat = np.full(len(query), np.nan)
+        lon = np.full(len(query), np.nan)
+        match = np.full(len(query), None, dtype=object)
+        usable = query['number'].notna() & (query['street'] != '') & (query['zip'] != '')
+
+        self.conn.execute('DELETE FROM wanted')
+        self.conn.executemany(
+            'INSERT INTO wanted VALUES (?, ?, ?, ?)',
+            ((int(qid), s, z, int(n)) for qid, s, z, n in
+             query.loc[usable, ['street', 'zip', 'number']].itertuples(index=True))
+        )
+
+        points = self.conn.execute(
+            """
+            SELECT w.qid, AVG(p.latitude), AVG(p.longitude)
+            FROM wanted w JOIN points p
+              ON p.street = w.street AND p.zip = w.zip AND p.number = w.number
+            GROUP BY w.qid
+            """
+        ).fetchall()
+        for qid, point_lat, point_lon in points:
+            lat[qid], lon[qid], match[qid] = point_lat, point_lon, 'point'
+
+        # Narrowest matching range wins when edges overlap
+        ranges = self.conn.execute(
+            """
+            SELECT w.qid, w.number, r.from_num, r.to_num, r.coords
+            FROM wanted w JOIN ranges r
+              ON r.street = w.street AND r.zip = w.zip AND r.lo <= w.number AND r.hi >= w.number
+            WHERE (r.parity = 'B' OR (r.parity = 'E') = (w.number % 2 = 0))
+              AND w.qid NOT IN (SELECT w2.qid FROM wanted w2 JOIN points p
+                                ON p.street = w2.street AND p.zip = w2.zip AND p.number = w2.number)
+            ORDER BY w.qid, r.hi - r.lo
+            """
+        ).fetchall()
+        seen = set()
+        for qid, number, from_num, to_num, coords in ranges:
+            if qid in seen:
+                continue
+            seen.add(qid)
+            fraction = 0.5 if from_num == to_num else (number - from_num) / (to_num - from_num)
+            lon[qid], lat[qid] = interpolate_along(json.loads(coords), fraction)
+            match[qid] = 'range'
+        return pd.DataFrame({'latitude': lat, 'longitude': lon, 'match': match}, index=street.index)
@@ -0,0 +1,172 @@
+import heapq
+import io
+import random
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+
+import pandas as pd
+import requests
+
+# Add project root to path for imports
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from scripts.utils.metrics import metrics
+
+CENSUS_URL = 'https://geocoding.geo.census.gov/geocoder/geographies/addressbatch'
+CENSUS_PARAMS = {'benchmark': 'Public_AR_Current', 'vintage': 'Current_Current'}
+
+# Service limit per batch file
+MAX_BATCH = 10_000
+
+RESPONSE_COLS = ['id', 'input_addr', 'match_flag', 'match_type',
+                 'matched_addr', 'lonlat', 'tiger_id', 'side',
+                 'state_fips', 'county_fips', 'tract', 'block']
+
+_local = threading.local()
+
+def _session():
+    # One connection pool per worker thread
+    if not hasattr(_local, 'session'):
+        _local.session = requests.Session()
+    return _local.session
+
+RESULT_COLS = ['id', 'latitude', 'longitude', 'match_type']
+
+def parse_census_response(text):
+    """Parse a batch response into one row per answered address.
+
+    Columns: id, latitude, longitude, match_type. Addresses the service
+    could not match (No_Match/Tie) have NaN coordinates.
+    """
+    # Response format: "id, input_addr, match_flag, match_type, matched_addr, lon,lat, ..."
+    # Note: Census returns lon,lat (x,y)
+    result_df = pd.read_csv(io.StringIO(text), header=None, names=RESPONSE_COLS,
+                            dtype=str, on_bad_lines='skip')
+    result_df['id'] = pd.to_numeric(result_df['id'], errors='coerce')
+    result_df = result_df.dropna(subset=['id']).astype({'id': 'int64'})
+    result_df['latitude'] = float('nan')
+    result_df['longitude'] = float('nan')
+    matched = (result_df['match_flag'] == 'Match') & result_df['lonlat'].notna()
+    if matched.any():
+        lonlat = result_df.loc[matched, 'lonlat'].str.split(',', expand=True).astype(float)
+        result_df.loc[matched, 'longitude'] = lonlat[0]
+        result_df.loc[matched, 'latitude'] = lonlat[1]
+    result_df.loc[~matched, 'match_type'] = None
+    return result_df[RESULT_COLS]
+
+def post_batch(batch, url=CENSUS_URL, timeout=120):
+    """Submit one batch (columns: id, street, city, state, zip) and return (answers, seconds).
+
+    Raises on transport errors and non-200 responses so the caller can retry.
+    """
+    csv_buffer = io.StringIO()
+    batch[['id', 'street', 'city', 'state', 'zip']].to_csv(csv_buffer, index=False, header=False)
+    start = time.perf_counter()
+    try:
+        response = _session().post(
+            url,
+            files={'addressFile': ('batch.csv', csv_buffer.getvalue(), 'text/csv')},
+            data=CENSUS_PARAMS,
+            timeout=timeout
+        )
+    except requests.RequestException:
+        metrics.observe_http('census', time.perf_counter() - start, 'error')
+        raise
+    elapsed = time.perf_counter() - start
+    metrics.observe_http('census', elapsed, response.status_code)
+    if response.status_code != 200:
+        raise requests.HTTPError(f"Status {response.status_code}", response=response)
+    return parse_census_response(response.text), elapsed
+
+def geocode_batches(addresses, url=CENSUS_URL, concurrency=4, batch_size=500,
+                    min_batch=100, max_batch=MAX_BATCH, target_latency=30.0,
+                    max_retries=5, backoff=2.0, timeout=120, on_batch=None):
+    """Geocode an address table with several batches in flight.
+
+    addresses needs columns id, street, city, state, zip. Up to `concurrency`
+    requests run at once. The batch size adapts between min_batch and
+    max_batch: it grows while responses come back under target_latency
+    seconds, shrinks when they are slower, and halves on errors. Failed
+    batches are split (when above min_batch) and retried with exponential
+    backoff and jitter, up to max_retries times, before being dropped.
+    Returns one row per answered address (id, latitude, longitude,
+    match_type), with NaN coordinates for misses. Addresses in dropped
+    batches are absent. on_batch, if given, is called with each batch's
+    answers as soon as it completes (e.g. to checkpoint them).
+    """
+    addresses = addresses.reset_index(drop=True)
+    total = len(addresses)
+    cursor = 0
+    size = max(min_batch, min(batch_size, max_batch))
+    retries = []  # heap of (ready_at, seq, batch, attempt)
+    seq = 0
+    results = []
+    stats = {'batches': 0, 'retries': 0, 'dropped_rows': 0}
+
+    def next_batch():
+        nonlocal cursor, seq
+        if retries and retries[0][0] <= time.monotonic():
+            _, _, batch, attempt = heapq.heappop(retries)
+            return batch, attempt
+        if cursor < total:
+            batch = addresses.iloc[cursor:cursor + size]
+            cursor += len(batch)
+            return batch, 0
+        return None, None
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        in_flight = {}
+        while cursor < total or retries or in_flight:
+            while len(in_flight) < concurrency:
+                batch, attempt = next_batch()
+                if batch is None:
+                    break
+                future = pool.submit(post_batch, batch, url, timeout)
+                in_flight[future] = (batch, attempt)
+
+            if not in_flight:
+                # Only delayed retries remain
+                time.sleep(max(0.0, retries[0][0] - time.monotonic()))
+                continue
+
+            wake = max(0.05, retries[0][0] - time.monotonic()) if retries else None
+            done, _ = wait(in_flight, timeout=wake, return_when=FIRST_COMPLETED)
+            for future in done:
+                batch, attempt = in_flight.pop(future)
+                try:
+                    answers, elapsed = future.result()
+                except Exception as e:
+                    size = max(min_batch, size // 2)
+                    if attempt >= max_retries:
+                        print(f"    Dropping {len(batch)} addresses after {attempt + 1} attempts: {e}")
+                        stats['dropped_rows'] += len(batch)
+                        continue
+                    delay = backoff ** attempt + random.uniform(0, 1)
+                    print(f"    Batch of {len(batch)} failed ({e}); retrying in {delay:.1f}s")
+                    stats['retries'] += 1
+                    halves = [batch] if len(batch) <= min_batch else [batch.iloc[:len(batch) // 2], batch.iloc[len(batch) // 2:]]
+                    for part in halves:
+                        seq += 1
+                        heapq.heappush(retries, (time.monotonic() + delay, seq, part, attempt + 1))
+                    continue
+
+                stats['batches'] += 1
+                results.append(answers)
+                if on_batch is not None:
+                    on_batch(answers)
+                # Latency-driven sizing: grow toward the service limit while fast
+                if elapsed < target_latency / 2:
+                    size = min(max_batch, int(size * 1.5))
+                elif elapsed > target_latency:
+                    size = max(min_batch, int(size * 0.7))
+                print(f"  Batch of {len(batch)}: {answers['latitude'].notna().sum()} matched in {elapsed:.1f}s "
+                      f"({cursor}/{total} submitted, next size {size})")
+
+    print(f"Census geocoding: {stats['batches']} batches, {stats['retries']} retries, "
+          f"{stats['dropped_rows']} addresses dropped")
+    if not results:
+        return pd.DataFrame(columns=RESULT_COLS)
+    return pd.concat(results, ignore_index=True)
@@ -0,0 +1,110 @@
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+# Add project root to path for imports
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from scripts.utils.county_lookup import COUNTY_NAMES
+from scripts.utils.fingerprint import file_fingerprint, load_manifest, save_manifest
+
+# Parcel ID column names seen in county GIS layers, in order of preference
+PARCEL_ID_CANDIDATES = ['PARCELNO', 'PARCEL_ID', 'FOLIO', 'PIN', 'PARCEL', 'STRAP']
+
+# Bump when the cached table layout changes so stores are rebuilt
+STORE_VERSION = 2
+
+def find_shapefile(gis_dir, county_no):
+    """Locate the parcel shapefile for a county (naming varies by county)."""
+    gis_path = Path(gis_dir)
+    county_name = COUNTY_NAMES.get(county_no, str(county_no))
+    # Look for subdirectories first
+    shp_files = list(gis_path.glob(f'*{county_no}*/*.shp')) + \
+                list(gis_path.glob(f'*{county_name.lower()}*/*.shp')) + \
+                list(gis_path.glob(f'*{county_name}*/*.shp'))
+    return shp_files[0] if shp_files else None
+
+def id_columns(table):
+    """Parcel ID candidate columns present in a centroid table, in preference order."""
+    return [c for c in PARCEL_ID_CANDIDATES if c in table.columns]
+
+def build_centroids(shp_path):
+    """Parse a parcel shapefile into a centroid table.
+
+    The table holds every recognised parcel ID column (named as in
+    PARCEL_ID_CANDIDATES, as raw strings) plus latitude and longitude, so the
+    join can pick the column that actually matches the roster. Centroids are
+    computed once, in the layer's own CRS when it is projected, and only the
+    resulting points are reprojected to WGS84.
+    Raises ValueError if no parcel ID column is recognised.
+    """
+    import geopandas as gpd  # only needed when a store is (re)built
+
+    parcels_gis = gpd.read_file(shp_path)
+
+    # Standardize parcel ID column names (case insensitive)
+    table = {}
+    for candidate in PARCEL_ID_CANDIDATES:
+        match = next((col for col in parcels_gis.columns if col.upper() == candidate), None)
+        if match:
+            table[candidate] = parcels_gis[match].astype(str)
+    if not table:
+        raise ValueError(f"Cannot find parcel ID column. Columns: {parcels_gis.columns.tolist()[:5]}...")
+
+    centroids = parcels_gis.geometry.centroid
+    if centroids.crs and centroids.crs.to_epsg() != 4326:
+        centroids = centroids.to_crs(epsg=4326)
+
+    table['latitude'] = centroids.y.to_numpy()
+    table['longitude'] = centroids.x.to_numpy()
+    return pd.DataFrame(table)
+
+def _source_fingerprints(shp_path, previous=None):
+    """Fingerprints of the shapefile parts that affect centroids and IDs."""
+    previous = previous or {}
+    fingerprints = {}
+    for suffix in ['.shp', '.dbf', '.prj']:
+        part = Path(shp_path).with_suffix(suffix)
+        if part.exists():
+            fingerprints[suffix] = file_fingerprint(part, previous.get(suffix))
+    return fingerprints
+
+def load_centroids(county_no, gis_dir, cache_dir):
+    """Centroid table for a county, built from its shapefile only when needed.
+
+    The table is cached as <cache_dir>/<county_no>.parquet with a
+    <county_no>.json sidecar recording the source fingerprints. It is rebuilt
+    when the shapefile path or the .shp/.dbf/.prj content changes; otherwise
+    the shapefile is not opened at all. Returns None if the county has no
+    shapefile.
+    """
+    shp_path = find_shapefile(gis_dir, county_no)
+    if shp_path is None:
+        return None
+
+    cache_path = Path(cache_dir)
+    table_path = cache_path / f'{county_no}.parquet'
+    meta_path = cache_path / f'{county_no}.json'
+    meta = load_manifest(meta_path)
+    same_source = meta.get('version') == STORE_VERSION and meta.get('shapefile') == str(shp_path)
+
+    previous = meta.get('sources', {}) if same_source else {}
+    sources = _source_fingerprints(shp_path, previous)
+    hashes = lambda fps: {k: v['sha256'] for k, v in fps.items()}
+    if same_source and table_path.exists() and hashes(sources) == hashes(previous):
+        if sources != previous:
+            # Same content, new mtime: remember it so the next check skips hashing
+            save_manifest(meta_path, {**meta, 'sources': sources})
+        return pd.read_parquet(table_path)
+
+    centroids = build_centroids(shp_path)
+    cache_path.mkdir(parents=True, exist_ok=True)
+    centroids.to_parquet(table_path, index=False)
+    save_manifest(meta_path, {
+        'version': STORE_VERSION,
+        'shapefile': str(shp_path),
+        'sources': sources,
+        'parcels': len(centroids),
+    })
+    return centroids
@@ -0,0 +1,98 @@
+import hashlib
+import json
+
+import numpy as np
+import pandas as pd
+
+# Columnar export format, read by app/src/loadProperties.js.
+#
+# One binary file holds every column as a segment, each starting on an
+# 8-byte boundary so the browser can view it as a TypedArray without
+# copying. All numbers are little-endian. Column kinds:
+#   float32/float64  one value per row, NaN for missing
+#   dict             integer codes (uint8/16/32) into a JSON array of
+#                    distinct values; code 0 is reserved for missing
+#   string           JSON array with one value per row
+# The manifest lists the segments as {offset, byteLength}.
+
+FORMAT_VERSION = 1
+ALIGN = 8
+
+def _float_type(values):
+    # float32 when it round-trips exactly (units, years, square feet),
+    # float64 otherwise (dollar values, coordinates)
+    as32 = values.astype('<f4')
+    same = (as32.astype('<f8') == values) | np.isnan(values)
+    return 'float32' if same.all() else 'float64'
+
+def _code_type(n_values):
+    for name, limit in [('uint8', 1 << 8), ('uint16', 1 << 16)]:
+        if n_values < limit:
+            return name
+    return 'uint32'
+
+def _json_values(series):
+    return [None if pd.isna(v) else (v.item() if hasattr(v, 'item') else v) for v in series]
+
+def encode_columnar(df, dictionary_cols=(), float_cols=()):
+    """Encode df into (payload bytes, column metadata) in the format above.
+
+    float_cols become typed float arrays, dictionary_cols dictionary-encoded
+    values, and every other column a plain JSON string array.
+    """
+    chunks = []
+    size = 0
+
+    def segment(data):
+        nonlocal size
+        pad = -size % ALIGN
+        chunks.append(b'\0' * pad)
+        chunks.append(data)
+        size += pad
+        seg = {'offset': size, 'byteLength': len(data)}
+        size += len(data)
+        return seg
+
+    def json_segment(values):
+        return segment(json.dumps(values, separators=(',', ':')).encode('utf-8'))
+
+    columns = []
+    for name in df.columns:
+        col = df[name]
+        if name in float_cols:
+            values = pd.to_numeric(col, errors='coerce').astype('float64').to_numpy()
+            kind = _float_type(values)
+            columns.append({'name': name, 'type': kind,
+                            'data': segment(values.astype('<f4' if kind == 'float32' else '<f8').tobytes())})
+        elif name in dictionary_cols:
+            codes, uniques = pd.factorize(col, sort=True)
+            kind = _code_type(len(uniques) + 1)
+            columns.append({'name': name, 'type': 'dict', 'codes': kind,
+                            'data': segment((codes + 1).astype(np.dtype(kind).newbyteorder('<')).tobytes()),
+                            'values': json_segment([None] + _json_values(uniques))})
+        else:
+            columns.append({'name': name, 'type': 'string', 'values': json_segment(_json_values(col))})
+    return b''.join(chunks), columns
+
+def decode_columnar(payload, manifest):
+    """Decode a payload back into a DataFrame (for checks and benchmarks)."""
+    def view(seg, dtype):
+        return np.frombuffer(payload, dtype=dtype, count=seg['byteLength'] // np.dtype(dtype).itemsize,
+                             offset=seg['offset'])
+
+    def load_json(seg):
+        return json.loads(payload[seg['offset']:seg['offset'] + seg['byteLength']])
+
+    data = {}
+    for col in manifest['columns']:
+        if col['type'] in ('float32', 'float64'):
+            data[col['name']] = view(col['data'], '<f4' if col['type'] == 'float32' else '<f8')
+        elif col['type'] == 'dict':
+            values = np.array(load_json(col['values']), dtype=object)
+            data[col['name']] = values[view(col['data'], np.dtype(col['codes']).newbyteorder('<'))]
+        else:
+            data[col['name']] = load_json(col['values'])
+    return pd.DataFrame(data)
+
+def content_hash(payload, length=12):
+    return hashlib.sha256(payload).hexdigest()[:length]
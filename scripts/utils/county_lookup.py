@@ -1,3 +1,5 @@
+import re
+
 # Florida Department of Revenue (DOR) County Codes
 COUNTY_NAMES = {
     11: 'Alachua', 12: 'Baker', 13: 'Bay', 14: 'Bradford', 15: 'Brevard',
@@ -16,4 +18,22 @@ COUNTY_NAMES = {
     73: 'Union', 74: 'Volusia', 75: 'Wakulla', 76: 'Walton', 77: 'Washington'
 }
 
+# Census county FIPS codes (state 12). DOR numbers follow the same
+# alphabetical order as FIPS, except Miami-Dade which was renumbered 086.
+COUNTY_FIPS = {co: f'{2 * (co - 10) - 1:03d}' for co in COUNTY_NAMES}
+COUNTY_FIPS[23] = '086'
+STATE_FIPS = '12'
+
 PRIORITY_COUNTIES = {16, 23, 26, 39, 58, 60}  # Broward, Miami-Dade, Duval, Hillsborough, Orange, Palm Beach
+
+def county_from_filename(name):
+    """Best-effort DOR county number from a NAL/GIS file name, or None.
+
+    Handles extracted names like 'NAL23F202501.csv' and the portal zip names
+    like 'Dade 23 Final NAL 2025.zip'.
+    """
+    match = re.search(r'NAL(\d{2})[A-Z]', name, re.IGNORECASE)
+    if match and int(match.group(1)) in COUNTY_NAMES:
+        return int(match.group(1))
+    candidates = {int(m) for m in re.findall(r'(?<!\d)(\d{2})(?!\d)', name)} & COUNTY_NAMES.keys()
+    return candidates.pop() if len(candidates) == 1 else None
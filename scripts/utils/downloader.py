@@ -0,0 +1,183 @@
+import json
+import os
+import random
+import shutil
+import sys
+import threading
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+import requests
+
+# Add project root to path for imports
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from scripts.utils.metrics import metrics
+
+# Network reads block until a whole chunk arrives, so keep them small enough
+# that an interrupted transfer loses little; local copies use bigger blocks
+CHUNK_SIZE = 1 << 16
+COPY_SIZE = 1 << 20
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    # Byte counts and Range offsets must refer to the file itself, not a gzipped transfer
+    'Accept-Encoding': 'identity',
+}
+
+_local = threading.local()
+
+def _session():
+    # One connection pool per worker thread
+    if not hasattr(_local, 'session'):
+        _local.session = requests.Session()
+        _local.session.headers.update(HEADERS)
+    return _local.session
+
+def _validators(response):
+    return {k: v for k, v in [('etag', response.headers.get('ETag')),
+                              ('last_modified', response.headers.get('Last-Modified'))] if v}
+
+def fetch(url, dest, validators=None, timeout=60):
+    """Stream url to dest; returns (status, validators).
+
+    status is 'not_modified' (the server answered 304 to a conditional GET
+    built from validators), 'downloaded', 'resumed' or 'missing' (404).
+    Bytes go to <dest>.part first and are renamed into place once complete.
+    A .part left by an interrupted run is resumed with a Range request,
+    guarded by If-Range so a file that changed meanwhile starts over.
+    Other HTTP errors and transport errors raise, leaving the .part behind.
+    """
+    dest = Path(dest)
+    part = dest.with_name(dest.name + '.part')
+    part_meta = dest.with_name(dest.name + '.part.json')
+    headers = {}
+    offset = part.stat().st_size if part.exists() else 0
+    partial = json.loads(part_meta.read_text()) if offset and part_meta.exists() else {}
+    if offset and partial:
+        headers['Range'] = f'bytes={offset}-'
+        headers['If-Range'] = partial.get('etag') or partial['last_modified']
+    elif validators:
+        if validators.get('etag'):
+            headers['If-None-Match'] = validators['etag']
+        if validators.get('last_modified'):
+            headers['If-Modified-Since'] = validators['last_modified']
+
+    # Latency is time to the response headers; the body is streamed after
+    start = time.perf_counter()
+    try:
+        response = _session().get(url, headers=headers, stream=True, timeout=timeout)
+    except requests.RequestException:
+        metrics.observe_http('download', time.perf_counter() - start, 'error')
+        raise
+    metrics.observe_http('download', time.perf_counter() - start, response.status_code)
+
+    with response as r:
+        if r.status_code == 304:
+            return 'not_modified', validators
+        if r.status_code == 404:
+            return 'missing', None
+        if r.status_code == 416:
+            # Range past the end: the partial file is unusable
+            part.unlink(missing_ok=True)
+            part_meta.unlink(missing_ok=True)
+            raise requests.HTTPError(f"Status 416 resuming {dest.name}", response=r)
+        if r.status_code not in (200, 206):
+            raise requests.HTTPError(f"Status {r.status_code}", response=r)
+
+        resumed = r.status_code == 206 and r.headers.get('Content-Range', '').startswith(f'bytes {offset}-')
+        if not resumed:
+            offset = 0
+            meta = _validators(r)
+            if meta:
+                part_meta.write_text(json.dumps(meta))
+            else:
+                part_meta.unlink(missing_ok=True)  # nothing to guard a resume with
+        expected = r.headers.get('Content-Length')
+        expected = offset + int(expected) if expected is not None else None
+
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        with open(part, 'ab' if resumed else 'wb') as f:
+            for chunk in r.iter_content(chunk_size=CHUNK_SIZE):
+                f.write(chunk)
+        size = part.stat().st_size
+        if expected is not None and size != expected:
+            raise requests.ConnectionError(f"{dest.name}: got {size} of {expected} bytes")
+        result = {**(partial if resumed else {}), **_validators(r), 'size': size}
+
+    os.replace(part, dest)
+    part_meta.unlink(missing_ok=True)
+    return ('resumed' if resumed else 'downloaded'), result
+
+def download(urls, dest, validators=None, max_retries=4, backoff=2.0, timeout=60):
+    """Fetch the first of several candidate URLs that exists, with retries.
+
+    Returns (status, url, validators); status 'missing' if no candidate exists.
+    Failed attempts are retried with exponential backoff and jitter, and
+    resume from whatever reached the .part file. A candidate that still
+    fails after max_retries is skipped for the next one; the last error is
+    raised only if no candidate succeeded. The URL that served the
+    previous download (validators['url']) is tried first.
+    """
+    previous = (validators or {}).get('url')
+    if previous in urls:
+        urls = [previous] + [u for u in urls if u != previous]
+    error = None
+    for url in urls:
+        for attempt in range(max_retries + 1):
+            try:
+                status, result = fetch(url, dest, validators, timeout)
+                break
+            except requests.RequestException as e:
+                if attempt == max_retries:
+                    print(f"  {Path(dest).name}: giving up on {url}: {e}")
+                    status, error = 'failed', e
+                    break
+                delay = backoff ** attempt + random.uniform(0, 1)
+                print(f"  {Path(dest).name}: {e}; retrying in {delay:.1f}s")
+                time.sleep(delay)
+        if status not in ('missing', 'failed'):
+            return status, url, result
+    if error is not None:
+        raise error
+    return 'missing', None, None
+
+def download_all(jobs, workers=4, **kwargs):
+    """Run download() for many files on a bounded thread pool.
+
+    jobs maps a name to (candidate urls, dest, previous validators or None).
+    Yields (name, status, url, validators) as downloads finish; a download
+    that keeps failing yields status 'failed' with the error as url.
+    """
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(download, urls, dest, validators, **kwargs): name
+                   for name, (urls, dest, validators) in jobs.items()}
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                yield (name, *future.result())
+            except Exception as e:
+                yield name, 'failed', str(e), None
+
+def extract_members(zip_path, output_dir, suffixes=None):
+    """Stream zip members (optionally only those with the given suffixes) to output_dir.
+
+    Each member is copied through a temp file and renamed into place, so a
+    crash never leaves a truncated extract. Returns the extracted names.
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    names = []
+    with zipfile.ZipFile(zip_path) as z:
+        for info in z.infolist():
+            name = Path(info.filename).name
+            if info.is_dir() or (suffixes and not name.lower().endswith(tuple(suffixes))):
+                continue
+            target = output_dir / name
+            tmp = target.with_name(target.name + '.tmp')
+            with z.open(info) as src, open(tmp, 'wb') as dst:
+                shutil.copyfileobj(src, dst, COPY_SIZE)
+            os.replace(tmp, target)
+            names.append(name)
+    return names
@@ -0,0 +1,46 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+
+HASH_BLOCK = 1 << 20
+
+def file_fingerprint(path, previous=None):
+    """Content fingerprint of a file: size, mtime, sha256 and line count.
+
+    If `previous` (an earlier fingerprint) has the same size and mtime, its
+    hash and line count are reused instead of re-reading the file.
+    """
+    stat = os.stat(path)
+    fingerprint = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+    if previous and all(previous.get(k) == v for k, v in fingerprint.items()) and 'sha256' in previous:
+        fingerprint['sha256'] = previous['sha256']
+        fingerprint['lines'] = previous.get('lines')
+        return fingerprint
+
+    digest = hashlib.sha256()
+    lines = 0
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK), b''):
+            digest.update(block)
+            lines += block.count(b'\n')
+    fingerprint['sha256'] = digest.hexdigest()
+    fingerprint['lines'] = lines
+    return fingerprint
+
+def load_manifest(path):
+    """Read a JSON manifest, returning {} if it does not exist or is unreadable."""
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_manifest(path, manifest):
+    """Write a JSON manifest atomically (temp file + rename)."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + '.tmp')
+    with open(tmp, 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp, path)
@@ -0,0 +1,94 @@
+import sqlite3
+import time
+from pathlib import Path
+
+import pandas as pd
+
+DAY = 24 * 3600
+# Matches are stable for a long time; misses are retried sooner because the
+# remote reference data (and our address cleanup) improve between releases
+POSITIVE_TTL = 365 * DAY
+NEGATIVE_TTL = 30 * DAY
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS geocodes (
+    address_key TEXT PRIMARY KEY,
+    latitude REAL,
+    longitude REAL,
+    match_type TEXT,
+    source TEXT,
+    geocoded_at REAL NOT NULL
+)
+"""
+
+class GeocodeCache:
+    """On-disk geocode results keyed by normalized address (see address_keys).
+
+    Misses are stored with NULL coordinates. Lookups only return entries
+    younger than their TTL: positive_ttl for matches, negative_ttl for misses.
+    """
+
+    def __init__(self, path, positive_ttl=POSITIVE_TTL, negative_ttl=NEGATIVE_TTL):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(path))
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute(SCHEMA)
+        self.positive_ttl = positive_ttl
+        self.negative_ttl = negative_ttl
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.conn.close()
+
+    def lookup(self, keys):
+        """Fresh cache entries for the given keys.
+
+        Returns a DataFrame with address_key, latitude, longitude, match_type
+        and source. Misses come back with NaN coordinates.
+        """
+        now = time.time()
+        unique = pd.Series(keys).dropna().unique().tolist()
+        self.conn.execute('CREATE TEMP TABLE IF NOT EXISTS wanted (address_key TEXT PRIMARY KEY)')
+        self.conn.execute('DELETE FROM wanted')
+        self.conn.executemany('INSERT OR IGNORE INTO wanted VALUES (?)', ((k,) for k in unique))
+        rows = self.conn.execute(
+            """
+            SELECT g.address_key, g.latitude, g.longitude, g.match_type, g.source
+            FROM geocodes g JOIN wanted w ON g.address_key = w.address_key
+            WHERE (g.latitude IS NOT NULL AND g.geocoded_at >= ?)
+               OR (g.latitude IS NULL AND g.geocoded_at >= ?)
+            """,
+            (now - self.positive_ttl, now - self.negative_ttl)
+        ).fetchall()
+        return pd.DataFrame(rows, columns=['address_key', 'latitude', 'longitude', 'match_type', 'source'])
+
+    def store(self, results, source):
+        """Insert or refresh entries from a DataFrame with address_key, latitude,
+        longitude and match_type (NaN coordinates record a miss)."""
+        now = time.time()
+        records = (
+            (key, None if pd.isna(lat) else float(lat), None if pd.isna(lon) else float(lon),
+             None if pd.isna(match_type) else str(match_type), source, now)
+            for key, lat, lon, match_type in results[['address_key', 'latitude', 'longitude', 'match_type']].itertuples(index=False)
+        )
+        with self.conn:
+            self.conn.executemany('INSERT OR REPLACE INTO geocodes VALUES (?, ?, ?, ?, ?, ?)', records)
+
+    def evict_expired(self):
+        """Delete entries past their TTL; returns the number removed."""
+        now = time.time()
+        with self.conn:
+            cursor = self.conn.execute(
+                """
+                DELETE FROM geocodes
+                WHERE (latitude IS NOT NULL AND geocoded_at < ?)
+                   OR (latitude IS NULL AND geocoded_at < ?)
+                """,
+                (now - self.positive_ttl, now - self.negative_ttl)
+            )
+        return cursor.rowcount
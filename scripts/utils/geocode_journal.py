@@ -0,0 +1,61 @@
+import json
+import os
+from pathlib import Path
+
+import pandas as pd
+
+JOURNAL_COLS = ['address_key', 'latitude', 'longitude', 'match_type']
+
+class GeocodeJournal:
+    """Append-only JSONL checkpoint of remote geocoding answers.
+
+    Each completed batch is appended (and fsynced) as one line per address,
+    keyed by normalized address, so an interrupted run can skip everything
+    already answered. The journal is removed once its results are merged.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def load(self):
+        """Answers recorded by earlier runs; a torn last line is ignored."""
+        records = []
+        if self.path.exists():
+            with open(self.path) as f:
+                for line in f:
+                    try:
+                        records.append(json.loads(line))
+                    except ValueError:
+                        break
+        return pd.DataFrame(records, columns=JOURNAL_COLS).astype({'latitude': float, 'longitude': float})
+
+    def append(self, answers):
+        """Checkpoint a batch of answers (DataFrame with JOURNAL_COLS)."""
+        if self._file is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._file = open(self.path, 'a')
+        for key, lat, lon, match_type in answers[JOURNAL_COLS].itertuples(index=False):
+            self._file.write(json.dumps({
+                'address_key': key,
+                'latitude': None if pd.isna(lat) else float(lat),
+                'longitude': None if pd.isna(lon) else float(lon),
+                'match_type': None if pd.isna(match_type) else str(match_type),
+            }) + '\n')
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def remove(self):
+        self.close()
+        self.path.unlink(missing_ok=True)
@@ -0,0 +1,218 @@
+import cProfile
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import resource  # Unix only; peak RSS is reported as None elsewhere
+except ImportError:
+    resource = None
+
+try:
+    import psutil  # optional: current RSS on platforms without /proc
+except ImportError:
+    psutil = None
+
+try:
+    import pyinstrument  # optional: profile='pyinstrument'
+except ImportError:
+    pyinstrument = None
+
+# Upper edges (ms) of the HTTP latency histogram buckets; the last is open-ended
+LATENCY_BUCKETS_MS = [10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000]
+RSS_SAMPLE_SECONDS = 0.05
+
+def current_rss_mb():
+    """Resident set size of this process in MB, or None if it cannot be read."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2**20
+    except (OSError, ValueError, AttributeError):
+        pass
+    if psutil is not None:
+        return psutil.Process().memory_info().rss / 2**20
+    return None
+
+def peak_rss_mb(children=False):
+    """Lifetime peak RSS of this process (or of its finished children) in MB."""
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF)
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    return usage.ru_maxrss * (1 if sys.platform == 'darwin' else 1024) / 2**20
+
+def timed_call(fn, *args):
+    """Run fn(*args) and return (result, seconds, peak RSS MB of the calling process).
+
+    For work sent to process pools: workers have their own Metrics, so they
+    hand their timing back with the result and the parent records it.
+    """
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start, peak_rss_mb()
+
+class _RssSampler:
+    # Background thread tracking the highest RSS seen while a stage runs
+    def __init__(self):
+        self.peak = current_rss_mb()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(RSS_SAMPLE_SECONDS):
+            rss = current_rss_mb()
+            if rss is not None and (self.peak is None or rss > self.peak):
+                self.peak = rss
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+class Metrics:
+    """Run-wide instrumentation: stage records, timers and HTTP latency histograms.
+
+    Stages (stage()) get wall time, rows in/out and the peak RSS sampled
+    while they ran, and optionally a profile dump. Timers (timer() or
+    record()) accumulate count/total/max per name, e.g. 'ingest.county.23'.
+    HTTP calls (observe_http()) go into per-service latency histograms.
+    report() returns it all as a JSON-ready dict. Thread-safe.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started = time.strftime('%Y-%m-%dT%H:%M:%S')
+        self.stages = {}
+        self.timers = {}
+        self.http = {}
+
+    @contextmanager
+    def stage(self, name, rows_in=None, profile=None, profile_dir=None):
+        """Time a stage; the yielded dict takes rows_out (and any extra fields).
+
+        profile='cprofile' writes <profile_dir>/<name>.prof (open with
+        pstats or snakeviz); 'pyinstrument' writes <name>.html. Profilers
+        only see the thread that runs the stage, not pool workers.
+        """
+        record = {'rows_in': rows_in, 'rows_out': None}
+        profiler = None
+        if profile == 'cprofile':
+            profiler = cProfile.Profile()
+            profiler.enable()
+        elif profile == 'pyinstrument':
+            if pyinstrument is None:
+                raise ImportError("profile='pyinstrument' needs the pyinstrument package")
+            profiler = pyinstrument.Profiler()
+            profiler.start()
+        start = time.perf_counter()
+        try:
+            with _RssSampler() as rss:
+                yield record
+            record['status'] = 'ok'
+        except BaseException:
+            record['status'] = 'failed'
+            raise
+        finally:
+            record['seconds'] = round(time.perf_counter() - start, 3)
+            record['peak_rss_mb'] = round(rss.peak, 1) if rss.peak is not None else None
+            if profiler is not None:
+                profile_dir = Path(profile_dir or '.')
+                profile_dir.mkdir(parents=True, exist_ok=True)
+                if profile == 'cprofile':
+                    profiler.disable()
+                    record['profile'] = str(profile_dir / f'{name}.prof')
+                    profiler.dump_stats(record['profile'])
+                else:
+                    profiler.stop()
+                    record['profile'] = str(profile_dir / f'{name}.html')
+                    Path(record['profile']).write_text(profiler.output_html())
+            with self._lock:
+                self.stages[name] = record
+
+    def record(self, name, seconds, rows_in=None, rows_out=None, peak_rss_mb=None):
+        """Add one timed unit of work (e.g. a county) under name."""
+        with self._lock:
+            t = self.timers.setdefault(name, {'count': 0, 'seconds': 0.0, 'max_seconds': 0.0})
+            t['count'] += 1
+            t['seconds'] += seconds
+            t['max_seconds'] = max(t['max_seconds'], seconds)
+            for key, value in [('rows_in', rows_in), ('rows_out', rows_out)]:
+                if value is not None:
+                    t[key] = t.get(key, 0) + value
+            if peak_rss_mb is not None:
+                t['peak_rss_mb'] = round(max(t.get('peak_rss_mb', 0.0), peak_rss_mb), 1)
+
+    @contextmanager
+    def timer(self, name):
+        """Time a block and record() it under name; the yielded dict takes rows_in/rows_out."""
+        counts = {}
+        start = time.perf_counter()
+        try:
+            yield counts
+        finally:
+            self.record(name, time.perf_counter() - start, counts.get('rows_in'), counts.get('rows_out'))
+
+    def observe_http(self, service, seconds, status):
+        """Add one HTTP call (status code, or 'error' for transport failures)."""
+        ms = seconds * 1000
+        bucket = next((i for i, edge in enumerate(LATENCY_BUCKETS_MS) if ms <= edge), len(LATENCY_BUCKETS_MS))
+        with self._lock:
+            h = self.http.setdefault(service, {
+                'count': 0, 'total_ms': 0.0, 'max_ms': 0.0,
+                'buckets': [0] * (len(LATENCY_BUCKETS_MS) + 1), 'status': {}})
+            h['count'] += 1
+            h['total_ms'] += ms
+            h['max_ms'] = max(h['max_ms'], ms)
+            h['buckets'][bucket] += 1
+            h['status'][str(status)] = h['status'].get(str(status), 0) + 1
+
+    def report(self):
+        """Everything recorded so far, plus process-wide peak RSS."""
+        with self._lock:
+            http = {}
+            for service, h in self.http.items():
+                http[service] = {**h, 'total_ms': round(h['total_ms'], 1), 'max_ms': round(h['max_ms'], 1),
+                                 'mean_ms': round(h['total_ms'] / h['count'], 1),
+                                 'p50_ms': _bucket_quantile(h['buckets'], 0.5),
+                                 'p95_ms': _bucket_quantile(h['buckets'], 0.95),
+                                 'bucket_edges_ms': LATENCY_BUCKETS_MS}
+            return {
+                'started': self.started,
+                'finished': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                'peak_rss_mb': peak_rss_mb(),
+                'children_peak_rss_mb': peak_rss_mb(children=True),
+                'stages': dict(self.stages),
+                'timers': {k: {**v, 'seconds': round(v['seconds'], 3), 'max_seconds': round(v['max_seconds'], 3)}
+                           for k, v in sorted(self.timers.items())},
+                'http': http,
+            }
+
+    def save(self, path, extra=None):
+        """Write report() (plus any extra top-level fields) as JSON, atomically."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + '.tmp')
+        with open(tmp, 'w') as f:
+            json.dump({**self.report(), **(extra or {})}, f, indent=2)
+        os.replace(tmp, path)
+        return path
+
+def _bucket_quantile(buckets, q):
+    # Upper edge of the bucket holding the q-quantile (None if open-ended)
+    target = q * sum(buckets)
+    seen = 0
+    for i, n in enumerate(buckets):
+        seen += n
+        if n and seen >= target:
+            return LATENCY_BUCKETS_MS[i] if i < len(LATENCY_BUCKETS_MS) else None
+    return None
+
+# Shared by everything in the process; the pipeline runner saves it at the end
+metrics = Metrics()
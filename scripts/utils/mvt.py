@@ -0,0 +1,79 @@
+import math
+import struct
+
+# Minimal Mapbox Vector Tile (v2) encoder for point layers.
+# Spec: https://github.com/mapbox/vector-tile-spec/tree/master/2.1
+# Protobuf is written by hand: varints, length-delimited fields and packed
+# repeated uint32, which is all the point subset of the format needs.
+
+EXTENT = 4096
+POINT = 1
+MOVE_TO = 1
+
+def _varint(n):
+    out = bytearray()
+    while True:
+        byte = n & 0x7F
+        n >>= 7
+        if n:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+def _zigzag(n):
+    return (n << 1) ^ (n >> 63)
+
+def _field(number, wire_type):
+    return _varint((number << 3) | wire_type)
+
+def _bytes(number, data):
+    return _field(number, 2) + _varint(len(data)) + data
+
+def _uint(number, value):
+    return _field(number, 0) + _varint(value)
+
+def _packed(number, values):
+    return _bytes(number, b''.join(_varint(v) for v in values))
+
+def _value(v):
+    # Value message: 1 string, 3 double, 6 sint64, 7 bool
+    if isinstance(v, bool):
+        return _uint(7, int(v))
+    if isinstance(v, int):
+        return _field(6, 0) + _varint(_zigzag(v))
+    if isinstance(v, float):
+        return _field(3, 1) + struct.pack('<d', v)
+    return _bytes(1, str(v).encode('utf-8'))
+
+def _is_missing(v):
+    return v is None or (isinstance(v, float) and math.isnan(v))
+
+def encode_layer(name, features, extent=EXTENT):
+    """Encode one layer. features is a list of (x, y, properties) in tile
+    coordinates (0..extent); missing property values are left out."""
+    keys, values = {}, {}
+    encoded = []
+    for x, y, props in features:
+        tags = []
+        for key, v in props.items():
+            if _is_missing(v):
+                continue
+            key_index = keys.setdefault(key, len(keys))
+            # Type is part of the identity so 1, 1.0 and True stay distinct
+            value_index = values.setdefault((type(v).__name__, v), len(values))
+            tags += [key_index, value_index]
+        geometry = [(1 << 3) | MOVE_TO, _zigzag(int(x)), _zigzag(int(y))]
+        feature = _packed(2, tags) + _uint(3, POINT) + _packed(4, geometry)
+        encoded.append(_bytes(2, feature))
+
+    layer = [_uint(15, 2), _bytes(1, name.encode('utf-8'))]
+    layer += encoded
+    layer += [_bytes(3, k.encode('utf-8')) for k in keys]
+    layer += [_bytes(4, _value(v)) for _, v in values]
+    layer.append(_uint(5, extent))
+    return b''.join(layer)
+
+def encode_tile(layers, extent=EXTENT):
+    """Encode a tile from {layer_name: features} (see encode_layer)."""
+    return b''.join(_bytes(3, encode_layer(name, features, extent)) for name, features in layers.items())
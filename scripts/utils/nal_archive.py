@@ -0,0 +1,93 @@
+import hashlib
+import sys
+import zipfile
+from pathlib import Path
+
+# Add project root to path for imports
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from scripts.utils.fingerprint import HASH_BLOCK, file_fingerprint
+
+NAL_SUFFIXES = ('.csv', '.txt')
+
+class NalMember:
+    """A NAL file inside a county zip, read in place instead of extracted.
+
+    Has the bits of the Path interface the ingest code uses (name, stem,
+    equality, ordering) and pickles as two strings, so worker processes
+    open the archive themselves.
+    """
+
+    def __init__(self, archive, member):
+        self.archive = Path(archive)
+        self.member = member
+        self.name = Path(member).name
+        self.stem = Path(member).stem
+
+    def _key(self):
+        return (str(self.archive), self.member)
+
+    def __eq__(self, other):
+        return isinstance(other, NalMember) and self._key() == other._key()
+
+    def __hash__(self):
+        return hash(self._key())
+
+    def __lt__(self, other):
+        return self._key() < other._key()
+
+    def __repr__(self):
+        return f"NalMember({str(self.archive)!r}, {self.member!r})"
+
+    def open(self):
+        """Binary stream of the member, decompressed on the fly."""
+        with zipfile.ZipFile(self.archive) as z:
+            # The member stream keeps the archive's file handle open on its own
+            return z.open(self.member)
+
+def open_nal(source):
+    """Open an extracted NAL file or a NalMember for binary reading."""
+    return source.open() if isinstance(source, NalMember) else open(source, 'rb')
+
+def nal_sources(nal_dir):
+    """NAL inputs in nal_dir: extracted .csv/.txt files, then members of the
+    .zip archives that have no extracted copy (as NalMember)."""
+    nal_path = Path(nal_dir)
+    files = sorted(nal_path.glob('*.csv')) + sorted(nal_path.glob('*.txt'))
+    seen = {f.name for f in files}
+    members = []
+    for archive in sorted(nal_path.glob('*.zip')):
+        try:
+            with zipfile.ZipFile(archive) as z:
+                names = [i.filename for i in z.infolist() if not i.is_dir()]
+        except zipfile.BadZipFile:
+            print(f"  Warning: skipping unreadable archive {archive.name}")
+            continue
+        for name in names:
+            if Path(name).suffix.lower() in NAL_SUFFIXES and Path(name).name not in seen:
+                seen.add(Path(name).name)
+                members.append(NalMember(archive, name))
+    return files + members
+
+def nal_fingerprint(source, previous=None):
+    """file_fingerprint() for extracted files and zip members alike.
+
+    A member's fingerprint is keyed on its CRC and uncompressed size from the
+    zip directory; the sha256 and line count are only recomputed (by
+    streaming the member) when those change.
+    """
+    if not isinstance(source, NalMember):
+        return file_fingerprint(source, previous)
+    with zipfile.ZipFile(source.archive) as z:
+        info = z.getinfo(source.member)
+    fingerprint = {'size': info.file_size, 'crc32': info.CRC}
+    if previous and all(previous.get(k) == v for k, v in fingerprint.items()) and 'sha256' in previous:
+        return {**fingerprint, 'sha256': previous['sha256'], 'lines': previous.get('lines')}
+
+    digest = hashlib.sha256()
+    lines = 0
+    with source.open() as f:
+        for block in iter(lambda: f.read(HASH_BLOCK), b''):
+            digest.update(block)
+            lines += block.count(b'\n')
+    return {**fingerprint, 'sha256': digest.hexdigest(), 'lines': lines}
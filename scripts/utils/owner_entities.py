@@ -0,0 +1,172 @@
+import hashlib
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from difflib import SequenceMatcher
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Add project root to path for imports
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from scripts.utils.address import normalize_street, zip5
+
+# Spelling variants that name the same thing in owner names
+OWNER_ABBREVIATIONS = {
+    'APARTMENTS': 'APTS', 'APARTMENT': 'APT', 'APTMTS': 'APTS',
+    'INCORPORATED': 'INC', 'CORPORATION': 'CORP', 'COMPANY': 'CO',
+    'LIMITED': 'LTD', 'PARTNERSHIP': 'PTNSHP', 'PARTNERS': 'PTNRS',
+    'ASSOCIATES': 'ASSOC', 'ASSOCIATION': 'ASSN', 'PROPERTIES': 'PROP', 'PROPERTY': 'PROP',
+    'INVESTMENTS': 'INV', 'INVESTMENT': 'INV', 'MANAGEMENT': 'MGMT', 'HOLDING': 'HOLDINGS',
+    'TRUSTEE': 'TR', 'TRUSTEES': 'TR', 'AND': '&',
+}
+# Multi-word legal forms, collapsed before tokenizing
+LEGAL_FORMS = [
+    (r'\bL\s?L\s?C\b', 'LLC'), (r'\bL\s?L\s?L\s?P\b', 'LLLP'), (r'\bL\s?L\s?P\b', 'LLP'),
+    (r'\bL\s?P\b', 'LP'), (r'\bP\s?A\b', 'PA'), (r'\bLIMITED LIABILITY COMPANY\b', 'LLC'),
+    (r'\bLIMITED PARTNERSHIP\b', 'LP'),
+]
+# Legal-form and filler tokens ignored when comparing names
+ENTITY_SUFFIXES = {'LLC', 'LLLP', 'LLP', 'LP', 'PA', 'PLLC', 'INC', 'CORP', 'CO', 'LTD', 'TR', 'THE', 'OF', '&'}
+
+_ABBREVIATION_RE = re.compile(r'\b(' + '|'.join(OWNER_ABBREVIATIONS) + r')\b')
+
+# Blocks bigger than this are compared by sorted neighbourhood (see split_block)
+MAX_BLOCK = 200
+SORTED_WINDOW = 20
+
+# Minimum similarity of the core names: a shared mailing address is strong
+# evidence on its own, so it needs less name agreement
+NAME_THRESHOLD = 0.92
+ADDRESS_THRESHOLD = 0.85
+
+def normalize_owner(names):
+    """Uppercase owner names with punctuation dropped and legal forms/words abbreviated."""
+    names = names.fillna('').astype(str).str.upper()
+    names = names.str.replace(r'[.,\'"]', '', regex=True).str.replace(r'[^\w&]+', ' ', regex=True)
+    for pattern, replacement in LEGAL_FORMS:
+        names = names.str.replace(pattern, replacement, regex=True)
+    names = names.str.replace(_ABBREVIATION_RE, lambda m: OWNER_ABBREVIATIONS[m.group(1)], regex=True)
+    return names.str.replace(r'\s+', ' ', regex=True).str.strip()
+
+def core_name(name):
+    """The distinguishing part of a normalized name (legal forms and fillers removed)."""
+    return ' '.join(t for t in name.split() if t not in ENTITY_SUFFIXES)
+
+def name_signature(core):
+    """Cheap blocking key: first 4 letters of the first token plus the initial
+    of the last one, so typos and abbreviations mid-name still collide."""
+    tokens = core.split()
+    return f'{tokens[0][:4]}|{tokens[-1][0]}' if tokens else ''
+
+_NUMBER_RE = re.compile(r'\d+')
+
+def _similar(a, b, threshold):
+    # Numbered entities ('SUNSET 12 LLC', 'SUNSET 14 LLC') are usually
+    # distinct special-purpose companies: numbers must agree exactly
+    if _NUMBER_RE.findall(a) != _NUMBER_RE.findall(b):
+        return False
+    matcher = SequenceMatcher(None, a, b, autojunk=False)
+    return (matcher.real_quick_ratio() >= threshold and matcher.quick_ratio() >= threshold
+            and matcher.ratio() >= threshold)
+
+def _block_pairs(members, window):
+    if window is None:
+        return ((members[i], members[j]) for i in range(len(members)) for j in range(i + 1, len(members)))
+    return ((members[i], members[j]) for i in range(len(members))
+            for j in range(i + 1, min(i + 1 + window, len(members))))
+
+def split_block(threshold, members):
+    """Work units for one block: (threshold, window, members).
+
+    Small blocks compare all pairs (window None). Large ones (registered-agent
+    mailing addresses, very common name prefixes) are sorted by name and cut
+    into overlapping slices compared only within SORTED_WINDOW neighbours,
+    so each unit stays cheap and they spread evenly across workers.
+    """
+    if len(members) <= MAX_BLOCK:
+        return [(threshold, None, members)]
+    ordered = sorted(members, key=lambda m: m[1])
+    return [(threshold, SORTED_WINDOW, ordered[i:i + MAX_BLOCK + SORTED_WINDOW])
+            for i in range(0, len(ordered) - 1, MAX_BLOCK)]
+
+def match_blocks(blocks):
+    """Matched node pairs within a list of (threshold, window, [(node, core), ...]) units."""
+    pairs = []
+    for threshold, window, members in blocks:
+        for (a, name_a), (b, name_b) in _block_pairs(members, window):
+            if name_a == name_b or _similar(name_a, name_b, threshold):
+                pairs.append((a, b))
+    return pairs
+
+def _find(parent, i):
+    while parent[i] != i:
+        parent[i] = parent[parent[i]]
+        i = parent[i]
+    return i
+
+def resolve_owners(names, addresses, zipcodes, workers=1):
+    """Cluster owner records into entities.
+
+    Takes parallel Series of owner name, mailing address line and mailing
+    ZIP. Distinct normalized names are blocked by name signature and by
+    mailing address (ZIP + normalized street), and fuzzy-matched only
+    within blocks; matches are merged with union-find. Returns
+    (entity_id, entity_name) Series on the input index: the id is a stable
+    hash of the cluster's canonical (normalized) name, the name the most
+    frequent raw spelling among its rows.
+    Rows without a name get missing values.
+    """
+    norm = normalize_owner(names)
+    codes, nodes = pd.factorize(norm)
+    cores = [core_name(n) for n in nodes]
+
+    # Block memberships: (key, node) pairs from name signatures and addresses
+    signature = pd.DataFrame({'key': ['N:' + name_signature(c) if c else '' for c in cores], 'node': np.arange(len(nodes))})
+    street, zips = normalize_street(addresses), zip5(zipcodes)
+    has_address = ((street != '') & (zips != '')).to_numpy()
+    by_address = pd.DataFrame({'key': ('A:' + zips + '|' + street).to_numpy(), 'node': codes})[has_address]
+    memberships = pd.concat([signature[signature['key'] != ''], by_address]).drop_duplicates()
+
+    blocks = []
+    for key, members in memberships.groupby('key', sort=True)['node']:
+        members = [(int(m), cores[m]) for m in members if cores[m]]
+        if len(members) > 1:
+            blocks += split_block(ADDRESS_THRESHOLD if key.startswith('A:') else NAME_THRESHOLD, members)
+
+    workers = workers or os.cpu_count() or 1
+    if workers > 1 and len(blocks) > 1:
+        # Deal units out largest first so every worker gets a similar share
+        blocks.sort(key=lambda b: len(b[2]), reverse=True)
+        chunks = [blocks[i::workers * 4] for i in range(workers * 4)]
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            pairs = [p for chunk_pairs in pool.map(match_blocks, chunks) for p in chunk_pairs]
+    else:
+        pairs = match_blocks(blocks)
+
+    parent = list(range(len(nodes)))
+    for a, b in pairs:
+        root_a, root_b = _find(parent, a), _find(parent, b)
+        if root_a != root_b:
+            parent[max(root_a, root_b)] = min(root_a, root_b)
+    roots = np.array([_find(parent, i) for i in range(len(nodes))], dtype=np.int64)
+
+    # The id hashes the alphabetically first normalized name of the cluster
+    counts = pd.DataFrame({'root': roots, 'name': nodes})
+    counts = counts[counts['name'] != '']
+    anchor = counts.groupby('root')['name'].min()
+    ids = anchor.map(lambda n: 'OE' + hashlib.sha1(n.encode('utf-8')).hexdigest()[:12])
+
+    # Display name: the cluster's most frequent raw OWN_NAME, then alphabetical
+    row_roots = pd.Series(np.where(codes >= 0, roots[np.maximum(codes, 0)], -1), index=names.index)
+    named = (row_roots >= 0) & (norm != '')
+    spellings = (pd.DataFrame({'root': row_roots[named], 'name': names[named].astype(str).str.strip()})
+                   .groupby(['root', 'name']).size().rename('rows').reset_index())
+    canonical = spellings.sort_values(['root', 'rows', 'name'], ascending=[True, False, True]).drop_duplicates('root')
+    canonical = canonical.set_index('root')['name']
+    print(f"Owner resolution: {int((nodes != '').sum())} distinct names -> {len(canonical)} entities "
+          f"({len(blocks)} blocks, {len(pairs)} matched pairs)")
+    return row_roots.map(ids), row_roots.map(canonical)
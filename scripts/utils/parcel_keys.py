@@ -0,0 +1,56 @@
+import pandas as pd
+
+# Canonical parcel-key normalizers, from strictest to loosest. Counties write
+# the same parcel as '01-3125-023-0010', '0131250230010' or '1312502300100.000'
+# depending on the system that exported it, so each county is matched with
+# whichever normalizer gives the best overlap (see choose_parcel_key).
+
+def _strip(ids):
+    return ids.str.strip().str.upper()
+
+def _alnum(ids):
+    # Dashes, dots, spaces and slashes between section/township/range groups
+    return ids.str.upper().str.replace(r'[^0-9A-Z]', '', regex=True)
+
+def _alnum_nozero(ids):
+    return _alnum(ids).str.lstrip('0')
+
+def _alnum_nosuffix(ids):
+    # STRAP-style trailing sub-parcel suffix: '...00001.0000' -> '...00001'
+    return _alnum_nozero(ids.str.replace(r'\.0+\s*$', '', regex=True))
+
+NORMALIZERS = {
+    'strip': _strip,
+    'alnum': _alnum,
+    'alnum_nozero': _alnum_nozero,
+    'alnum_nosuffix': _alnum_nosuffix,
+}
+
+# Cap on GIS rows scored per (column, normalizer) pair; overlap ratios on a
+# sample are enough to rank the candidates for very large counties
+SCORE_SAMPLE = 200_000
+
+def normalize_parcel_ids(ids, normalizer):
+    """Apply a named normalizer to a Series of parcel IDs (missing -> '')."""
+    return NORMALIZERS[normalizer](ids.fillna('').astype(str))
+
+def choose_parcel_key(roster_ids, gis_table, candidate_cols):
+    """Pick the GIS ID column and normalizer that best match the roster.
+
+    Every (column, normalizer) pair is scored by how many roster parcel IDs
+    it finds among the GIS IDs; ties go to the stricter normalizer, then the
+    earlier column. Returns (column, normalizer, matches), or
+    (None, None, 0) if nothing overlaps.
+    """
+    if len(gis_table) > SCORE_SAMPLE:
+        gis_table = gis_table.sample(SCORE_SAMPLE, random_state=0)
+    best = (None, None, 0)
+    for normalizer in NORMALIZERS:
+        roster_keys = normalize_parcel_ids(pd.Series(roster_ids), normalizer)
+        roster_keys = roster_keys[roster_keys != '']
+        for col in candidate_cols:
+            gis_keys = pd.Index(normalize_parcel_ids(gis_table[col], normalizer).unique())
+            matches = int(roster_keys.isin(gis_keys).sum())
+            if matches > best[2]:
+                best = (col, normalizer, matches)
+    return best
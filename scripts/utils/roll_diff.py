@@ -0,0 +1,113 @@
+import numpy as np
+import pandas as pd
+
+KEY_COLS = ['CO_NO', 'PARCEL_ID']
+# A change in any of these means the property has to be geocoded again
+ADDRESS_COLS = ['PHY_ADDR1', 'PHY_ADDR2', 'PHY_CITY', 'PHY_ZIPCD']
+# Added by the geocoding tiers: carried over between rolls, never compared
+GEOCODE_COLS = ['latitude', 'longitude', 'geocode_source']
+# Produced by the owner resolution stage from the compared columns, so never compared themselves
+DERIVED_COLS = ['owner_entity_id', 'owner_entity_name']
+CHANGE_KINDS = ['new', 'removed', 'changed']
+
+def _normalized(df, columns):
+    # The same value must hash the same in both snapshots even when dtypes
+    # drift between runs (int vs float once a NaN appears, categorical vs
+    # plain strings, CO_NO coming back as the partition key)
+    out = {}
+    for col in columns:
+        s = df[col] if col in df.columns else pd.Series(None, index=df.index, dtype=object)
+        if isinstance(s.dtype, pd.CategoricalDtype):
+            s = s.astype(s.cat.categories.dtype)
+        if pd.api.types.is_numeric_dtype(s) or pd.api.types.is_bool_dtype(s):
+            out[col] = s.astype('float64')
+        else:
+            out[col] = s.astype(object).where(s.notna(), None).astype(str)
+    return pd.DataFrame(out, index=df.index)
+
+def row_hashes(df, columns):
+    """One uint64 per row over the given columns (vectorized, no Python loop over rows)."""
+    if not columns:
+        return np.zeros(len(df), dtype=np.uint64)
+    return pd.util.hash_pandas_object(_normalized(df, columns), index=False).to_numpy()
+
+def roll_keys(df):
+    """(CO_NO, PARCEL_ID) as int and str columns, comparable across snapshots."""
+    co_no = df['CO_NO']
+    if isinstance(co_no.dtype, pd.CategoricalDtype):
+        co_no = co_no.astype(co_no.cat.categories.dtype)
+    return pd.DataFrame({
+        'CO_NO': pd.to_numeric(co_no, errors='coerce').fillna(0).astype('int64').to_numpy(),
+        'PARCEL_ID': df['PARCEL_ID'].astype(str).str.strip().to_numpy(),
+    })
+
+def _fingerprints(df, columns, address_cols):
+    table = roll_keys(df)
+    table['_row'] = row_hashes(df, columns)
+    table['_address'] = row_hashes(df, address_cols)
+    duplicated = table.duplicated(subset=KEY_COLS, keep='last')
+    if duplicated.any():
+        print(f"  Warning: {duplicated.sum()} duplicate (CO_NO, PARCEL_ID) keys; keeping the last of each")
+        table = table[~duplicated]
+    return table
+
+def diff_rolls(previous, current, columns=None):
+    """Change set between two roster snapshots keyed on (CO_NO, PARCEL_ID).
+
+    Each row of either snapshot is reduced to a hash of its compared columns
+    (default: every column both snapshots share, minus the key, geocoding
+    and derived columns), so one keyed join finds the differences. Returns
+    one row per new, removed or changed property: CO_NO, PARCEL_ID,
+    change (categorical: new/removed/changed) and address_changed (True
+    for changed properties whose physical address differs).
+    """
+    if columns is None:
+        columns = [c for c in current.columns
+                   if c in previous.columns and c not in KEY_COLS + GEOCODE_COLS + DERIVED_COLS]
+    address_cols = [c for c in ADDRESS_COLS if c in columns]
+    old = _fingerprints(previous, columns, address_cols)
+    new = _fingerprints(current, columns, address_cols)
+
+    merged = old.merge(new, on=KEY_COLS, how='outer', suffixes=('_old', '_new'),
+                       indicator=True, validate='one_to_one')
+    both = merged['_merge'] == 'both'
+    change = np.select(
+        [merged['_merge'] == 'right_only', merged['_merge'] == 'left_only',
+         both & (merged['_row_old'] != merged['_row_new'])],
+        ['new', 'removed', 'changed'], default='')
+    keep = change != ''
+    changes = merged.loc[keep, KEY_COLS].reset_index(drop=True)
+    changes['change'] = pd.Categorical(change[keep], categories=CHANGE_KINDS)
+    changes['address_changed'] = (both & (merged['_address_old'] != merged['_address_new'])).to_numpy()[keep]
+    return changes.sort_values(KEY_COLS, ignore_index=True)
+
+def carry_geocodes(current, previous, changes):
+    """current with GEOCODE_COLS copied from previous where they are still valid.
+
+    New properties and properties whose address changed get empty geocoding
+    columns, so the geocoding tiers (which only fill rows without
+    coordinates) work on the delta alone.
+    """
+    current = current.copy()
+    carried = [c for c in GEOCODE_COLS if c in previous.columns]
+    prev = roll_keys(previous)
+    for col in carried:
+        prev[col] = previous[col].to_numpy()
+    prev = prev.drop_duplicates(subset=KEY_COLS, keep='last')
+
+    redo = changes.loc[(changes['change'] == 'new') | changes['address_changed'], KEY_COLS]
+    redo = redo.assign(_redo=True)
+    keys = roll_keys(current)
+    looked_up = (keys.merge(prev, on=KEY_COLS, how='left', validate='many_to_one')
+                     .merge(redo, on=KEY_COLS, how='left', validate='many_to_one'))
+    stale = looked_up['_redo'].eq(True).to_numpy()
+
+    for col in GEOCODE_COLS:
+        if col in carried:
+            values = looked_up[col].mask(stale)
+        else:
+            values = pd.Series(None, index=looked_up.index, dtype=object if col == 'geocode_source' else 'float64')
+        current[col] = values.to_numpy()
+    current['latitude'] = pd.to_numeric(current['latitude'], errors='coerce')
+    current['longitude'] = pd.to_numeric(current['longitude'], errors='coerce')
+    return current
@@ -0,0 +1,110 @@
+import os
+import shutil
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+# Rosters are stored either as a single .parquet file (legacy) or as a
+# Hive-partitioned dataset directory: <root>/CO_NO=23/part-0.parquet.
+PARTITION_COL = 'CO_NO'
+PARTITIONING = ds.partitioning(pa.schema([(PARTITION_COL, pa.int16())]), flavor='hive')
+
+def is_dataset(path):
+    """True if path names a partitioned dataset rather than a single parquet file."""
+    return Path(path).suffix.lower() != '.parquet'
+
+def partition_dir(path, county_no):
+    return Path(path) / f'{PARTITION_COL}={int(county_no)}'
+
+def roster_counties(path):
+    """County numbers present in a roster, read from partition names or the CO_NO column."""
+    if is_dataset(path):
+        return sorted(int(p.name.split('=', 1)[1]) for p in Path(path).glob(f'{PARTITION_COL}=*') if p.is_dir())
+    return sorted(pd.read_parquet(path, columns=[PARTITION_COL])[PARTITION_COL].astype(int).unique())
+
+def roster_columns(path):
+    """Column names present in a roster (any partition), without reading data."""
+    if not is_dataset(path):
+        return pq.read_schema(path).names
+    names = [PARTITION_COL]
+    for f in sorted(Path(path).glob(f'{PARTITION_COL}=*/*.parquet')):
+        names += [n for n in pq.read_schema(f).names if n not in names]
+    return names
+
+def read_roster(path, counties=None, columns=None):
+    """Read a roster, optionally limited to some counties and columns.
+
+    For datasets the county filter prunes whole partitions and the column
+    list is pushed down to the parquet reader, so I/O scales with the slice.
+    """
+    if not is_dataset(path):
+        filters = [(PARTITION_COL, 'in', [int(c) for c in counties])] if counties is not None else None
+        return pd.read_parquet(path, columns=columns, filters=filters)
+
+    files = sorted(Path(path).glob(f'{PARTITION_COL}=*/*.parquet'))
+    if counties is not None:
+        wanted = {partition_dir(path, c) for c in counties}
+        files = [f for f in files if f.parent in wanted]
+    if not files:
+        return pd.DataFrame(columns=columns or [PARTITION_COL])
+
+    # Partitions may have been written by different runs; unify their schemas
+    # (e.g. an all-null column in one county, doubles in another)
+    file_schemas = [pq.read_schema(f) for f in files]
+    schema = pa.unify_schemas(file_schemas + [PARTITIONING.schema], promote_options='permissive')
+    dataset = ds.dataset([str(f) for f in files], schema=schema, format='parquet',
+                         partitioning=PARTITIONING, partition_base_dir=str(path))
+    table = dataset.to_table(columns=columns)
+    df = table.to_pandas()
+    if PARTITION_COL in df.columns:
+        # Partition key comes back last; keep the roster's usual column order
+        df = df[[PARTITION_COL] + [c for c in df.columns if c != PARTITION_COL]]
+    return df
+
+def _replace_parquet(write, target):
+    # Write next to the target, then rename over it, so readers (and a
+    # crashed run) only ever see the old or the new file, never a torn one
+    tmp = target.with_name(target.name + '.tmp')
+    write(tmp)
+    os.replace(tmp, target)
+
+def write_roster(df, path, counties=None):
+    """Write a roster, replacing only the given counties when counties is set.
+
+    counties=None rewrites the whole roster. Otherwise df must hold the new
+    rows for exactly those counties; other counties are left untouched.
+    Each parquet file is replaced atomically.
+    """
+    path = Path(path)
+    if counties is not None:
+        counties = sorted({int(c) for c in counties})
+
+    if not is_dataset(path):
+        if counties is not None and path.exists():
+            existing = pd.read_parquet(path)
+            keep = ~existing[PARTITION_COL].astype(int).isin(counties)
+            df = pd.concat([existing[keep], df], ignore_index=True)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        _replace_parquet(lambda tmp: df.to_parquet(tmp, index=False), path)
+        return
+
+    path.mkdir(parents=True, exist_ok=True)
+    # One Arrow table for all partitions so their file schemas agree
+    table = pa.Table.from_pandas(df.drop(columns=[PARTITION_COL]), preserve_index=False)
+    county_keys = df[PARTITION_COL].astype(int).to_numpy()
+    groups = pd.Series(range(len(df))).groupby(county_keys).indices
+
+    for county_no, idx in groups.items():
+        target = partition_dir(path, county_no)
+        target.mkdir(exist_ok=True)
+        part = table.take(pa.array(idx))
+        _replace_parquet(lambda tmp: pq.write_table(part, tmp), target / 'part-0.parquet')
+
+    # Drop partitions that are in scope but no longer have rows
+    scope = counties if counties is not None else roster_counties(path)
+    for county_no in scope:
+        if county_no not in groups:
+            shutil.rmtree(partition_dir(path, county_no), ignore_errors=True)
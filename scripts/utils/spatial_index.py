@@ -0,0 +1,157 @@
+import os
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Add project root to path for imports
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from scripts.utils.roster_store import read_roster
+
+EARTH_RADIUS_MI = 3958.8
+MILES_PER_DEG_LAT = 69.09
+# ~0.7 x 0.6 miles in Florida: a few dozen properties per cell in dense areas
+CELL_DEG = 0.01
+INDEX_VERSION = 1
+
+def haversine_miles(lat, lon, lat0, lon0):
+    """Great-circle distance in miles from (lat0, lon0) to arrays of points."""
+    lat, lon = np.radians(lat), np.radians(lon)
+    lat0, lon0 = np.radians(lat0), np.radians(lon0)
+    a = np.sin((lat - lat0) / 2) ** 2 + np.cos(lat) * np.cos(lat0) * np.sin((lon - lon0) / 2) ** 2
+    return 2 * EARTH_RADIUS_MI * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+class SpatialIndex:
+    """Packed grid index over point coordinates.
+
+    Points are sorted by grid cell (row-major), so each row of cells a
+    query touches is one contiguous slice found by binary search; only
+    points in those slices are tested exactly. Queries return the ids the
+    index was built with (PARCEL_IDs for build_parcel_index).
+    The whole index is a handful of numpy arrays saved as one .npz,
+    loaded without pickling.
+    """
+
+    def __init__(self, latitude, longitude, ids, units, keys, origin, cell, nx):
+        self.latitude, self.longitude = latitude, longitude
+        self.ids, self.units, self.keys = ids, units, keys
+        self.origin, self.cell, self.nx = origin, cell, nx
+
+    def __len__(self):
+        return len(self.ids)
+
+    @classmethod
+    def build(cls, latitude, longitude, ids, units=None, cell=CELL_DEG):
+        """Index parallel arrays; rows without coordinates are left out."""
+        latitude = np.asarray(latitude, dtype=np.float64)
+        longitude = np.asarray(longitude, dtype=np.float64)
+        ids = np.asarray(ids)
+        if ids.dtype == object:
+            ids = ids.astype(str)  # npz loads object arrays only with pickling
+        units = np.zeros(len(latitude)) if units is None else np.asarray(units, dtype=np.float64)
+        rows = np.flatnonzero(np.isfinite(latitude) & np.isfinite(longitude))
+        lat, lon = latitude[rows], longitude[rows]
+        origin = (float(lat.min()), float(lon.min())) if len(rows) else (0.0, 0.0)
+        nx = int((lon.max() - origin[1]) // cell) + 1 if len(rows) else 1
+
+        keys = cls._cell_keys(lat, lon, origin, cell, nx)
+        order = np.argsort(keys, kind='stable')
+        rows = rows[order]
+        return cls(lat[order], lon[order], ids[rows], units[rows], keys[order], origin, cell, nx)
+
+    @staticmethod
+    def _cell_keys(lat, lon, origin, cell, nx):
+        gy = ((lat - origin[0]) // cell).astype(np.int64)
+        gx = ((lon - origin[1]) // cell).astype(np.int64)
+        return gy * nx + gx
+
+    def save(self, path):
+        """Write the index atomically (temp file + rename)."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + '.tmp')
+        with open(tmp, 'wb') as f:
+            np.savez(f, latitude=self.latitude, longitude=self.longitude, ids=self.ids,
+                     units=self.units, keys=self.keys,
+                     meta=np.array([INDEX_VERSION, self.origin[0], self.origin[1], self.cell, self.nx]))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            version, lat0, lon0, cell, nx = data['meta']
+            if int(version) != INDEX_VERSION:
+                raise ValueError(f"{path}: spatial index version {int(version)}, expected {INDEX_VERSION}")
+            return cls(data['latitude'], data['longitude'], data['ids'], data['units'],
+                       data['keys'], (float(lat0), float(lon0)), float(cell), int(nx))
+
+    def _candidates(self, west, south, east, north):
+        # Positions (in index order) of points in the cells overlapping the box
+        lat0, lon0 = self.origin
+        gx0 = max(int((west - lon0) // self.cell), 0)
+        gx1 = min(int((east - lon0) // self.cell), self.nx - 1)
+        gy0 = max(int((south - lat0) // self.cell), 0)
+        gy1 = int((north - lat0) // self.cell)
+        if gx0 > gx1 or gy0 > gy1 or not len(self):
+            return np.empty(0, dtype=np.int64)
+        gy = np.arange(gy0, gy1 + 1, dtype=np.int64)
+        starts = np.searchsorted(self.keys, gy * self.nx + gx0, side='left')
+        ends = np.searchsorted(self.keys, gy * self.nx + gx1, side='right')
+        return np.concatenate([np.arange(s, e) for s, e in zip(starts, ends) if e > s] or [np.empty(0, dtype=np.int64)])
+
+    def _filter_units(self, pos, min_units):
+        return pos if min_units is None else pos[self.units[pos] >= min_units]
+
+    def bbox(self, west, south, east, north, min_units=None):
+        """Ids inside the box (inclusive), optionally with at least min_units."""
+        pos = self._candidates(west, south, east, north)
+        lat, lon = self.latitude[pos], self.longitude[pos]
+        pos = pos[(lat >= south) & (lat <= north) & (lon >= west) & (lon <= east)]
+        return self.ids[self._filter_units(pos, min_units)]
+
+    def _within(self, lat, lon, miles, min_units):
+        dlat = miles / MILES_PER_DEG_LAT
+        dlon = miles / (MILES_PER_DEG_LAT * max(np.cos(np.radians(min(abs(lat) + dlat, 89.9))), 1e-6))
+        pos = self._filter_units(self._candidates(lon - dlon, lat - dlat, lon + dlon, lat + dlat), min_units)
+        dist = haversine_miles(self.latitude[pos], self.longitude[pos], lat, lon)
+        keep = dist <= miles
+        pos, dist = pos[keep], dist[keep]
+        order = np.lexsort((pos, dist))
+        return pos[order], dist[order]
+
+    def radius(self, lat, lon, miles, min_units=None):
+        """Ids within `miles` of (lat, lon), nearest first. Returns (ids, miles)."""
+        pos, dist = self._within(lat, lon, miles, min_units)
+        return self.ids[pos], dist
+
+    def nearest(self, lat, lon, k, min_units=None, max_miles=500.0):
+        """The k nearest ids to (lat, lon). Returns (ids, miles).
+
+        The search circle starts at about one cell and doubles until it
+        holds k points; every point outside the circle is farther than all
+        points inside, so the first k of the final circle are exact.
+        """
+        miles = self.cell * MILES_PER_DEG_LAT
+        while True:
+            pos, dist = self._within(lat, lon, miles, min_units)
+            if len(pos) >= k or miles >= max_miles:
+                return self.ids[pos[:k]], dist[:k]
+            miles = min(miles * 2, max_miles)
+
+def build_parcel_index(roster_path, index_path=None, cell=CELL_DEG):
+    """SpatialIndex over a geocoded roster whose ids are PARCEL_IDs.
+
+    Units come from NO_RES_UNTS, so queries can ask for e.g. 100+ unit
+    properties. The index is saved to index_path when given.
+    """
+    df = read_roster(roster_path, columns=['PARCEL_ID', 'latitude', 'longitude', 'NO_RES_UNTS'])
+    index = SpatialIndex.build(pd.to_numeric(df['latitude'], errors='coerce'),
+                               pd.to_numeric(df['longitude'], errors='coerce'),
+                               df['PARCEL_ID'].astype(str).to_numpy(),
+                               pd.to_numeric(df['NO_RES_UNTS'], errors='coerce'), cell)
+    if index_path is not None:
+        index.save(index_path)
+        print(f"Saved spatial index of {len(index):,} parcels to {index_path}")
+    return index
@@ -0,0 +1,33 @@
+import importlib.util
+import sys
+import threading
+from pathlib import Path
+
+SCRIPTS_DIR = Path(__file__).parent.parent
+
+_lock = threading.RLock()
+
+def load_stage(filename):
+    """Import a numbered pipeline script (e.g. 01_ingest_dor.py) as a module.
+
+    The module is registered in sys.modules under its file stem and the
+    scripts directory is put on sys.path, so functions it hands to process
+    pools pickle by reference and worker processes (forked or spawned) can
+    import them. Later calls return the same module object.
+    """
+    path = SCRIPTS_DIR / filename
+    with _lock:
+        module = sys.modules.get(path.stem)
+        if module is not None and Path(getattr(module, '__file__', '')).resolve() == path.resolve():
+            return module
+        if str(SCRIPTS_DIR) not in sys.path:
+            sys.path.append(str(SCRIPTS_DIR))
+        spec = importlib.util.spec_from_file_location(path.stem, path)
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[spec.name] = module
+        try:
+            spec.loader.exec_module(module)
+        except BaseException:
+            del sys.modules[spec.name]
+            raise
+        return module